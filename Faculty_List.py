@@ -1,7 +1,20 @@
 import streamlit as st
 import pandas as pd
 import math
-from streamlit_extras.switch_page_button import switch_page
+import time
+
+import functions.cache_warmer as cache_warmer
+import functions.diagnostics as diagnostics
+import functions.metrics as metrics
+import functions.profiler as profiler
+import functions.snapshot as snapshot
+from functions.facet_index import FacetIndex
+from functions.faculty import Faculty
+
+ROSTER_CSV = 'Takesawa_Saori_updated.csv'
+
+# No. of interests shown with their no. of faculty above the list, in addition to the selected ones
+FACET_CAPTION_TAGS = 8
 
 def pagination_prev():
     if st.session_state.current_page > 0:
@@ -11,104 +24,160 @@ def pagination_next():
     if st.session_state.current_page < max_pages - 1:
         st.session_state.current_page += 1
 
-# Load your faculty data
-faculty_data = pd.read_csv('Takesawa_Saori_updated.csv')
+@st.cache_resource
+def load_faculty_data(dataset_version):
+    # Shared by all sessions (and not modified by them), and built once per version of the faculty data
+    if snapshot.is_enabled():
+        faculty_data = snapshot.load_roster()
+    else:
+        faculty_data = pd.read_csv(ROSTER_CSV)
+    return faculty_data, FacetIndex.from_frame(faculty_data)
 
-selected_faculty = None
+# Profiled when opened with ?profile=1, or when slow reruns are captured (see functions.profiler)
+with profiler.profile_rerun('faculty_list', diagnostics.is_profile_requested()):
+    # Load your faculty data, and its index by interest
+    faculty_data, facet_index = load_faculty_data(snapshot.get_dataset_version(ROSTER_CSV))
 
-# Set page size and current page
-page_size = 25
-# Initialize session state
-if 'current_page' not in st.session_state:
-    st.session_state.current_page = 0
+    selected_faculty = None
 
-if 'selected_faculty' not in st.session_state:
-    st.session_state.selected_faculty = None
+    # Set page size and current page
+    page_size = 25
 
-if 'faculty_api_id' not in st.session_state or not st.session_state.faculty_api_id is None:
-    st.session_state.faculty_api_id = None
+    # Whether to also warm the profile caches of the faculty on the next page
+    warm_next_page = True
 
-if 'retrieve_method' not in st.session_state or not st.session_state.retrieve_method is None:
-    st.session_state.retrieve_method = None
+    # Initialize session state
+    if 'current_page' not in st.session_state:
+        st.session_state.current_page = 0
 
-if 'faculty_info' not in st.session_state or not st.session_state.faculty_info is None:
-    st.session_state.faculty_info = None
+    if 'selected_faculty' not in st.session_state:
+        st.session_state.selected_faculty = None
 
-if 'collab_info' not in st.session_state or not st.session_state.collab_info is None:
-    st.session_state.collab_info = None
+    if 'faculty_api_id' not in st.session_state or not st.session_state.faculty_api_id is None:
+        st.session_state.faculty_api_id = None
 
-st.header("Faculty List")
+    if 'retrieve_method' not in st.session_state or not st.session_state.retrieve_method is None:
+        st.session_state.retrieve_method = None
 
-# Sorting options
-sort_order = st.selectbox('Sort by Name', ['Ascending', 'Descending'])
-if sort_order == 'Ascending':
-    faculty_data = faculty_data.sort_values(by='Name', ascending=True)
-else:
-    faculty_data = faculty_data.sort_values(by='Name', ascending=False)
+    st.header("Faculty List")
 
-# Search bar
-search_term = st.text_input('Search Faculty by Name').lower()
+    # Sorting options
+    sort_order = st.selectbox('Sort by Name', ['Ascending', 'Descending'])
 
-# Filter faculty based on search term
-filtered_data = faculty_data[faculty_data['Name'].str.lower().str.contains(search_term)]
+    # Search bar
+    search_term = st.text_input('Search Faculty by Name').lower()
 
-# Calculate the maximum number of pages required
-max_pages = math.ceil(len(filtered_data) / page_size)
+    # Interest filters
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        selected_interests = st.multiselect('Filter by Interests', facet_index.tags, key='interest_filter')
+    with col2:
+        match_mode = st.radio('Match', ['Any interest', 'All interests'], key='interest_match')
+    match_all = match_mode == 'All interests'
 
-# Ensure the current page is within the valid range
-current_page = max(0, min(st.session_state.current_page, max_pages - 1))
+    # Filter faculty based on search term and interests, as bitsets of the rows
+    filter_start_time = time.perf_counter()
+    name_bits = facet_index.match_name(search_term)
+    interest_bits = facet_index.match_tags(selected_interests, match_all)
+    filtered_bits = name_bits & interest_bits
 
-# Enable or disable Previous and Next buttons
-previous_button_enabled = current_page > 0
-next_button_enabled = current_page < max_pages - 1
+    # No. of faculty with each interest among the ones an added interest would be picked from:
+    # the current results when all interests must match, else the results of the name search
+    facet_counts = facet_index.facet_counts(filtered_bits if match_all else name_bits)
+    if facet_counts:
+        # The selected interests, then the most frequent other ones. Not shown in the options of the filter,
+        # as the widget id includes the option labels, so the selection would be cleared whenever a count changes.
+        other_tags = [tag for tag in facet_counts if tag not in selected_interests]
+        caption_tags = selected_interests + other_tags[:FACET_CAPTION_TAGS]
+        hidden_tag_count = len(set(facet_counts) - set(caption_tags))
+        st.caption(' · '.join(f'{tag} ({facet_counts.get(tag, 0)})' for tag in caption_tags)
+                   + (f' · {hidden_tag_count} more' if hidden_tag_count > 0 else ''))
 
-# Show both Previous and Next buttons
-previous_key = f"previous_{current_page - 1}" if previous_button_enabled else None
-next_key = f"next_{current_page + 1}" if next_button_enabled else None
+    # Positions of the filtered faculty in faculty_data, in name order
+    filtered_positions = facet_index.to_positions(filtered_bits, descending=sort_order == 'Descending')
+    metrics.observe('faculty_list.filter_ms', (time.perf_counter() - filter_start_time) * 1000)
 
+    # Calculate the maximum number of pages required
+    max_pages = math.ceil(len(filtered_positions) / page_size)
 
+    # Ensure the current page is within the valid range
+    current_page = max(0, min(st.session_state.current_page, max_pages - 1))
 
-# Create a row with three columns for the buttons and current page
-col1, col2, col3 = st.columns([1,1,1])
+    # Enable or disable Previous and Next buttons
+    previous_button_enabled = current_page > 0
+    next_button_enabled = current_page < max_pages - 1
 
-with col1:
-    st.button("Previous", on_click=pagination_prev, disabled=not previous_button_enabled, use_container_width=True)
-with col2:
-    st.write(f"Page {st.session_state.current_page + 1} / {max_pages}")
-with col3:
-    st.button("Next", on_click=pagination_next, disabled=not next_button_enabled, use_container_width=True)
+    # Show both Previous and Next buttons
+    previous_key = f"previous_{current_page - 1}" if previous_button_enabled else None
+    next_key = f"next_{current_page + 1}" if next_button_enabled else None
 
 
-# Paginate faculty list
-start_idx = current_page * page_size
-end_idx = start_idx + page_size
-faculty_page = filtered_data.iloc[start_idx:end_idx]
 
-st.write('---')  # Add a separator
-# Create faculty cards
-for index, row in faculty_page.iterrows():
-    col1, col2, col3 = st.columns([1, 4, 1])  # Divide the row into three columns
+    # Create a row with three columns for the buttons and current page
+    col1, col2, col3 = st.columns([1,1,1])
 
     with col1:
-        st.image(row['img_link'], width=100)
-
+        st.button("Previous", on_click=pagination_prev, disabled=not previous_button_enabled, use_container_width=True)
     with col2:
-        st.write(f'Name: {row["Name"]}')
-        st.write(f'Email: {row["Email"]}')
-        button_key = f"view_profile_{row['Name']}"  # Unique key for each faculty
-        if st.button('View Profile', key=button_key):
-            # Set the selected faculty
-            selected_faculty = row
-
+        st.write(f"Page {st.session_state.current_page + 1} / {max_pages}")
     with col3:
-        pass  # Spacer column
+        st.button("Next", on_click=pagination_next, disabled=not next_button_enabled, use_container_width=True)
+
+
+    # Paginate faculty list
+    start_idx = current_page * page_size
+    end_idx = start_idx + page_size
+    faculty_page = faculty_data.iloc[filtered_positions[start_idx:end_idx]]
+
+    # Warm the profile caches of the visible faculty in the background,
+    # so that "View Profile" does not have to wait for all the API calls.
+    # Not needed in snapshot mode, where profiles are read from the bundle.
+    warmer = cache_warmer.get_cache_warmer() if not snapshot.is_enabled() else None
+    if warmer:
+        for _, row in faculty_page.iterrows():
+            warmer.submit(Faculty.from_row(row), cache_warmer.PRIORITY_VISIBLE)
+
+    if warmer and warm_next_page:
+        for _, row in faculty_data.iloc[filtered_positions[end_idx:end_idx + page_size]].iterrows():
+            warmer.submit(Faculty.from_row(row), cache_warmer.PRIORITY_NEXT_PAGE)
 
     st.write('---')  # Add a separator
+    # Create faculty cards
+    for index, row in faculty_page.iterrows():
+        col1, col2, col3 = st.columns([1, 4, 1])  # Divide the row into three columns
+
+        with col1:
+            thumbnail_path = None
+            if snapshot.is_enabled():
+                thumbnail_path = snapshot.get_thumbnail_path(Faculty.from_row(row).faculty_id)
+            st.image(thumbnail_path or row['img_link'], width=100)
+
+        with col2:
+            st.write(f'Name: {row["Name"]}')
+            st.write(f'Email: {row["Email"]}')
+            button_key = f"view_profile_{row['Name']}"  # Unique key for each faculty
+            if st.button('View Profile', key=button_key):
+                # Set the selected faculty, as a compact record instead of the whole row
+                selected_faculty = Faculty.from_row(row)
+                # Move the faculty ahead of the speculative warming
+                if warmer:
+                    warmer.submit(selected_faculty, cache_warmer.PRIORITY_CLICK)
 
+        with col3:
+            pass  # Spacer column
 
-st.session_state['selected_faculty'] = selected_faculty
+        st.write('---')  # Add a separator
 
 
+    st.session_state['selected_faculty'] = selected_faculty
+
+    diagnostics.render_profile_saved(profiler.finish_rerun())
+
+diagnostics.render_diagnostics()
+
 # Faculty profile page
 if selected_faculty is not None:
-    switch_page('faculty profile')
\ No newline at end of file
+    # Imported here, as it is only needed once a faculty is selected
+    from streamlit_extras.switch_page_button import switch_page
+    switch_page('faculty profile')
+
@@ -0,0 +1,84 @@
+"""
+Count the OpenAlex requests needed to get the author records (institution, h-index, works count)
+of the top collaborators of every faculty in the roster, against the local stub of OpenAlex:
+- one request per collaborator, with get_author_info_from_OpenAlexAPI(..., 'api_id'),
+- batched requests of up to AUTHOR_BATCH_SIZE authors, with get_author_records,
+- batched requests again, once the author store is filled.
+Run from the repository root:
+    python -m benchmarks.bench_collaborator_records [--faculty 86]
+The exit code is 1 if the filled author store still needed requests.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from benchmarks.stub_upstreams import StubUpstreams
+from functions.faculty import Faculty
+
+
+def measure(name, get_records, author_ids):
+    # Print and return the no. of OpenAlex requests made by get_records(author_ids)
+    import functions.metrics as metrics
+
+    requests_at_start = metrics.get_count('network_calls.openalex')
+    start_time = time.perf_counter()
+    records = get_records(author_ids)
+    seconds = time.perf_counter() - start_time
+    requests = metrics.get_count('network_calls.openalex') - requests_at_start
+
+    print(f'{name:>22}: {requests:>4} requests, {seconds * 1000:8.1f} ms, {len(records)} records')
+
+    return requests
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark batched lookups of collaborator records.')
+    parser.add_argument('--csv', default='Takesawa_Saori_updated.csv', help='Roster csv used by the stub.')
+    parser.add_argument('--faculty', type=int, default=86, help='No. of faculty whose collaborators are looked up.')
+    parser.add_argument('--latency-ms', type=float, default=0, help='Median latency of the stub.')
+    args = parser.parse_args()
+
+    stub = StubUpstreams(args.csv, args.latency_ms).start()
+
+    # Must be set before the app modules are imported, as they read them at import time
+    store_dir = tempfile.mkdtemp()
+    os.environ['OPENALEX_BASE_URL'] = stub.openalex_url
+    os.environ['DRNTU_BASE_URL'] = stub.drntu_url
+    os.environ['DASHBOARD_DRNTU_PAGE_STORE'] = os.path.join(store_dir, 'drntu_pages.sqlite')
+    os.environ['DASHBOARD_AUTHOR_STORE'] = os.path.join(store_dir, 'authors.sqlite')
+
+    import functions.openalex_api_utils as api_utils
+
+    # Top collaborators of each faculty, as shown on their profile page
+    author_ids = []
+    for _, row in pd.read_csv(args.csv).head(args.faculty).iterrows():
+        faculty_api_id, retrieve_method = api_utils.get_api_id_and_method(Faculty.from_row(row))
+        if not retrieve_method:
+            continue
+        recent_pub_list = api_utils.get_author_pubs_from_OpenAlexAPI(faculty_api_id, 50,
+                                                                     sort_by=['publication_date'],
+                                                                     sort_direction='desc')
+        collab_info = api_utils.get_collab_info(faculty_api_id, recent_pub_list)
+        author_ids.extend(collab[1] for collab in collab_info[:api_utils.TOP_COLLABORATORS])
+
+    print(f'{len(author_ids)} top collaborators, {len(set(author_ids))} distinct')
+
+    def get_one_by_one(author_ids):
+        # Each distinct author once, as a cache would
+        return {author_id: api_utils.fetch_api_result('https://api.openalex.org/authors/' + author_id)
+                for author_id in dict.fromkeys(author_ids)}
+
+    measure('one request per author', get_one_by_one, author_ids)
+    measure('batched', api_utils.get_author_records, author_ids)
+    requests_with_store = measure('batched, filled store', api_utils.get_author_records, author_ids)
+
+    stub.stop()
+
+    if requests_with_store > 0:
+        print('Stored author records were fetched again')
+        sys.exit(1)
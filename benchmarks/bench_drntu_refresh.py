@@ -0,0 +1,86 @@
+"""
+Measure a roster-wide refresh of the DR-NTU data (interests, biography, DOIs and publication titles)
+against the local stub of DR-NTU, with the page store empty and then filled from the first refresh.
+
+The in-memory caches are cleared before each refresh, like after a restart, so the second refresh
+only sends conditional requests, and should neither download nor parse any page.
+Run from the repository root:
+    python -m benchmarks.bench_drntu_refresh [--faculty 50] [--no-validators]
+With --no-validators, the stub sends no ETag or Last-Modified, so pages are downloaded again
+and found unchanged by their content hash.
+The exit code is 1 if the second refresh parsed any page.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from benchmarks.stub_upstreams import StubUpstreams
+from functions.faculty import Faculty
+
+# Counters of functions.metrics reported for each refresh
+REPORTED_COUNTERS = ['network_calls.drntu', 'drntu_pages.not_modified', 'drntu_pages.unchanged',
+                     'drntu_pages.downloaded_bytes', 'drntu_pages.parsed', 'drntu_pages.reused']
+
+
+def refresh(faculty_list):
+    """
+    Get the DR-NTU data of every faculty, bypassing the in-memory caches.
+    Return the time taken and the change of the REPORTED_COUNTERS.
+
+    Input:
+    - faculty_list ( List(Faculty) ): Faculty to refresh.
+    """
+
+    import functions.dr_ntu_utils as ntu_utils
+    import functions.metrics as metrics
+    from functions.cache_store import default_cache
+
+    default_cache.clear()
+    counts_at_start = {name: metrics.get_count(name) for name in REPORTED_COUNTERS}
+    start_time = time.perf_counter()
+
+    for faculty in faculty_list:
+        ntu_utils.get_research_interest_from_drNTU(faculty.dr_ntu_link)
+        ntu_utils.get_bio_from_drNTU(faculty.dr_ntu_link)
+        ntu_utils.get_doi_list_from_drNTU(faculty.dr_ntu_link)
+        ntu_utils.get_pub_list_from_article(faculty.dr_ntu_link)
+
+    result = {name: metrics.get_count(name) - counts_at_start[name] for name in REPORTED_COUNTERS}
+    result['seconds'] = round(time.perf_counter() - start_time, 3)
+
+    return result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark conditional fetching of DR-NTU pages.')
+    parser.add_argument('--csv', default='Takesawa_Saori_updated.csv', help='Roster csv used by the stub.')
+    parser.add_argument('--faculty', type=int, default=50, help='No. of faculty to refresh.')
+    parser.add_argument('--latency-ms', type=float, default=0, help='Median latency of the stub.')
+    parser.add_argument('--no-validators', action='store_true', help='Do not send ETag and Last-Modified from the stub.')
+    args = parser.parse_args()
+
+    stub = StubUpstreams(args.csv, args.latency_ms, drntu_validators=not args.no_validators).start()
+    store_dir = tempfile.mkdtemp()
+
+    # Must be set before the app modules are imported, as they read them at import time
+    os.environ['DRNTU_BASE_URL'] = stub.drntu_url
+    os.environ['DASHBOARD_DRNTU_PAGE_STORE'] = os.path.join(store_dir, 'drntu_pages.sqlite')
+
+    faculty_list = [Faculty.from_row(row) for _, row in pd.read_csv(args.csv).head(args.faculty).iterrows()]
+
+    results = {}
+    for name in ['empty store', 'filled store']:
+        results[name] = refresh(faculty_list)
+        print(f'{name:>13}: ' + ', '.join(f'{key} {value}' for key, value in results[name].items()))
+
+    print(f'304 responses from the stub: {stub.not_modified_count()}')
+    stub.stop()
+
+    if results['filled store']['drntu_pages.parsed'] > 0:
+        print('Pages were parsed again although they did not change')
+        sys.exit(1)
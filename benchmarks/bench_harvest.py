@@ -0,0 +1,90 @@
+"""
+Measure the snapshot build (functions.snapshot with functions.harvest) against the local stub of OpenAlex and DR-NTU,
+with different numbers of worker processes and threads, to size the nightly refresh of the roster.
+
+Each configuration starts with empty DR-NTU page and author stores, and reports its wall time, CPU time
+and the time of each stage. Run from the repository root:
+    python -m benchmarks.bench_harvest [--configs 1x1 1x8 4x8] [--latency-ms 100] [--rate-limit 10]
+The exit code is 1 if a faculty failed, or if the profiles differ between configurations.
+"""
+
+import argparse
+import io
+import json
+import os
+import tempfile
+import time
+from contextlib import redirect_stdout
+
+from benchmarks.stub_upstreams import StubUpstreams
+
+
+def load_profiles(bundle_dir):
+    # Profile json of each faculty of a bundle, without the time it was fetched
+    profiles = {}
+    faculty_dir = os.path.join(bundle_dir, 'faculty')
+    for file_name in os.listdir(faculty_dir):
+        if file_name.endswith('.json'):
+            with open(os.path.join(faculty_dir, file_name)) as f:
+                profile = json.load(f)
+            profile.pop('fetched_at')
+            profiles[file_name] = profile
+    return profiles
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the snapshot build with processes and threads.')
+    parser.add_argument('--csv', default='Takesawa_Saori_updated.csv', help='Roster csv used by the stub and the build.')
+    parser.add_argument('--configs', nargs='+', default=['1x1', '1x8', '4x8'],
+                        help='Configurations as <processes>x<threads>.')
+    parser.add_argument('--latency-ms', type=float, default=100, help='Median latency of the stub.')
+    parser.add_argument('--rate-limit', type=float, default=10, help='OpenAlex requests per second, shared by all workers.')
+    args = parser.parse_args()
+
+    stub = StubUpstreams(args.csv, args.latency_ms).start()
+
+    # Read by the worker processes when they import the app modules
+    os.environ['OPENALEX_BASE_URL'] = stub.openalex_url
+    os.environ['DRNTU_BASE_URL'] = stub.drntu_url
+    os.environ['OPENALEX_RATE_LIMIT'] = str(args.rate_limit)
+
+    import functions.harvest as harvest
+    import functions.snapshot as snapshot
+
+    first_profiles = None
+    has_difference = False
+
+    for config in args.configs:
+        processes, threads = (int(value) for value in config.split('x'))
+
+        # Empty stores for each configuration, so that none reuses the pages fetched by the one before
+        store_dir = tempfile.mkdtemp()
+        os.environ['DASHBOARD_DRNTU_PAGE_STORE'] = os.path.join(store_dir, 'drntu_pages.sqlite')
+        os.environ['DASHBOARD_AUTHOR_STORE'] = os.path.join(store_dir, 'authors.sqlite')
+
+        # Without the progress lines of each faculty
+        start_time = time.perf_counter()
+        with redirect_stdout(io.StringIO()):
+            bundle_dir = snapshot.build_snapshot(args.csv, os.path.join(store_dir, 'snapshots'), processes, threads)
+        seconds = time.perf_counter() - start_time
+
+        with open(os.path.join(bundle_dir, 'manifest.json')) as f:
+            manifest = json.load(f)
+        report = manifest['harvest']
+
+        print(f'\n{processes} processes x {threads} threads: {seconds:.1f} s, {report["cpu_seconds"]} CPU s, '
+              f'{len(manifest["faculty_ids"])} faculty, {len(manifest["failed"])} failed, {report["retries"]} retries')
+        print(harvest.StageTimes.from_dict(report['stages']).format_report())
+
+        profiles = load_profiles(bundle_dir)
+        if first_profiles is None:
+            first_profiles = profiles
+        elif profiles != first_profiles:
+            print(f'Profiles differ from {args.configs[0]}')
+            has_difference = True
+
+        has_difference = has_difference or len(manifest['failed']) > 0
+
+    stub.stop()
+
+    raise SystemExit(1 if has_difference else 0)
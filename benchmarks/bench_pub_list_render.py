@@ -0,0 +1,106 @@
+"""
+Compare the rendering of a publication list as separate elements for each line and button of each work
+(how the profile page rendered lists before), with one markdown element for the whole list (functions.markdown_list).
+
+Both are run through Streamlit's AppTest, and reported with the no. of elements sent to the browser
+and the time taken to render the list in a rerun. Run from the repository root:
+    python -m benchmarks.bench_pub_list_render [--works 10 20 50] [--runs 20]
+"""
+
+import argparse
+import statistics
+
+from streamlit.testing.v1 import AppTest
+
+from benchmarks.bench_works_dedup import make_works
+
+
+def render_per_line():
+    # One element for each line, location and button of each work
+    import time
+    import streamlit as st
+    from functions.works_store import WorksTable
+
+    start_time = time.perf_counter()
+    for i, work in enumerate(WorksTable.from_works(st.session_state.works)):
+        st.write(f'{i+1}. **{work["title"]}**')
+        st.write(f'- Published date: {work["publication_date"]}')
+        st.write(f'- No. of citations: {work["cited_by_count"]}')
+        source_names = work.source_names()
+        if len(source_names) > 0:
+            st.write('- Published in:')
+            for source_name in source_names:
+                st.write(f'----- {source_name}')
+        if isinstance(work["doi"], str):
+            st.link_button('View Publication', work["doi"])
+        st.text('')
+    st.session_state.render_ms = (time.perf_counter() - start_time) * 1000
+
+
+def render_markdown():
+    # One markdown element for the whole list
+    import time
+    import streamlit as st
+    import functions.markdown_list as markdown_list
+    from functions.works_store import WorksTable
+
+    start_time = time.perf_counter()
+    items = []
+    for i, work in enumerate(WorksTable.from_works(st.session_state.works)):
+        details = [f'Published date: {work["publication_date"]}', f'No. of citations: {work["cited_by_count"]}']
+        source_names = work.source_names()
+        if len(source_names) > 0:
+            details.append(('Published in:', [markdown_list.escape_markdown(name) for name in source_names]))
+        items.append(markdown_list.format_list_item(i+1, work["title"], details, link=work["doi"]))
+    st.markdown(markdown_list.format_list(items))
+    st.session_state.render_ms = (time.perf_counter() - start_time) * 1000
+
+
+def count_elements(node):
+    # No. of leaf elements under an AppTest node
+    children = getattr(node, 'children', None)
+    if not children:
+        return 1
+    return sum(count_elements(child) for child in children.values())
+
+
+def measure(render, works, runs):
+    """
+    Return the no. of elements and the median time (in ms) taken by render in a rerun,
+    which includes turning each element into a delta for the browser.
+
+    Input:
+    - render (function): Script rendering st.session_state.works, and setting st.session_state.render_ms.
+    - works ( List(Dict) ): Works in the format of OpenAlex.
+    - runs (int): No. of reruns measured.
+    """
+
+    at = AppTest.from_function(render, default_timeout=60)
+    at.session_state['works'] = works
+    at.run()
+
+    times = []
+    for _ in range(runs):
+        at.run()
+        times.append(at.session_state['render_ms'])
+
+    assert not at.exception, at.exception
+
+    return count_elements(at.main), statistics.median(times)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the rendering of publication lists.')
+    parser.add_argument('--works', type=int, nargs='+', default=[10, 20, 50], help='No. of works in the list.')
+    parser.add_argument('--runs', type=int, default=20, help='No. of reruns measured.')
+    args = parser.parse_args()
+
+    for size in args.works:
+        works, _ = make_works(size, preprint_rate=0)
+        # Works with a second venue, like the journal and repository versions of a paper
+        for work in works[::3]:
+            work['locations'] = work['locations'] + [{'source': {'display_name': 'DR-NTU', 'type': 'repository'}}]
+
+        for name, render in [('per line', render_per_line), ('markdown', render_markdown)]:
+            element_count, median_ms = measure(render, works, args.runs)
+            print(f'{size:>3} works, {name:>8}: {element_count:>4} elements, {median_ms:7.2f} ms to render')
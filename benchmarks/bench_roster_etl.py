@@ -0,0 +1,80 @@
+"""
+Compare the link stages of the roster build (functions.roster_etl), which split the website links of all faculty
+with vectorized pandas string operations, with the row by row loops of the notebook they replace.
+
+The scraped roster is repeated to get larger rosters. Both give the same orcid_link, google_scholar_link
+and website_link columns, which is checked on each size. Run from the repository root:
+    python -m benchmarks.bench_roster_etl [--sizes 86 10000 100000]
+The exit code is 1 if the outputs differ.
+"""
+
+import argparse
+import ast
+import time
+
+import pandas as pd
+
+import functions.roster_etl as roster_etl
+
+
+def move_links_per_row(df):
+    # Loops of the notebook: first link containing the kept part, then drop the links containing the removed part
+    df = df.copy()
+
+    for column, kept_part, removed_part in [roster_etl.ORCID_LINKS, roster_etl.GOOGLE_SCHOLAR_LINKS]:
+        moved_links = []
+        website_links = list(df['website_link'])
+        for i in range(len(df)):
+            links = df['website_link'].iloc[i]
+            if isinstance(links, str):
+                links = ast.literal_eval(links)
+            if isinstance(links, list):
+                moved_links.append(next((link for link in links if kept_part in link), float('nan')))
+                website_links[i] = [link for link in links if removed_part not in link]
+            else:
+                moved_links.append(float('nan'))
+        df[column] = moved_links
+        df['website_link'] = website_links
+
+    df['website_link'] = roster_etl.to_list_strings(df['website_link'])
+
+    return df
+
+
+def move_links_vectorized(df):
+    # Stages of the roster build
+    for stage in roster_etl.STAGES[:2]:
+        output = stage.func(df)
+        df = df.assign(**{column: output[column] for column in stage.output_columns})
+
+    df['website_link'] = roster_etl.to_list_strings(df['website_link'])
+
+    return df
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the link stages of the roster build.')
+    parser.add_argument('--csv', default=roster_etl.DEFAULT_INPUT_CSV, help='Roster from the DR-NTU scrape.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[86, 10000, 100000], help='No. of faculty.')
+    args = parser.parse_args()
+
+    roster = pd.read_csv(args.csv)
+    columns = ['website_link', 'orcid_link', 'google_scholar_link']
+    has_difference = False
+
+    for size in args.sizes:
+        df = pd.concat([roster] * (size // len(roster) + 1), ignore_index=True).head(size)
+
+        results = {}
+        for name, move_links in [('per row', move_links_per_row), ('vectorized', move_links_vectorized)]:
+            start_time = time.perf_counter()
+            results[name] = move_links(df)[columns]
+            print(f'{size:>7} faculty, {name:>10}: {(time.perf_counter() - start_time) * 1000:9.1f} ms')
+
+        # nan and None are both missing values
+        is_same = results['per row'].eq(results['vectorized']) | (results['per row'].isna() & results['vectorized'].isna())
+        if not is_same.all().all():
+            print(f'{size:>7} faculty: outputs differ in {", ".join(is_same.columns[~is_same.all()])}')
+            has_difference = True
+
+    raise SystemExit(1 if has_difference else 0)
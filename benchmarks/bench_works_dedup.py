@@ -0,0 +1,188 @@
+"""
+Measure the deduplication of works (functions.works_dedup) on synthetic authors with thousands of works,
+some of which also have a preprint version with a slightly different title, DOI and date.
+
+The blocked comparison of works_dedup is compared with comparing the titles of all pairs of works,
+on time, no. of compared pairs, and precision and recall of the merged pairs against the planted duplicates.
+Run from the repository root:
+    python -m benchmarks.bench_works_dedup [--sizes 500 2000 5000] [--preprint-rate 0.2]
+The exit code is 1 if the blocked comparison has a lower precision or recall than comparing all pairs.
+"""
+
+import argparse
+import itertools
+import random
+import sys
+import time
+from collections import Counter
+
+import functions.works_dedup as works_dedup
+from functions.works_store import WorksTable
+
+WORDS = '''
+learning deep neural network graph adversarial robust efficient scalable distributed federated privacy
+secure attack detection segmentation image video language model transformer attention reinforcement
+policy optimization convex stochastic gradient sparse quantum circuit hardware accelerator memory cache
+compiler verification formal protocol wireless channel energy sensor edge cloud blockchain consensus
+retrieval recommendation knowledge embedding contrastive generative diffusion visual reasoning planning
+'''.split()
+
+TEMPLATES = [
+    '{} {} for {} {}',
+    'Towards {} {} {} with {}',
+    'On the {} of {} {} in {}',
+    '{} {}: a {} approach to {} {}',
+    'Learning {} {} from {} {}',
+]
+
+
+def make_title(rng):
+    template = rng.choice(TEMPLATES)
+    title = template.format(*(rng.choice(WORDS) for _ in range(template.count('{}'))))
+    if rng.random() < 0.2:
+        title += f' part {rng.randrange(1, 4)}'
+    return title[0].upper() + title[1:]
+
+
+def make_preprint_title(title, rng):
+    # Preprint titles differ by case, punctuation or a small edit from the published title
+    # The plural is not used on titles ending with a part number, which would change the number
+    change = rng.randrange(2 if title[-1].isdigit() else 3)
+    if change == 0:
+        return title.lower()
+    if change == 1:
+        return title.replace(' for ', ': for ', 1) + '.'
+    return title + 's'
+
+
+def make_works(size, preprint_rate, seed=0):
+    """
+    Return synthetic works of one author, and the set of pairs of indices that are versions of the same paper.
+
+    Input:
+    - size (int): No. of published works.
+    - preprint_rate (float): Share of the published works that also have a preprint.
+    - seed (int): Seed of the random generator.
+    """
+
+    rng = random.Random(seed)
+    works = []
+    duplicate_pairs = set()
+
+    for i in range(size):
+        year = rng.randrange(2005, 2024)
+        title = make_title(rng)
+        works.append({
+            'id': f'https://openalex.org/W{i}',
+            'title': title,
+            'publication_date': f'{year}-{rng.randrange(1, 13):02d}-01',
+            'cited_by_count': rng.randrange(0, 500),
+            'doi': f'https://doi.org/10.1109/bench.{i}',
+            'locations': [{'source': {'display_name': f'Journal {rng.randrange(50)}', 'type': 'journal'}}],
+            'authorships': [],
+        })
+
+        if rng.random() < preprint_rate:
+            works.append({
+                'id': f'https://openalex.org/W{i}p',
+                'title': make_preprint_title(title, rng),
+                'publication_date': f'{year - rng.randrange(0, 2)}-01-01',
+                'cited_by_count': rng.randrange(0, 50),
+                'doi': f'https://doi.org/10.48550/arxiv.bench.{i}',
+                'locations': [{'source': {'display_name': 'arXiv (Cornell University)', 'type': 'repository'}}],
+                'authorships': [],
+            })
+            duplicate_pairs.add((len(works) - 2, len(works) - 1))
+
+    return works, duplicate_pairs
+
+
+def all_pairs_groups(titles, dois, years):
+    """
+    Return the duplicate groups found by comparing the titles of all pairs of works, with the same rules
+    as works_dedup.find_duplicate_groups() but without blocking.
+    """
+
+    from rapidfuzz import fuzz, process
+
+    normalized_titles = [works_dedup.normalize_title(title) for title in titles]
+    numbers = [works_dedup.get_title_numbers(title) for title in normalized_titles]
+    scores = process.cdist(normalized_titles, normalized_titles, scorer=fuzz.ratio,
+                           score_cutoff=works_dedup.TITLE_THRESHOLD)
+
+    groups = {i: {i} for i in range(len(titles))}
+    for i, j in zip(*scores.nonzero()):
+        if i >= j or len(normalized_titles[i].split()) < works_dedup.MIN_TITLE_WORDS or numbers[i] != numbers[j]:
+            continue
+        if abs(years[i] - years[j]) > works_dedup.MAX_YEAR_GAP:
+            continue
+        merged = groups[i] | groups[j]
+        for k in merged:
+            groups[k] = merged
+
+    return list({id(group): sorted(group) for group in groups.values()}.values())
+
+
+def get_pairs(groups):
+    # Pairs of indices in the same group
+    return {pair for group in groups for pair in itertools.combinations(sorted(group), 2)}
+
+
+def count_blocked_pairs(titles):
+    # No. of pairs of titles compared by works_dedup.find_duplicate_groups()
+    block_sizes = Counter(key for title in titles for key in works_dedup.get_blocking_keys(works_dedup.normalize_title(title)))
+    return sum(size * (size - 1) // 2 for size in block_sizes.values() if 2 <= size <= works_dedup.MAX_BLOCK_SIZE)
+
+
+def run(size, preprint_rate):
+    works, duplicate_pairs = make_works(size, preprint_rate)
+    table = WorksTable.from_works(works)
+
+    titles = table.column('title')
+    dois = table.column('doi')
+    years = [int(date[:4]) for date in table.column('publication_date')]
+
+    start_time = time.perf_counter()
+    blocked_groups = works_dedup.find_duplicate_groups(titles, dois, years)
+    blocked_seconds = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    deduplicated = works_dedup.deduplicate_works(table)
+    dedup_seconds = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    brute_groups = all_pairs_groups(titles, dois, years)
+    brute_seconds = time.perf_counter() - start_time
+
+    print(f'{len(works)} works ({len(duplicate_pairs)} planted duplicates), {len(deduplicated)} after deduplication')
+
+    results = {}
+    for name, groups, seconds in [('blocked', blocked_groups, blocked_seconds), ('all pairs', brute_groups, brute_seconds)]:
+        found_pairs = get_pairs(groups)
+        true_positives = len(found_pairs & duplicate_pairs)
+        precision = true_positives / len(found_pairs) if found_pairs else 1.0
+        recall = true_positives / len(duplicate_pairs) if duplicate_pairs else 1.0
+        results[name] = (precision, recall)
+        print(f'  {name:>9}: {seconds * 1000:8.1f} ms, precision {precision:.3f}, recall {recall:.3f}')
+
+    print(f'  compared pairs: blocked {count_blocked_pairs(titles)}, all pairs {len(works) * (len(works) - 1) // 2}')
+    print(f'  deduplicate_works (grouping + merging): {dedup_seconds * 1000:.1f} ms')
+
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the deduplication of works.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[500, 2000, 5000], help='No. of published works of the author.')
+    parser.add_argument('--preprint-rate', type=float, default=0.2, help='Share of works that also have a preprint.')
+    args = parser.parse_args()
+
+    is_worse = False
+    for size in args.sizes:
+        results = run(size, args.preprint_rate)
+        # Blocking must not miss duplicates found by comparing all pairs, nor merge more distinct works
+        is_worse |= results['blocked'][1] < results['all pairs'][1] or results['blocked'][0] < results['all pairs'][0]
+
+    if is_worse:
+        print('Blocked deduplication is less accurate than comparing all pairs')
+        sys.exit(1)
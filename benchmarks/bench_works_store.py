@@ -0,0 +1,150 @@
+"""
+Compare the memory use and serialization cost of cached works stored as
+OpenAlex dictionaries (after the old keys_to_remove pruning) and as a WorksTable.
+
+Run from the repository root:
+    python -m benchmarks.bench_works_store [--sizes 50 200 1000]
+"""
+
+import argparse
+import pickle
+import random
+import time
+from collections import Counter
+
+import pyarrow as pa
+
+from functions.cache_store import estimate_size
+from functions.works_store import WorksTable
+
+
+def make_work(i, rng):
+    """
+    Return a synthetic work with the fields kept by the old get_author_pubs_from_OpenAlexAPI.
+
+    Input:
+    - i (int): Index of the work, used in its ids.
+    - rng (random.Random): Random generator.
+    """
+
+    def make_source(j):
+        return {
+            'id': f'https://openalex.org/S{rng.randrange(10**9)}',
+            'display_name': f'Journal of Things {rng.randrange(40)}',
+            'issn_l': '1234-5678',
+            'issn': ['1234-5678', '8765-4321'],
+            'is_oa': bool(j % 2),
+            'is_in_doaj': False,
+            'host_organization': f'https://openalex.org/P{rng.randrange(10**6)}',
+            'host_organization_name': 'Some Publisher',
+            'host_organization_lineage': [f'https://openalex.org/P{rng.randrange(10**6)}'],
+            'host_organization_lineage_names': ['Some Publisher'],
+            'type': rng.choice(['journal', 'journal', 'repository', 'conference']),
+        }
+
+    def make_authorship(j):
+        return {
+            'author_position': 'first' if j == 0 else 'middle',
+            'author': {
+                'id': f'https://openalex.org/A{rng.randrange(10**10)}',
+                'display_name': f'Author {rng.randrange(10**5)}',
+                'orcid': f'https://orcid.org/0000-0002-{rng.randrange(10**4):04d}-{rng.randrange(10**4):04d}' if j % 3 == 0 else None,
+            },
+            'institutions': [{
+                'id': f'https://openalex.org/I{rng.randrange(10**9)}',
+                'display_name': f'University {rng.randrange(500)}',
+                'ror': f'https://ror.org/0{rng.randrange(10**7)}',
+                'country_code': 'SG',
+                'type': 'education',
+            }],
+            'countries': ['SG'],
+            'is_corresponding': j == 0,
+            'raw_author_name': f'Author {j}',
+            'raw_affiliation_string': 'School of Something, Some University, Singapore',
+        }
+
+    return {
+        'id': f'https://openalex.org/W{4000000000 + i}',
+        'doi': f'https://doi.org/10.1000/{i}',
+        'title': f'A study of topic {i} with a reasonably long title about things',
+        'publication_year': 2000 + i % 24,
+        'publication_date': f'{2000 + i % 24}-{1 + i % 12:02d}-{1 + i % 28:02d}',
+        'ids': {'openalex': f'https://openalex.org/W{i}', 'doi': f'https://doi.org/10.1000/{i}', 'mag': str(i)},
+        'type': 'article',
+        'type_crossref': 'journal-article',
+        'authorships': [make_authorship(j) for j in range(rng.randint(1, 12))],
+        'cited_by_count': rng.randrange(500),
+        'biblio': {'volume': '12', 'issue': '3', 'first_page': '100', 'last_page': '120'},
+        'locations': [{'is_oa': False, 'landing_page_url': f'https://example.org/{i}/{j}', 'pdf_url': None,
+                       'source': make_source(j) if j < 2 else None, 'license': None, 'version': 'publishedVersion',
+                       'is_accepted': True, 'is_published': True}
+                      for j in range(rng.randint(1, 3))],
+        'counts_by_year': [{'year': 2023 - k, 'cited_by_count': rng.randrange(50)} for k in range(rng.randint(0, 10))],
+        'referenced_works': [f'https://openalex.org/W{rng.randrange(10**10)}' for _ in range(rng.randint(5, 40))],
+        'related_works': [f'https://openalex.org/W{rng.randrange(10**10)}' for _ in range(10)],
+        'updated_date': '2023-10-10T00:00:00.000000',
+        'created_date': '2016-06-24',
+    }
+
+
+def count_journals_dicts(works):
+    # Same loop as the old get_journal_frequency
+    journal_counts = Counter()
+    for entry in works:
+        for location in entry.get('locations', []):
+            source = location.get('source')
+            if source and source.get('type') == 'journal' and source.get('display_name'):
+                journal_counts[source.get('display_name')] += 1
+    return journal_counts
+
+
+def time_call(func, repeat=5):
+    """
+    Return the best time, in milliseconds, of repeat calls of func.
+    """
+
+    best = float('inf')
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start_time)
+    return best * 1000
+
+
+def ipc_bytes(table):
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema, options=pa.ipc.IpcWriteOptions(compression='zstd')) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+
+def run(size):
+    rng = random.Random(size)
+    works = [make_work(i, rng) for i in range(size)]
+    table = WorksTable.from_works(works)
+
+    dict_pickle = pickle.dumps(works)
+    table_pickle = pickle.dumps(table.table)
+    table_ipc = ipc_bytes(table.table)
+
+    assert count_journals_dicts(works) == table.journal_counts()
+
+    print(f'\n{size} works')
+    print(f'  in memory (estimate_size): dicts {estimate_size(works) / 1024:10.1f} KiB'
+          f' | WorksTable {estimate_size(table) / 1024:8.1f} KiB')
+    print(f'  pickled size             : dicts {len(dict_pickle) / 1024:10.1f} KiB'
+          f' | WorksTable {len(table_pickle) / 1024:8.1f} KiB | Arrow IPC+zstd {len(table_ipc) / 1024:8.1f} KiB')
+    print(f'  pickle dumps+loads       : dicts {time_call(lambda: pickle.loads(pickle.dumps(works))):10.2f} ms'
+          f' | WorksTable {time_call(lambda: pickle.loads(pickle.dumps(table.table))):8.2f} ms')
+    print(f'  build from API dicts     : {time_call(lambda: WorksTable.from_works(works)):.2f} ms')
+    print(f'  journal counts           : dicts {time_call(lambda: count_journals_dicts(works)):10.2f} ms'
+          f' | WorksTable {time_call(lambda: WorksTable(table.table).journal_counts()):8.2f} ms')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark WorksTable against lists of OpenAlex dictionaries.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 50, 200, 1000], help='No. of works to test with.')
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        run(size)
@@ -0,0 +1,349 @@
+"""
+Load test of the dashboard: N concurrent sessions driven through Streamlit's AppTest,
+against a local stub of OpenAlex and DR-NTU (see benchmarks/stub_upstreams.py).
+
+Each session opens the faculty list, searches, goes to the next page, opens a profile,
+shows its Publications and Collaborated Authors sections and clicks "Load collaborated works".
+The profile is opened with the selected faculty in session state, as AppTest cannot follow switch_page.
+
+Reports throughput, p50/p95/p99 rerun latency (overall and per step), time to first profile content,
+upstream request counts and RSS growth.
+Run from the repository root, eg.
+    python -m benchmarks.load_test --sessions 20 --latency-ms 100 --save-baseline load_baseline.json
+    python -m benchmarks.load_test --sessions 20 --latency-ms 100 --baseline load_baseline.json
+With --baseline, the exit code is 1 if a result is worse than the baseline by more than --tolerance.
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+import numpy as np
+
+# Results compared with the baseline, and whether a higher value is better
+COMPARED_RESULTS = {
+    'throughput_reruns_per_second': True,
+    'latency_ms.p50': False,
+    'latency_ms.p95': False,
+    'latency_ms.p99': False,
+    'profile_first_content_ms.p95': False,
+    'upstream_requests_per_session': False,
+    'rss_growth_mb': False,
+}
+
+
+def get_rss_mb():
+    """
+    Return the resident set size of the process in MB.
+    """
+
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+
+    # Peak RSS where /proc is not available (kilobytes on Linux, bytes on macOS)
+    import resource
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss / (1024 * 1024) if sys.platform == 'darwin' else max_rss / 1024
+
+
+def use_shared_runtime():
+    """
+    Make all AppTest runs use one mock Streamlit Runtime, like the sessions of one server.
+    AppTest installs a new mock Runtime for each run and removes it when the run ends,
+    which breaks the other runs when sessions run at the same time.
+
+    Runs also share one cache of compiled scripts, like a server. Otherwise each run compiles its page again,
+    and compiling in several threads at the same time can fail in Python 3.11
+    ('AST constructor recursion depth mismatch'), leaving the run without any element.
+    """
+
+    from unittest.mock import MagicMock
+
+    import streamlit.testing.v1.local_script_runner as local_script_runner
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+
+    runtime = MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage('/mock/media'))
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+
+    Runtime.instance = classmethod(lambda cls: runtime)
+    Runtime.exists = classmethod(lambda cls: True)
+
+    script_cache = ScriptCache()
+    local_script_runner.ScriptCache = lambda: script_cache
+
+
+def read_containers():
+    """
+    Make AppTest read the elements in st.container() blocks, eg. the parts of the profile sections.
+    The AppTest of Streamlit 1.28 fails on these blocks, as their block proto has no type.
+    """
+
+    import streamlit.testing.v1.element_tree as element_tree
+
+    block_init = element_tree.Block.__init__
+
+    def init(self, proto, root):
+        # Read as a block of unknown type, like the blocks AppTest adds for the path of an element
+        block_init(self, proto if proto is not None and proto.WhichOneof('type') is not None else None, root)
+
+    element_tree.Block.__init__ = init
+
+
+def run_session(session_index, faculty_list, timeout, record):
+    """
+    Run the steps of one simulated user, recording the time of each rerun with record(step, seconds, error).
+
+    Input:
+    - session_index (int): Index of the session, used to pick the faculty and search term.
+    - faculty_list ( List(Faculty) ): Faculty of the roster.
+    - timeout (float): Max no. of seconds of each rerun.
+    - record (function): Called after each rerun.
+    """
+
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(session_index)
+
+    def timed(step, app_test, action):
+        start_time = time.perf_counter()
+        try:
+            action()
+        except KeyError as e:
+            # AppTest reads the query string of the SHUTDOWN event after the run, which can be missing
+            # when runs overlap. The run itself has finished and its elements are set.
+            if e.args != ('client_state',):
+                record(step, time.perf_counter() - start_time, repr(e))
+                return
+        except Exception as e:
+            record(step, time.perf_counter() - start_time, repr(e))
+            return
+
+        error = app_test.exception[0].value if len(app_test.exception) > 0 else None
+        record(step, time.perf_counter() - start_time, error)
+
+    # Faculty list: first render, search, clear the search, filter by interest and go to the next page
+    list_app = AppTest.from_file('Faculty_List.py', default_timeout=timeout)
+    timed('list.first_render', list_app, list_app.run)
+
+    faculty = rng.choice(faculty_list)
+    search_term = faculty.name.split()[0].lower()
+    timed('list.search', list_app, lambda: list_app.text_input[0].input(search_term).run())
+    timed('list.clear_search', list_app, lambda: list_app.text_input[0].input('').run())
+    timed('list.filter_interest', list_app, lambda: list_app.multiselect[0].set_value(list(faculty.interests[:1])).run())
+    timed('list.clear_interest', list_app, lambda: list_app.multiselect[0].set_value([]).run())
+    timed('list.next_page', list_app, lambda: [button for button in list_app.button if button.label == 'Next'][0].click().run())
+
+    # Profile of the searched faculty
+    profile_app = AppTest.from_file('pages/faculty_profile.py', default_timeout=timeout)
+    profile_app.session_state['selected_faculty'] = faculty
+    profile_app.session_state['faculty_api_id'] = None
+    profile_app.session_state['retrieve_method'] = None
+    timed('profile.first_render', profile_app, profile_app.run)
+
+    for section in ['Publications', 'Collaborated Authors']:
+        profile_app.session_state['profile_section'] = section
+        timed('profile.' + section.lower().replace(' ', '_'), profile_app, profile_app.run)
+
+    collab_buttons = [button for button in profile_app.button if button.label == 'Load collaborated works']
+    if len(collab_buttons) > 0:
+        timed('profile.load_collaborated_works', profile_app, lambda: collab_buttons[0].click().run())
+
+
+def percentiles_ms(seconds):
+    # p50, p95 and p99 of a list of durations, in milliseconds
+    if len(seconds) == 0:
+        return {'p50': None, 'p95': None, 'p99': None}
+    values = np.percentile(np.array(seconds) * 1000, [50, 95, 99])
+    return {'p50': round(float(values[0]), 1), 'p95': round(float(values[1]), 1), 'p99': round(float(values[2]), 1)}
+
+
+def run_load_test(sessions, concurrency, latency_ms, roster_csv, timeout):
+    """
+    Run the load test and return its results.
+
+    Input:
+    - sessions (int): No. of simulated sessions.
+    - concurrency (int): No. of sessions running at the same time.
+    - latency_ms (float): Median latency of the stub upstreams.
+    - roster_csv (string): Faculty csv used by the stub.
+    - timeout (float): Max no. of seconds of each rerun.
+
+    Output:
+    - results (Dict): Flat dictionary of result name to value.
+    """
+
+    from benchmarks.stub_upstreams import StubUpstreams
+
+    stub = StubUpstreams(roster_csv, latency_ms).start()
+
+    # Must be set before the app modules are imported, as they read the base URLs at import time
+    os.environ['OPENALEX_BASE_URL'] = stub.openalex_url
+    os.environ['DRNTU_BASE_URL'] = stub.drntu_url
+
+    # Start from an empty DR-NTU page store and author store, so that runs can be compared
+    store_dir = tempfile.mkdtemp()
+    os.environ['DASHBOARD_DRNTU_PAGE_STORE'] = os.path.join(store_dir, 'drntu_pages.sqlite')
+    os.environ['DASHBOARD_AUTHOR_STORE'] = os.path.join(store_dir, 'authors.sqlite')
+
+    import functions.metrics as metrics
+    from functions.faculty import Faculty
+    import pandas as pd
+
+    use_shared_runtime()
+    read_containers()
+
+    # Streamlit logs a warning for every st call made outside a script run, eg. by the load test threads
+    logging.getLogger('streamlit.runtime.scriptrunner.script_run_context').addFilter(
+        lambda log_record: 'missing ScriptRunContext' not in log_record.getMessage())
+
+    faculty_list = [Faculty.from_row(row) for _, row in pd.read_csv(roster_csv).iterrows()]
+
+    lock = threading.Lock()
+    durations = defaultdict(list)
+    errors = defaultdict(list)
+
+    def record(step, seconds, error):
+        with lock:
+            durations[step].append(seconds)
+            if error is not None:
+                errors[step].append(str(error))
+
+    next_session = [0]
+
+    def worker():
+        while True:
+            with lock:
+                session_index = next_session[0]
+                next_session[0] += 1
+            if session_index >= sessions:
+                return
+            run_session(session_index, faculty_list, timeout, record)
+
+    rss_before = get_rss_mb()
+    start_time = time.perf_counter()
+
+    threads = [threading.Thread(target=worker) for _ in range(min(concurrency, sessions))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    wall_seconds = time.perf_counter() - start_time
+    rss_after = get_rss_mb()
+    upstream_counts = stub.counts()
+    stub.stop()
+
+    all_durations = [seconds for step_durations in durations.values() for seconds in step_durations]
+
+    results = {
+        'sessions': sessions,
+        'concurrency': concurrency,
+        'stub_latency_ms': latency_ms,
+        'wall_seconds': round(wall_seconds, 2),
+        'reruns': len(all_durations),
+        'errors': sum(len(step_errors) for step_errors in errors.values()),
+        'throughput_reruns_per_second': round(len(all_durations) / wall_seconds, 2),
+        'upstream_requests.openalex': upstream_counts.get('openalex', 0),
+        'upstream_requests.drntu': upstream_counts.get('drntu', 0),
+        'upstream_requests_per_session': round(sum(upstream_counts.values()) / sessions, 1),
+        'coalesced_requests': metrics.get_count('openalex_single_flight.coalesced'),
+        'rss_before_mb': round(rss_before, 1),
+        'rss_after_mb': round(rss_after, 1),
+        'rss_growth_mb': round(rss_after - rss_before, 1),
+    }
+
+    for name, value in percentiles_ms(all_durations).items():
+        results[f'latency_ms.{name}'] = value
+
+    # Time from the start of a profile rerun to its first section content, measured by the page
+    for q in [50, 95]:
+        value = metrics.percentile('profile_rerun.first_content_ms', q)
+        results[f'profile_first_content_ms.p{q}'] = None if value is None else round(value, 1)
+
+    for step in sorted(durations):
+        for name, value in percentiles_ms(durations[step]).items():
+            results[f'step.{step}.{name}'] = value
+        if len(errors[step]) > 0:
+            results[f'step.{step}.errors'] = len(errors[step])
+            results[f'step.{step}.first_error'] = errors[step][0][:200]
+
+    return results
+
+
+def compare_with_baseline(results, baseline, tolerance):
+    """
+    Return the results that are worse than the baseline by more than tolerance.
+
+    Input:
+    - results (Dict): Results of this run.
+    - baseline (Dict): Results of the baseline run.
+    - tolerance (float): Allowed relative change, eg. 0.2 for 20%.
+
+    Output:
+    - regressions ( List(string) ): Description of each regression.
+    """
+
+    regressions = []
+
+    for name, higher_is_better in COMPARED_RESULTS.items():
+        value, baseline_value = results.get(name), baseline.get(name)
+        if value is None or baseline_value is None:
+            continue
+
+        # Small absolute values (eg. RSS growth near 0) are compared against a floor of 1
+        scale = max(abs(baseline_value), 1)
+        change = (value - baseline_value) / scale
+        is_regression = change < -tolerance if higher_is_better else change > tolerance
+
+        print(f'{name:35} {baseline_value:>10} -> {value:>10} ({change:+.0%}){"  REGRESSION" if is_regression else ""}')
+        if is_regression:
+            regressions.append(f'{name}: {baseline_value} -> {value}')
+
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Load test the dashboard with concurrent simulated sessions.')
+    parser.add_argument('--sessions', type=int, default=10, help='No. of simulated sessions.')
+    parser.add_argument('--concurrency', type=int, help='No. of sessions at the same time. Defaults to --sessions.')
+    parser.add_argument('--latency-ms', type=float, default=100, help='Median latency of the stub upstreams.')
+    parser.add_argument('--csv', default='Takesawa_Saori_updated.csv', help='Roster csv used by the stub.')
+    parser.add_argument('--timeout', type=float, default=120, help='Max no. of seconds of each rerun.')
+    parser.add_argument('--out', help='Write the results to this json file.')
+    parser.add_argument('--save-baseline', help='Write the results to this json file, to compare later runs with.')
+    parser.add_argument('--baseline', help='Compare the results with this baseline json file.')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed relative regression against the baseline.')
+    args = parser.parse_args()
+
+    results = run_load_test(args.sessions, args.concurrency or args.sessions, args.latency_ms, args.csv, args.timeout)
+
+    print(json.dumps(results, indent=2))
+
+    for path in (args.out, args.save_baseline):
+        if path:
+            with open(path, 'w') as f:
+                json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare_with_baseline(results, json.load(f), args.tolerance)
+        if len(regressions) > 0:
+            print(f'{len(regressions)} regression(s) against {args.baseline}')
+            sys.exit(1)
@@ -0,0 +1,125 @@
+"""
+Startup profile of the dashboard: time to first render of a page in a fresh Python process,
+and the modules imported by that render, slowest first.
+
+The page is run once with Streamlit's AppTest in a child process started with 'python -X importtime'.
+Streamlit itself is imported before the page runs, so only the imports made during the render are reported,
+including those of threads started by the page (eg. the cache warmer).
+Run from the repository root, eg.
+    python -m benchmarks.startup_profile
+    python -m benchmarks.startup_profile --page pages/faculty_profile.py --top 30
+With --budget-ms, the exit code is 1 if the first render takes longer than the budget.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# Printed to stderr by the child process between importing Streamlit and running the page
+MARKER = '--- first render ---'
+
+# Script of the child process. Prints the results as json on the last line of stdout.
+CHILD_SCRIPT = '''
+import json, sys, time
+start_time = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+import pandas
+streamlit_ms = (time.perf_counter() - start_time) * 1000
+print({marker!r}, file=sys.stderr, flush=True)
+start_time = time.perf_counter()
+app_test = AppTest.from_file({page!r}, default_timeout=120).run()
+render_ms = (time.perf_counter() - start_time) * 1000
+errors = [str(exception.value) for exception in app_test.exception]
+print(json.dumps({{'streamlit_import_ms': streamlit_ms, 'first_render_ms': render_ms, 'errors': errors}}))
+'''
+
+
+def parse_importtime(stderr):
+    """
+    Return the modules imported after MARKER in the output of 'python -X importtime'.
+
+    Input:
+    - stderr (string): stderr of the child process.
+
+    Output:
+    - modules ( List(Tuple(string, float, int)) ): Name, cumulative import time in ms and nesting depth
+                                                  of each imported module, in import order.
+    """
+
+    modules = []
+    lines = stderr.splitlines()
+
+    if MARKER in lines:
+        lines = lines[lines.index(MARKER) + 1:]
+
+    for line in lines:
+        # eg. 'import time:       120 |       4567 |   functions.dr_ntu_utils'
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        modules.append((name.strip(), int(cumulative_us) / 1000, depth))
+
+    return modules
+
+
+def profile_startup(page):
+    """
+    Run page once in a fresh Python process and return its startup profile.
+
+    Input:
+    - page (string): Path of the Streamlit page, eg. 'Faculty_List.py'.
+
+    Output:
+    - results (Dict): 'streamlit_import_ms', 'first_render_ms', 'errors', 'page_import_ms' (total import time
+                      of the modules imported by the page) and 'modules' (top level imports of the page,
+                      as [name, ms], slowest first).
+    """
+
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', CHILD_SCRIPT.format(marker=MARKER, page=page)],
+                             capture_output=True, text=True, env=dict(os.environ, PYTHONPATH=os.getcwd()))
+
+    if process.returncode != 0:
+        raise RuntimeError(f'Startup profile of {page} failed:\n{process.stderr[-2000:]}')
+
+    results = json.loads(process.stdout.strip().splitlines()[-1])
+
+    # Only the top level imports, the nested ones are included in their cumulative time
+    modules = [(name, ms) for name, ms, depth in parse_importtime(process.stderr) if depth == 0]
+    results['page_import_ms'] = sum(ms for _, ms in modules)
+    results['modules'] = sorted(modules, key=lambda module: -module[1])
+
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Measure the time to first render of a dashboard page.')
+    parser.add_argument('--page', default='Faculty_List.py', help='Streamlit page to run.')
+    parser.add_argument('--runs', type=int, default=3, help='No. of fresh processes to run. The median run is reported.')
+    parser.add_argument('--top', type=int, default=15, help='No. of slowest imports to show.')
+    parser.add_argument('--budget-ms', type=float, help='Max first render time in ms.')
+    parser.add_argument('--out', help='Write the results to this json file.')
+    args = parser.parse_args()
+
+    runs = sorted((profile_startup(args.page) for _ in range(args.runs)), key=lambda run: run['first_render_ms'])
+    results = runs[len(runs) // 2]
+
+    print(f'{args.page}: first render {results["first_render_ms"]:.0f} ms '
+          f'(imports {results["page_import_ms"]:.0f} ms), Streamlit import {results["streamlit_import_ms"]:.0f} ms')
+    for name, ms in results['modules'][:args.top]:
+        print(f'{ms:>9.1f} ms  {name}')
+    for error in results['errors']:
+        print(f'Error: {error}')
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if len(results['errors']) > 0:
+        sys.exit(1)
+
+    if args.budget_ms is not None and results['first_render_ms'] > args.budget_ms:
+        print(f'First render of {args.page} took {results["first_render_ms"]:.0f} ms, over the budget of {args.budget_ms:.0f} ms')
+        sys.exit(1)
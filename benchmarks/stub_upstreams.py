@@ -0,0 +1,352 @@
+"""
+Local stub of the OpenAlex API and DR-NTU profile pages, used by the load test.
+
+Responses are generated from the roster csv, so every faculty can be found by ORCID or by the DOIs
+on their stub DR-NTU page, and has works, co-authors and journals. Each request waits for a random
+latency (log-normal around latency_ms) before answering, like the real services.
+DR-NTU pages have an ETag and Last-Modified, and conditional requests for unchanged pages get 304 Not Modified.
+
+Run on its own to try the app against it:
+    python -m benchmarks.stub_upstreams --port 8765
+    OPENALEX_BASE_URL=http://127.0.0.1:8765/openalex DRNTU_BASE_URL=http://127.0.0.1:8765/drntu streamlit run Faculty_List.py
+"""
+
+import argparse
+import hashlib
+from email.utils import formatdate
+import json
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote_plus, urlparse
+
+import pandas as pd
+
+from functions.faculty import Faculty
+
+# No. of works of each stub author
+WORKS_PER_AUTHOR = 80
+
+# Every PREPRINT_EVERY-th work also has an arXiv preprint version, listed as a separate work like in OpenAlex
+PREPRINT_EVERY = 5
+
+# No. of DOIs listed on each stub DR-NTU publication page
+DOIS_PER_PAGE = 5
+
+# Site of the DR-NTU profile pictures, left out of the src of the stub pictures like on DR-NTU
+DRNTU_SITE = 'https://dr.ntu.edu.sg'
+
+# Last-Modified of the stub DR-NTU pages
+DRNTU_LAST_MODIFIED = formatdate(1696896000, usegmt=True)
+
+# Journals and co-authors that the stub works are spread over
+JOURNALS = [f'Journal of Computing {i}' for i in range(30)]
+COAUTHORS = [f'Coauthor {i}' for i in range(400)]
+
+
+def get_rng(*keys):
+    # Random generator seeded by keys, so the same request always gets the same response
+    seed = hashlib.sha1('/'.join(str(key) for key in keys).encode('utf-8')).hexdigest()
+    return random.Random(int(seed[:16], 16))
+
+
+class StubData:
+    """
+    Generates the OpenAlex and DR-NTU responses of the faculty in a roster.
+    """
+
+    def __init__(self, roster_csv):
+        self.faculty = [Faculty.from_row(row) for _, row in pd.read_csv(roster_csv).iterrows()]
+        self.by_id = {faculty.faculty_id: faculty for faculty in self.faculty}
+        self.by_orcid = {faculty.orcid_link: faculty for faculty in self.faculty if faculty.orcid_link}
+        self.by_name = {faculty.name.lower(): faculty for faculty in self.faculty}
+        self.by_author_id = {self.get_author_id(faculty): faculty for faculty in self.faculty}
+
+    def get_author_id(self, faculty):
+        return 'A5' + faculty.faculty_id[2:].zfill(8)
+
+    def get_author(self, faculty):
+        rng = get_rng('author', faculty.faculty_id)
+        return {
+            'id': 'https://openalex.org/' + self.get_author_id(faculty),
+            'orcid': faculty.orcid_link,
+            'display_name': faculty.name,
+            'works_count': WORKS_PER_AUTHOR,
+            'cited_by_count': rng.randrange(100, 5000),
+            'summary_stats': {'h_index': rng.randrange(5, 40), 'i10_index': rng.randrange(5, 80)},
+            'x_concepts': [
+                {'id': 'https://openalex.org/C41008148', 'display_name': 'Computer science', 'level': 0, 'score': 90.0},
+                {'id': 'https://openalex.org/C119857082', 'display_name': 'Machine learning', 'level': 1,
+                 'score': float(rng.randrange(40, 90))},
+                {'id': 'https://openalex.org/C31972630', 'display_name': 'Computer vision', 'level': 1,
+                 'score': float(rng.randrange(40, 90))},
+            ],
+            'counts_by_year': [{'year': year, 'works_count': rng.randrange(0, 20), 'cited_by_count': rng.randrange(0, 800)}
+                               for year in range(2023, 2013, -1)],
+            'updated_date': '2023-10-10T00:00:00.000000',
+        }
+
+    def get_coauthor(self, author_id):
+        # Author record of a co-author, from its id 'A9' + index in COAUTHORS
+        if not author_id.startswith('A9') or not author_id[2:].isdigit() or int(author_id[2:]) >= len(COAUTHORS):
+            return None
+        j = int(author_id[2:])
+        rng = get_rng('coauthor', j)
+        return {
+            'id': 'https://openalex.org/' + author_id,
+            'orcid': None,
+            'display_name': COAUTHORS[j],
+            'works_count': rng.randrange(5, 300),
+            'cited_by_count': rng.randrange(10, 20000),
+            'summary_stats': {'h_index': rng.randrange(1, 60), 'i10_index': rng.randrange(1, 100)},
+            'last_known_institution': {'id': 'https://openalex.org/I0', 'display_name': f'University {j % 40}'},
+        }
+
+    def get_authorship(self, author_id, name, orcid=None):
+        return {
+            'author_position': 'middle',
+            'author': {'id': 'https://openalex.org/' + author_id, 'display_name': name, 'orcid': orcid},
+            'institutions': [{'id': 'https://openalex.org/I172675005', 'display_name': 'Nanyang Technological University'}],
+        }
+
+    def get_works(self, faculty):
+        # All works of a faculty: the published works (most recent first), then the preprints.
+        # Published works are first so that their index is the one in their DOI.
+        author_id = self.get_author_id(faculty)
+        works = []
+
+        for i in range(WORKS_PER_AUTHOR):
+            rng = get_rng('work', faculty.faculty_id, i)
+            coauthors = rng.sample(range(len(COAUTHORS)), rng.randrange(1, 6))
+            authorships = [self.get_authorship('A9' + str(j).zfill(8), COAUTHORS[j]) for j in coauthors]
+            authorships.insert(rng.randrange(0, len(authorships) + 1),
+                               self.get_authorship(author_id, faculty.name, faculty.orcid_link))
+
+            works.append({
+                'id': f'https://openalex.org/W{author_id[1:]}{i:04d}',
+                'doi': f'https://doi.org/10.5555/{faculty.faculty_id}.{i}',
+                'title': f'Study {i} of {faculty.name} on {rng.choice(["learning", "networks", "graphics", "security"])}',
+                'publication_date': f'{2023 - i // 8}-{12 - i % 8:02d}-{1 + i % 28:02d}',
+                'cited_by_count': rng.randrange(0, 300),
+                'authorships': authorships,
+                'locations': [{'source': {'display_name': rng.choice(JOURNALS), 'type': 'journal'}},
+                              {'source': {'display_name': 'DR-NTU', 'type': 'repository'}}],
+                'counts_by_year': [],
+            })
+
+        for i in range(0, WORKS_PER_AUTHOR, PREPRINT_EVERY):
+            work = works[i]
+            year = int(work['publication_date'][:4])
+            works.append(dict(work,
+                              id=f'https://openalex.org/W{author_id[1:]}{len(works):04d}',
+                              doi=f'https://doi.org/10.48550/arxiv.{year % 100:02d}01.{int(author_id[2:]) % 10000:04d}{i:02d}',
+                              publication_date=f'{year - 1}{work["publication_date"][4:]}',
+                              cited_by_count=work['cited_by_count'] // 10,
+                              locations=[{'source': {'display_name': 'arXiv (Cornell University)', 'type': 'repository'}}]))
+
+        return works
+
+    def get_work(self, work_id):
+        # Work ids are 'W' + author id without the 'A' + 4 digit index
+        faculty = self.by_author_id.get('A' + work_id[1:-4])
+        if faculty is None:
+            return None
+        index = int(work_id[-4:])
+        works = self.get_works(faculty)
+        if index >= len(works):
+            return None
+        return works[index]
+
+    def openalex(self, path, query):
+        """
+        Return (status, body) of an OpenAlex request.
+        """
+
+        if path.startswith('/authors/'):
+            key = unquote_plus(path[len('/authors/'):])
+            faculty = self.by_orcid.get(key) or self.by_author_id.get(key)
+            return (200, self.get_author(faculty)) if faculty else (404, {'error': 'Not found'})
+
+        if path.startswith('/authors') and query.get('filter', [''])[0].startswith('openalex_id:'):
+            # Batch of authors, eg. 'openalex_id:A1|A2'
+            author_ids = query['filter'][0][len('openalex_id:'):].split('|')
+            authors = [self.get_author(self.by_author_id[author_id]) if author_id in self.by_author_id
+                       else self.get_coauthor(author_id) for author_id in author_ids]
+            authors = [author for author in authors if author is not None]
+            return 200, {'meta': {'count': len(authors)}, 'results': authors}
+
+        if path.startswith('/authors'):
+            faculty = self.by_name.get(query.get('search', [''])[0].lower())
+            return 200, {'meta': {'count': 1 if faculty else 0}, 'results': [self.get_author(faculty)] if faculty else []}
+
+        if path.startswith('/works/https://doi.org/'):
+            doi = path[len('/works/https://doi.org/'):]
+            faculty_id, _, index = doi.split('/')[-1].rpartition('.')
+            faculty = self.by_id.get(faculty_id)
+            return (200, self.get_works(faculty)[int(index)]) if faculty else (404, {'error': 'Not found'})
+
+        if path.startswith('/works/'):
+            work = self.get_work(path[len('/works/'):])
+            return (200, work) if work else (404, {'error': 'Not found'})
+
+        if path.startswith('/works'):
+            filter_value = query.get('filter', [''])[0]
+            if not filter_value.startswith('author.id:'):
+                return 200, {'meta': {'count': 0}, 'results': []}
+
+            # Filters separated by ',', eg. 'author.id:A1,primary_location.source.type:journal'
+            filters = dict(part.split(':', 1) for part in filter_value.split(','))
+            faculty = self.by_author_id.get(filters['author.id'])
+            works = self.get_works(faculty) if faculty else []
+
+            if 'primary_location.source.type' in filters:
+                works = [work for work in works
+                         if work['locations'][0]['source']['type'] == filters['primary_location.source.type']]
+
+            if query.get('group_by', [''])[0] == 'primary_location.source.id':
+                # Works counted by the venue of their first location, the most frequent first
+                counts = Counter(work['locations'][0]['source']['display_name'] for work in works)
+                groups = [{'key': 'https://openalex.org/S' + hashlib.sha1(name.encode('utf-8')).hexdigest()[:8],
+                           'key_display_name': name, 'count': count} for name, count in counts.most_common()]
+                return 200, {'meta': {'count': len(works), 'groups_count': len(groups)}, 'results': [], 'group_by': groups}
+
+            sort = query.get('sort', [''])[0]
+            if sort.startswith('cited_by_count'):
+                works = sorted(works, key=lambda work: work['cited_by_count'], reverse=sort.endswith(':desc'))
+            elif sort.startswith('publication_date'):
+                works = sorted(works, key=lambda work: work['publication_date'], reverse=sort.endswith(':desc'))
+
+            per_page = int(query.get('per-page', ['25'])[0])
+            page = int(query.get('page', ['1'])[0])
+            return 200, {'meta': {'count': len(works)}, 'results': works[(page - 1) * per_page:page * per_page]}
+
+        return 404, {'error': 'Not found'}
+
+    def drntu(self, path):
+        """
+        Return (status, html) of a DR-NTU request.
+        """
+
+        parts = path.strip('/').split('/')
+        faculty = self.by_id.get(parts[2]) if len(parts) >= 3 else None
+        if faculty is None:
+            return 404, '<html></html>'
+
+        if len(parts) >= 4 and parts[3] == 'selectedPublications.html':
+            citations = [f'{faculty.name}, Coauthor. (2020). "Study {i} of {faculty.name}". Journal, 1(1). '
+                         f'doi: 10.5555/{faculty.faculty_id}.{i}' for i in range(DOIS_PER_PAGE)]
+            return 200, ('<html><body><div id="facultyjournalDiv">\n<div>'
+                         + '<br/><br/>'.join(citations) + '</div></div></body></html>')
+
+        interests = ''.join(f'<span class="rkeyword">{interest}</span>' for interest in faculty.interests or ())
+        # Picture at the path of the roster's img_link, with its spaces unescaped as on DR-NTU
+        picture = (f'<img id="picture" src="{faculty.img_link.replace(DRNTU_SITE, "", 1).replace("%20", " ")}"/>'
+                   if faculty.img_link else '')
+        return 200, (f'<html><body>{picture}<div id="taxonomyDiv" class="dynaFieldValue">{interests}</div>'
+                     f'<div id="biographyDiv" class="dynaFieldValue"><p>{faculty.name} is a faculty member.</p></div>'
+                     '</body></html>')
+
+
+class StubUpstreams:
+    """
+    HTTP server answering OpenAlex requests under /openalex and DR-NTU requests under /drntu,
+    after a random latency. Requests are counted by upstream, see counts(),
+    and the DR-NTU requests answered with 304 Not Modified are counted in not_modified_count().
+    """
+
+    def __init__(self, roster_csv, latency_ms=100, latency_sigma=0.5, port=0, drntu_validators=True):
+        self.data = StubData(roster_csv)
+        self.drntu_validators = drntu_validators
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self._counts = Counter()
+        self._not_modified = 0
+        self._lock = threading.Lock()
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def openalex_url(self):
+        return f'http://127.0.0.1:{self.server.server_port}/openalex'
+
+    @property
+    def drntu_url(self):
+        return f'http://127.0.0.1:{self.server.server_port}/drntu'
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def counts(self):
+        with self._lock:
+            return dict(self._counts)
+
+    def not_modified_count(self):
+        with self._lock:
+            return self._not_modified
+
+    def handle(self, request):
+        url = urlparse(request.path)
+
+        if self.latency_ms > 0:
+            time.sleep(random.lognormvariate(0, self.latency_sigma) * self.latency_ms / 1000)
+
+        headers = {}
+
+        if url.path.startswith('/openalex'):
+            upstream = 'openalex'
+            status, body = self.data.openalex(url.path[len('/openalex'):], parse_qs(url.query))
+            content = json.dumps(body).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        else:
+            upstream = 'drntu'
+            status, body = self.data.drntu(url.path[len('/drntu'):])
+            content = body.encode('utf-8')
+            headers['Content-Type'] = 'text/html; charset=utf-8'
+            if status == 200 and self.drntu_validators:
+                headers['ETag'] = '"' + hashlib.sha1(content).hexdigest() + '"'
+                headers['Last-Modified'] = DRNTU_LAST_MODIFIED
+                if request.headers.get('If-None-Match') == headers['ETag']:
+                    status, content = 304, b''
+
+        with self._lock:
+            self._counts[upstream] += 1
+            if status == 304:
+                self._not_modified += 1
+
+        request.send_response(status)
+        for name, value in headers.items():
+            request.send_header(name, value)
+        request.send_header('Content-Length', str(len(content)))
+        request.end_headers()
+        request.wfile.write(content)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve stub OpenAlex and DR-NTU responses.')
+    parser.add_argument('--csv', default='Takesawa_Saori_updated.csv', help='Roster csv to generate the responses from.')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-ms', type=float, default=100, help='Median latency of each request.')
+    args = parser.parse_args()
+
+    stub = StubUpstreams(args.csv, args.latency_ms, port=args.port)
+    print(f'OPENALEX_BASE_URL={stub.openalex_url} DRNTU_BASE_URL={stub.drntu_url}')
+    stub.server.serve_forever()
@@ -0,0 +1,108 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import functions.metrics as metrics
+
+# SQLite file of the author records of OpenAlex (eg. collaborators of the faculty), shared by all faculty.
+# Kept across restarts, as the records change slowly.
+STORE_PATH = os.environ.get('DASHBOARD_AUTHOR_STORE', 'authors.sqlite')
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS authors (
+    author_id TEXT PRIMARY KEY,
+    record TEXT,
+    fetched_at REAL NOT NULL
+) WITHOUT ROWID;
+'''
+
+# Max no. of ids in one SQL query, under the SQLite limit of query parameters
+QUERY_CHUNK_SIZE = 500
+
+
+class AuthorStore:
+    """
+    Stores one record per OpenAlex author (name, ORCID, last known institution, h-index, works count, ...),
+    with the time it was fetched. An author not found in OpenAlex is stored with a None record,
+    so that it is not requested again until its entry is stale.
+    """
+
+    def __init__(self, path=STORE_PATH):
+        self.path = path
+        # Connections are shared by the threads of the Streamlit server
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._lock = threading.Lock()
+
+        with self._lock:
+            self._conn.executescript(SCHEMA)
+
+        metrics.register_gauges('author_store', self.stats)
+
+    def get_records(self, author_ids, max_age):
+        """
+        Return the stored records of the authors fetched at most max_age seconds ago.
+
+        Input:
+        - author_ids ( List(string) ): OpenAlex ids of the authors (eg. 'A5023888391').
+        - max_age (float): Max no. of seconds since a record was fetched.
+
+        Output:
+        - records ( Dict(string, Dict) ): Record of each author found in the store, by author id.
+                                          The record is None if the author was not found in OpenAlex.
+        """
+
+        min_fetched_at = time.time() - max_age
+        records = {}
+
+        with self._lock:
+            for start in range(0, len(author_ids), QUERY_CHUNK_SIZE):
+                chunk = author_ids[start:start + QUERY_CHUNK_SIZE]
+                rows = self._conn.execute(
+                    f'SELECT author_id, record FROM authors WHERE fetched_at >= ? AND author_id IN ({",".join("?" * len(chunk))})',
+                    [min_fetched_at] + chunk).fetchall()
+                for author_id, record in rows:
+                    records[author_id] = None if record is None else json.loads(record)
+
+        return records
+
+    def save_records(self, records):
+        """
+        Store the records of authors, replacing their previous records.
+
+        Input:
+        - records ( Dict(string, Dict) ): Record of each author, by author id, or None if not found in OpenAlex.
+        """
+
+        fetched_at = time.time()
+
+        with self._lock, self._conn:
+            self._conn.executemany('INSERT OR REPLACE INTO authors VALUES (?, ?, ?)',
+                                   [(author_id, None if record is None else json.dumps(record), fetched_at)
+                                    for author_id, record in records.items()])
+
+    def stats(self):
+        """
+        Return the no. of stored authors.
+        """
+
+        with self._lock:
+            return {'authors': self._conn.execute('SELECT COUNT(*) FROM authors').fetchone()[0]}
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_author_store():
+    """
+    Return the author store shared by all threads of the process, opened on first use.
+    """
+
+    global _store
+
+    with _store_lock:
+        if _store is None:
+            _store = AuthorStore()
+        return _store
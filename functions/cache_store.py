@@ -0,0 +1,298 @@
+import functools
+import hashlib
+import inspect
+import os
+import pickle
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import functions.metrics as metrics
+from functions.rate_limiter import SingleFlight
+
+# Max no. of bytes of cached results kept in memory by the process
+MAX_BYTES = int(os.environ.get('DASHBOARD_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+
+# Which entry to evict when the cache is full: 'lru' (least recently used) or 'lfu' (least frequently used)
+EVICTION_POLICY = os.environ.get('DASHBOARD_CACHE_POLICY', 'lru')
+
+# Returned by BoundedCache.get() when the key is not cached
+MISSING = object()
+
+
+def estimate_size(value, seen=None):
+    """
+    Return the approximate no. of bytes used by value, including the objects it contains.
+
+    Input:
+    - value (object): Value to measure.
+    - seen (set(int)): ids of objects already counted. Used for the recursion.
+
+    Output:
+    - size (int): Approximate size in bytes.
+    """
+
+    if seen is None:
+        seen = set()
+
+    # Count shared objects only once
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+
+    # Objects that know their own size, eg. numpy arrays or pyarrow Tables
+    if hasattr(value, 'nbytes') and isinstance(value.nbytes, int):
+        return value.nbytes
+
+    size = sys.getsizeof(value)
+
+    if isinstance(value, dict):
+        for key, item in value.items():
+            size += estimate_size(key, seen) + estimate_size(item, seen)
+
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        for item in value:
+            size += estimate_size(item, seen)
+
+    elif hasattr(value, '__slots__'):
+        for attribute in value.__slots__:
+            size += estimate_size(getattr(value, attribute, None), seen)
+
+    return size
+
+
+class BoundedCache:
+    """
+    In-memory cache that keeps the total approximate size of its values under max_bytes.
+
+    When adding a value would go over the budget, entries are evicted by policy
+    ('lru' or 'lfu') until it fits. A value larger than the whole budget is not cached.
+    Hits, misses and evictions are counted, see stats().
+    """
+
+    def __init__(self, max_bytes=MAX_BYTES, policy=EVICTION_POLICY):
+        if policy not in ('lru', 'lfu'):
+            raise ValueError(f"Unknown eviction policy '{policy}', expected 'lru' or 'lfu'")
+
+        self.max_bytes = max_bytes
+        self.policy = policy
+
+        # Key -> [value, size, expires_at, hit_count]. Ordered from least to most recently used.
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._size = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, key, default=MISSING):
+        """
+        Return the value cached for key, or default if it is not cached or has expired.
+
+        Input:
+        - key (string): Key of the value.
+        - default (object): Value to return when key is not cached.
+        """
+
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None or (entry[2] is not None and entry[2] <= time.time()):
+                if entry is not None:
+                    self._remove(key)
+                self._misses += 1
+                return default
+
+            self._hits += 1
+            entry[3] += 1
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def __contains__(self, key):
+        # True if key is cached and has not expired. Not counted as a hit or miss, and does not change the eviction order.
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and (entry[2] is None or entry[2] > time.time())
+
+    def set(self, key, value, ttl=None):
+        """
+        Cache value for key, evicting other entries if needed.
+
+        Input:
+        - key (string): Key of the value.
+        - value (object): Value to cache.
+        - ttl (float): No. of seconds the value is kept. If None, it is kept until evicted.
+        """
+
+        size = estimate_size(value)
+        expires_at = time.time() + ttl if ttl is not None else None
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            # Too big to ever fit
+            if size > self.max_bytes:
+                return
+
+            while self._size + size > self.max_bytes:
+                self._evict_one()
+
+            self._entries[key] = [value, size, expires_at, 0]
+            self._size += size
+
+    def clear(self):
+        """
+        Remove all cached values.
+        """
+
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self):
+        """
+        Return the size and hit/miss/eviction counts of the cache.
+
+        Output:
+        - stats (Dict): Dictionary with 'size_bytes', 'max_bytes', 'entries', 'hits',
+                        'misses', 'hit_rate' and 'evictions'.
+        """
+
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'size_bytes': self._size,
+                'max_bytes': self.max_bytes,
+                'entries': len(self._entries),
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': self._hits / lookups if lookups > 0 else None,
+                'evictions': self._evictions,
+            }
+
+    def _remove(self, key):
+        _, size, _, _ = self._entries.pop(key)
+        self._size -= size
+
+    def _evict_one(self):
+        if self.policy == 'lru':
+            key = next(iter(self._entries))
+        else:
+            # Least hits first, and least recently used among entries with the same no. of hits
+            key = min(self._entries, key=lambda k: self._entries[k][3])
+
+        self._remove(key)
+        self._evictions += 1
+
+
+# Shared by all the data-access functions of the process
+default_cache = BoundedCache()
+metrics.register_gauges('cache', default_cache.stats)
+
+# Identical calls of cached functions that missed the cache at the same time.
+# A caller with a render deadline waits for the shared call at most until its deadline.
+cache_single_flight = SingleFlight('cache_single_flight', 'cache')
+
+
+def get_stable_value(arg):
+    """
+    Return the value of arg used in a cache key.
+    Records with a cache_key() method (eg. Faculty) are replaced by their key,
+    so hashing them does not depend on their size or unrelated fields.
+
+    Input:
+    - arg (object): Argument of a cached function.
+    """
+
+    if hasattr(arg, 'cache_key'):
+        return arg.cache_key()
+
+    return arg
+
+
+def make_key(func, args, kwargs):
+    """
+    Return the cache key of a call to func.
+
+    Input:
+    - func (function): Function being called.
+    - args (tuple): Positional arguments of the call.
+    - kwargs (Dict): Keyword arguments of the call.
+
+    Output:
+    - key (string): Hash that is the same for calls with equal arguments.
+    """
+
+    args = tuple(get_stable_value(arg) for arg in args)
+    kwargs = sorted((name, get_stable_value(value)) for name, value in kwargs.items())
+
+    payload = pickle.dumps((func.__module__, func.__qualname__, args, kwargs))
+    return hashlib.sha1(payload).hexdigest()
+
+
+def get_key_function(func):
+    """
+    Return a function that gives the cache key of (args, kwargs) for a call to func.
+    Arguments are bound to the signature first, so that f(1, b=2) and f(1, 2) have the same key.
+
+    Input:
+    - func (function): Function being cached.
+    """
+
+    signature = inspect.signature(func)
+
+    def get_key(args, kwargs):
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        return make_key(func, bound.args, bound.kwargs)
+
+    return get_key
+
+
+def cached(ttl=None, cache=None):
+    """
+    Decorator that caches the results of a function in a BoundedCache.
+    Used instead of st.cache_data, which has no memory budget.
+
+    Unlike st.cache_data, which returned a copy to each caller, every caller (of every session) gets the same
+    cached object, so results must not be modified, eg. sort a copy of a cached list rather than the list itself.
+    Calls that miss the cache at the same time with the same arguments (eg. several sessions opening the same
+    faculty) share one call of the function, see rate_limiter.SingleFlight.
+
+    The decorated function also has cache (the BoundedCache used) and get_cache_key(*args, **kwargs),
+    eg. to check if the result of a call is still cached with get_cache_key(...) in cache.
+
+    Input:
+    - ttl (float): No. of seconds a result is kept. If None, it is kept until evicted.
+    - cache (BoundedCache): Cache to use. If None, default_cache is used.
+    """
+
+    def decorator(func):
+        get_key = get_key_function(func)
+        store = cache if cache is not None else default_cache
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = get_key(args, kwargs)
+
+            result = store.get(key)
+            if result is MISSING:
+                result = cache_single_flight.do(key, lambda: fetch(key, args, kwargs))
+
+            return result
+
+        def fetch(key, args, kwargs):
+            result = func(*args, **kwargs)
+            store.set(key, result, ttl)
+
+            return result
+
+        wrapper.cache = store
+        wrapper.get_cache_key = lambda *args, **kwargs: get_key(args, kwargs)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,164 @@
+import itertools
+import queue
+import threading
+import time
+
+import streamlit as st
+
+# Priority of warming requests (lower value is served first)
+PRIORITY_CLICK = 0      # Faculty whose profile was explicitly opened
+PRIORITY_VISIBLE = 1    # Faculty shown on the current list page
+PRIORITY_NEXT_PAGE = 2  # Faculty on the next list page, warmed speculatively
+
+# No. of background threads warming the caches
+MAX_WORKERS = 4
+
+# Max no. of speculative requests waiting in the queue.
+# Clicks are always accepted.
+MAX_QUEUE_SIZE = 200
+
+# No. of seconds a warmed faculty is not warmed again, unless its results were evicted from the cache
+WARM_TTL = 60 * 60
+
+
+def get_cache_entry(func, *args, **kwargs):
+    # Cache and key of the result of a call to a cached function, to check later if it is still cached
+    return func.cache, func.get_cache_key(*args, **kwargs)
+
+
+def warm_faculty(faculty):
+    """
+    Run the data functions used by the faculty profile page, so that their results are cached.
+    The arguments must be the same as the ones used in the profile page for the cache to be hit.
+
+    Input:
+    - faculty (Faculty): Faculty detail from the csv.
+
+    Output:
+    - cache_entries ( List(Tuple(BoundedCache, string)) ): Cache and key of the main results (the OpenAlex id,
+                                                           stats and recent works). The faculty is warmed again
+                                                           once one of them is no longer cached, eg. evicted.
+    """
+
+    # Imported here, so that the warmer thread pays for importing the API modules, not the first render
+    import functions.openalex_api_utils as api_utils
+
+    faculty_api_id, retrieve_method = api_utils.get_api_id_and_method(faculty)
+    cache_entries = [get_cache_entry(api_utils.get_api_id_and_method, faculty)]
+
+    # If faculty cannot be found in the API, there is nothing else to warm
+    if not retrieve_method:
+        return cache_entries
+
+    api_utils.get_author_stats(faculty, faculty_api_id)
+    recent_pub_list = api_utils.get_author_pubs_from_OpenAlexAPI(faculty_api_id, 50,
+                                                                 sort_by=['publication_date'],
+                                                                 sort_direction='desc')
+    api_utils.get_author_pubs_from_OpenAlexAPI(faculty_api_id, 10,
+                                               sort_by=['cited_by_count'],
+                                               sort_direction='desc')
+
+    # Author records of the collaborators shown, in one batched request
+    collab_info = api_utils.get_collab_info(faculty_api_id, recent_pub_list)
+    api_utils.get_author_records([collab[1] for collab in collab_info[:api_utils.TOP_COLLABORATORS]])
+
+    # Journals of all works, counted by OpenAlex
+    api_utils.get_venue_stats(faculty_api_id)
+
+    cache_entries.append(get_cache_entry(api_utils.get_author_stats, faculty, faculty_api_id))
+    cache_entries.append(get_cache_entry(api_utils.get_author_pubs_from_OpenAlexAPI, faculty_api_id, 50,
+                                         sort_by=['publication_date'], sort_direction='desc'))
+
+    return cache_entries
+
+
+class CacheWarmer:
+    """
+    Bounded pool of background threads that warm the profile caches of faculty members.
+
+    Requests are deduplicated by faculty, so the same faculty is only warmed once
+    even if many sessions are viewing the same list page. A faculty that is already queued
+    can be moved ahead by submitting it again with a higher priority (eg. when clicked).
+    """
+
+    def __init__(self, max_workers=MAX_WORKERS, max_queue_size=MAX_QUEUE_SIZE, warm_ttl=WARM_TTL):
+        self._queue = queue.PriorityQueue()
+        self._counter = itertools.count()  # Keeps submission order for requests of the same priority
+        self._lock = threading.Lock()
+        self._max_queue_size = max_queue_size
+        self._warm_ttl = warm_ttl
+
+        self._pending = {}      # Faculty key -> best priority waiting in the queue
+        self._running = set()   # Faculty keys being warmed
+        self._warmed = {}       # Faculty key -> (time it was last warmed, cache entries of warm_faculty())
+
+        for i in range(max_workers):
+            thread = threading.Thread(target=self._work, name=f'cache-warmer-{i}', daemon=True)
+            thread.start()
+
+    def submit(self, faculty, priority=PRIORITY_VISIBLE):
+        """
+        Queue a faculty to be warmed.
+        Return True if queued, False if it was skipped as it is already queued, running
+        or recently warmed (and its results are still cached).
+
+        Input:
+        - faculty (Faculty): Faculty detail from the csv.
+        - priority (int): Priority of the request. One of PRIORITY_CLICK, PRIORITY_VISIBLE or PRIORITY_NEXT_PAGE.
+        """
+
+        key = faculty.faculty_id
+
+        with self._lock:
+            if key in self._running:
+                return False
+
+            # Warmed again when its results were evicted from the cache, eg. when memory runs out
+            warmed_at, cache_entries = self._warmed.get(key, (float('-inf'), []))
+            if time.time() - warmed_at < self._warm_ttl and all(entry_key in cache for cache, entry_key in cache_entries):
+                return False
+
+            # Already waiting with the same or a higher priority
+            if key in self._pending and self._pending[key] <= priority:
+                return False
+
+            # Drop speculative requests when the queue is full
+            if len(self._pending) >= self._max_queue_size and priority > PRIORITY_CLICK:
+                return False
+
+            self._pending[key] = priority
+
+        self._queue.put((priority, next(self._counter), key, faculty))
+        return True
+
+    def _work(self):
+        while True:
+            priority, _, key, faculty = self._queue.get()
+
+            with self._lock:
+                # Skip requests that were superseded by one with a higher priority
+                if self._pending.get(key) != priority:
+                    continue
+
+                del self._pending[key]
+                self._running.add(key)
+
+            try:
+                cache_entries = warm_faculty(faculty)
+            except Exception:
+                # Warming is best effort, the profile page will retry when opened
+                cache_entries = None
+
+            with self._lock:
+                self._running.discard(key)
+                if cache_entries is not None:
+                    self._warmed[key] = (time.time(), cache_entries)
+
+
+@st.cache_resource
+def get_cache_warmer():
+    """
+    Return the cache warmer shared by all sessions.
+    """
+
+    return CacheWarmer()
@@ -0,0 +1,256 @@
+import os
+import threading
+import time
+
+import functions.metrics as metrics
+
+# Consecutive failures (errors or timeouts) after which the breaker of an upstream opens
+FAILURE_THRESHOLD = int(os.environ.get('CIRCUIT_BREAKER_FAILURES', 5))
+
+# No. of seconds an open breaker rejects calls before letting one trial call through
+RESET_SECONDS = float(os.environ.get('CIRCUIT_BREAKER_RESET_SECONDS', 30))
+
+# Max no. of seconds of a single upstream request
+REQUEST_TIMEOUT_SECONDS = float(os.environ.get('UPSTREAM_TIMEOUT_SECONDS', 10))
+
+# Max no. of seconds of upstream calls in one render of a page, see start_deadline()
+RENDER_DEADLINE_SECONDS = float(os.environ.get('RENDER_DEADLINE_SECONDS', 8))
+
+# Per-thread deadline of the current render. Each Streamlit session reruns its script in its own thread.
+_local = threading.local()
+
+
+class UpstreamUnavailableError(Exception):
+    """
+    Raised instead of waiting for an upstream service, when its breaker is open, the render deadline
+    is exhausted, or the request failed or timed out. Results are not cached when this is raised.
+    """
+
+    def __init__(self, upstream, reason):
+        super().__init__(f'{upstream}: {reason}')
+        self.upstream = upstream
+        self.reason = reason
+
+
+class CircuitOpenError(UpstreamUnavailableError):
+    pass
+
+
+class DeadlineExceededError(UpstreamUnavailableError):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker of an upstream service, shared by all threads of the process.
+
+    - Closed: calls are made. After failure_threshold consecutive failures, the breaker opens.
+    - Open: calls are rejected immediately with CircuitOpenError, for reset_seconds.
+    - Half open: one trial call is made. If it succeeds the breaker closes, else it opens again.
+
+    The state and no. of consecutive failures are reported to functions.metrics under name.
+    """
+
+    def __init__(self, name, failure_threshold=FAILURE_THRESHOLD, reset_seconds=RESET_SECONDS):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+
+        self._lock = threading.Lock()
+        self._state = 'closed'
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+
+        metrics.register_gauges(name, self.stats)
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state
+
+    def before_call(self):
+        """
+        Raise CircuitOpenError if the call must not be made.
+        """
+
+        with self._lock:
+            if self._state == 'open' and time.monotonic() - self._opened_at >= self.reset_seconds:
+                self._state = 'half_open'
+
+            # Only one trial call at a time while half open
+            if self._state == 'open' or (self._state == 'half_open' and self._trial_running):
+                rejected = True
+            else:
+                rejected = False
+                if self._state == 'half_open':
+                    self._trial_running = True
+
+        if rejected:
+            metrics.increment(f'{self.name}.rejected')
+            raise CircuitOpenError(self.name, 'not responding, try again later')
+
+    def record_success(self):
+        with self._lock:
+            self._state = 'closed'
+            self._failures = 0
+            self._trial_running = False
+
+    def record_failure(self):
+        metrics.increment(f'{self.name}.failures')
+
+        with self._lock:
+            self._failures += 1
+            is_opened = self._state != 'open' and (self._state == 'half_open' or self._failures >= self.failure_threshold)
+            if is_opened:
+                self._state = 'open'
+                self._opened_at = time.monotonic()
+            self._trial_running = False
+
+        if is_opened:
+            metrics.increment(f'{self.name}.opened')
+
+    def release_trial(self):
+        # Let another trial call through, when a trial call ended without telling if the upstream is back
+        with self._lock:
+            self._trial_running = False
+
+    def stats(self):
+        """
+        Return the state of the breaker and the no. of consecutive failures.
+        """
+
+        with self._lock:
+            return {'state': self._state, 'consecutive_failures': self._failures}
+
+
+def start_deadline(seconds=RENDER_DEADLINE_SECONDS):
+    """
+    Start the deadline of the current render. Upstream calls made by this thread after the deadline
+    raise DeadlineExceededError instead of being made, and requests are cut short at the deadline.
+
+    Input:
+    - seconds (float): No. of seconds from now.
+    """
+
+    _local.deadline = time.monotonic() + seconds
+    _local.skipped = 0
+
+
+def clear_deadline():
+    """
+    Remove the deadline of the current thread.
+    """
+
+    _local.deadline = None
+
+
+def get_deadline():
+    """
+    Return the deadline of the current thread (in time.monotonic() seconds), or None if it has no deadline.
+    """
+
+    return getattr(_local, 'deadline', None)
+
+
+def set_deadline(deadline):
+    """
+    Set the deadline of the current thread, eg. to the one of the render that started a background fetch.
+
+    Input:
+    - deadline (float): Deadline from get_deadline(), or None for no deadline.
+    """
+
+    _local.deadline = deadline
+    _local.skipped = 0
+
+
+def get_remaining_seconds():
+    """
+    Return the no. of seconds left before the deadline of the current thread, or None if it has no deadline.
+    """
+
+    deadline = get_deadline()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def get_skipped_calls():
+    """
+    Return the no. of upstream calls skipped by the current thread since start_deadline().
+    """
+
+    return getattr(_local, 'skipped', 0)
+
+
+def skip_call(upstream):
+    """
+    Count an upstream call skipped by the current thread, and return the DeadlineExceededError to raise.
+
+    Input:
+    - upstream (string): Name of the breaker of the upstream.
+    """
+
+    _local.skipped = get_skipped_calls() + 1
+    metrics.increment('render_deadline.skipped_calls')
+
+    return DeadlineExceededError(upstream, 'skipped, the page took too long to load')
+
+
+def call_upstream(breaker, request, is_failure=lambda e: True, limiter=None):
+    """
+    Return request(timeout), unless the breaker is open or the render deadline is exhausted.
+
+    Input:
+    - breaker (CircuitBreaker): Breaker of the upstream.
+    - request (function): Makes the request, with the max no. of seconds it may take as argument.
+    - is_failure (function): Return True if an exception raised by request counts as a failure of the upstream,
+                             eg. False for a 404 response. Other exceptions are raised as they are.
+    - limiter (TokenBucket): Rate limit of the upstream, see functions.rate_limiter. The wait for a token counts
+                             towards the render deadline, and the call is skipped if it would end after it.
+
+    Output:
+    - result: Return value of request.
+              UpstreamUnavailableError is raised if the call was not made, or failed.
+    """
+
+    remaining_seconds = get_remaining_seconds()
+
+    if remaining_seconds is not None and remaining_seconds <= 0:
+        raise skip_call(breaker.name)
+
+    breaker.before_call()
+
+    if limiter is not None:
+        # Skipped rather than queued for a token past the deadline
+        if limiter.acquire(remaining_seconds) is None:
+            breaker.release_trial()
+            raise skip_call(breaker.name)
+
+        # The request gets the time left after the wait
+        remaining_seconds = get_remaining_seconds()
+        if remaining_seconds is not None and remaining_seconds <= 0:
+            breaker.release_trial()
+            raise skip_call(breaker.name)
+
+    timeout = REQUEST_TIMEOUT_SECONDS if remaining_seconds is None else min(REQUEST_TIMEOUT_SECONDS, remaining_seconds)
+
+    try:
+        result = request(timeout)
+    except Exception as e:
+        if not is_failure(e):
+            breaker.record_success()
+            raise
+        # Cut short by the render deadline, which is not a failure of the upstream
+        if timeout < REQUEST_TIMEOUT_SECONDS and get_remaining_seconds() <= 0:
+            breaker.release_trial()
+            raise skip_call(breaker.name) from e
+        breaker.record_failure()
+        raise UpstreamUnavailableError(breaker.name, f'request failed ({e!r})') from e
+
+    breaker.record_success()
+
+    return result
+
+
+openalex_breaker = CircuitBreaker('openalex_breaker')
+drntu_breaker = CircuitBreaker('drntu_breaker')
@@ -0,0 +1,298 @@
+import argparse
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# Folder of the cube built by 'python -m functions.citation_cube build'
+CUBE_DIR = os.environ.get('DASHBOARD_CUBE_DIR', 'citation_cube')
+
+# Roster csv of the faculty added to the cube
+DEFAULT_ROSTER_CSV = 'Takesawa_Saori_updated.csv'
+
+# Metrics of the last axis of the cube, and their names in the charts
+METRICS = ['works_count', 'cited_by_count']
+METRIC_LABELS = {'works_count': 'No. of works', 'cited_by_count': 'No. of citations'}
+
+# First year of the cube. OpenAlex only gives the counts of the last 10 years or so.
+FIRST_YEAR = 2012
+
+# No. of faculty rows of a new cube. The file is doubled in size when it is full.
+INITIAL_CAPACITY = 64
+
+CUBE_FILE = 'cube.npy'
+INDEX_FILE = 'index.json'
+
+
+def counts_to_array(counts_by_year, first_year, last_year):
+    """
+    Return the counts_by_year of an OpenAlex author as a dense array.
+
+    Input:
+    - counts_by_year ( List(Dict) ): Dictionaries with 'year', 'works_count' and 'cited_by_count'.
+    - first_year (int): First year of the array.
+    - last_year (int): Last year of the array (included).
+
+    Output:
+    - counts (np.ndarray): Array of shape (no. of years, len(METRICS)). Years without counts are 0.
+    """
+
+    counts = np.zeros((last_year - first_year + 1, len(METRICS)), dtype=np.int32)
+
+    for entry in counts_by_year:
+        if first_year <= entry['year'] <= last_year:
+            counts[entry['year'] - first_year] = [entry.get(metric) or 0 for metric in METRICS]
+
+    return counts
+
+
+def counts_to_frame(counts_by_year):
+    """
+    Return the counts_by_year of an OpenAlex author as a DataFrame for st.line_chart.
+
+    Input:
+    - counts_by_year ( List(Dict) ): Dictionaries with 'year', 'works_count' and 'cited_by_count'.
+
+    Output:
+    - chart_data (pd.DataFrame): 'Year' (string) and one column per metric (see METRIC_LABELS),
+                                 one row per year from the first to the last year with counts.
+    """
+
+    if len(counts_by_year) == 0:
+        return pd.DataFrame(columns=['Year'] + list(METRIC_LABELS.values()))
+
+    years = [entry['year'] for entry in counts_by_year]
+    first_year, last_year = min(years), max(years)
+    counts = counts_to_array(counts_by_year, first_year, last_year)
+
+    chart_data = pd.DataFrame(counts, columns=list(METRIC_LABELS.values()))
+    chart_data.insert(0, 'Year', [str(year) for year in range(first_year, last_year + 1)])
+
+    return chart_data
+
+
+class CitationCube:
+    """
+    Dense faculty x year x metric array of the yearly work and citation counts of every faculty.
+
+    The array is kept in a .npy file and memory-mapped, with the faculty ids and years in a json index
+    next to it. Faculty are added or updated one at a time with update(), eg. while profiles are harvested.
+    Readers (writable=False) reopen the files when the index changes on disk.
+    """
+
+    def __init__(self, path=CUBE_DIR, writable=False):
+        self.path = path
+        self.writable = writable
+        self._lock = threading.Lock()
+
+        self._index_mtime = None
+        self._index = None
+        self._cube = None
+
+        if writable:
+            os.makedirs(path, exist_ok=True)
+            if not os.path.exists(os.path.join(path, INDEX_FILE)):
+                self._write(np.zeros((INITIAL_CAPACITY, datetime.now().year - FIRST_YEAR + 1, len(METRICS)), dtype=np.int32),
+                            {'first_year': FIRST_YEAR, 'faculty_ids': [], 'updated_at': {}})
+
+    @property
+    def faculty_ids(self):
+        with self._lock:
+            self._reload()
+            return list(self._index['faculty_ids'])
+
+    @property
+    def years(self):
+        with self._lock:
+            self._reload()
+            return list(range(self._index['first_year'], self._index['first_year'] + self._cube.shape[1]))
+
+    def update(self, faculty_id, counts_by_year):
+        """
+        Set the yearly counts of a faculty, adding the faculty (and new years) to the cube if needed.
+
+        Input:
+        - faculty_id (string): DR-NTU researcher id of the faculty (eg. 'rp00083').
+        - counts_by_year ( List(Dict) ): Dictionaries with 'year', 'works_count' and 'cited_by_count'.
+        """
+
+        if not self.writable:
+            raise ValueError('CitationCube was opened read-only')
+
+        with self._lock:
+            self._reload()
+            index = self._index
+            cube = self._cube
+
+            first_year = index['first_year']
+            last_year = max([first_year + cube.shape[1] - 1] + [entry['year'] for entry in counts_by_year])
+            is_new = faculty_id not in index['faculty_ids']
+
+            if is_new:
+                index['faculty_ids'].append(faculty_id)
+
+            # The file is rewritten only when the cube grows: a new faculty past the capacity, or a new year
+            capacity = cube.shape[0]
+            if len(index['faculty_ids']) > capacity or last_year - first_year + 1 > cube.shape[1]:
+                capacity = max(len(index['faculty_ids']), capacity * 2)
+                grown = np.zeros((capacity, last_year - first_year + 1, len(METRICS)), dtype=np.int32)
+                grown[:cube.shape[0], :cube.shape[1]] = cube
+                cube = grown
+
+            position = index['faculty_ids'].index(faculty_id)
+            index['updated_at'][faculty_id] = time.time()
+
+            if cube is self._cube:
+                cube[position] = counts_to_array(counts_by_year, first_year, last_year)
+                cube.flush()
+                self._write_index(index)
+            else:
+                cube[position] = counts_to_array(counts_by_year, first_year, last_year)
+                self._write(cube, index)
+
+    def slice(self, faculty_ids, start_year=None, end_year=None, metric=None):
+        """
+        Return the yearly counts of some faculty over a range of years.
+
+        Input:
+        - faculty_ids ( List(string) ): Faculty to return, in order. Faculty not in the cube get counts of 0.
+        - start_year (int): First year to return. If None, the first year of the cube.
+        - end_year (int): Last year to return (included). If None, the last year of the cube.
+        - metric (string): One of METRICS. If None, all metrics are returned.
+
+        Output:
+        - counts (np.ndarray): Array of shape (len(faculty_ids), no. of years, len(METRICS)),
+                               or (len(faculty_ids), no. of years) if metric is given.
+        """
+
+        with self._lock:
+            self._reload()
+            first_year = self._index['first_year']
+            cube = self._cube
+            positions = {faculty_id: i for i, faculty_id in enumerate(self._index['faculty_ids'])}
+
+        start = max(0, (start_year if start_year is not None else first_year) - first_year)
+        stop = min(cube.shape[1], (end_year if end_year is not None else first_year + cube.shape[1] - 1) - first_year + 1)
+        stop = max(start, stop)
+
+        rows = np.array([positions.get(faculty_id, -1) for faculty_id in faculty_ids], dtype=np.int64)
+        metrics_slice = slice(None) if metric is None else METRICS.index(metric)
+
+        # Fancy indexing copies only the rows asked for out of the memory-mapped file
+        counts = cube[np.maximum(rows, 0), start:stop, metrics_slice]
+        counts[rows < 0] = 0
+
+        return counts
+
+    def to_chart_frame(self, faculty_ids, labels, metric, start_year=None, end_year=None):
+        """
+        Return the yearly counts of some faculty as a DataFrame for st.line_chart, one column per faculty.
+
+        Input:
+        - faculty_ids ( List(string) ): Faculty to show.
+        - labels ( List(string) ): Column name of each faculty, eg. their names.
+        - metric (string): One of METRICS.
+        - start_year (int): First year to show. If None, the first year of the cube.
+        - end_year (int): Last year to show (included). If None, the last year of the cube.
+
+        Output:
+        - chart_data (pd.DataFrame): 'Year' (string) and one column per faculty.
+        """
+
+        counts = self.slice(faculty_ids, start_year, end_year, metric)
+        years = [year for year in self.years
+                 if (start_year is None or year >= start_year) and (end_year is None or year <= end_year)]
+
+        chart_data = pd.DataFrame(counts.T, columns=labels)
+        chart_data.insert(0, 'Year', [str(year) for year in years])
+
+        return chart_data
+
+    def _reload(self):
+        # Reopen the files if the index was changed (by this or another process). Must be called with the lock held.
+        index_path = os.path.join(self.path, INDEX_FILE)
+        mtime = os.stat(index_path).st_mtime_ns
+
+        if mtime != self._index_mtime:
+            with open(index_path) as f:
+                self._index = json.load(f)
+            self._cube = np.load(os.path.join(self.path, CUBE_FILE), mmap_mode='r+' if self.writable else 'r')
+            self._index_mtime = mtime
+
+    def _write(self, cube, index):
+        # Replace the cube file, then the index, so that readers never see an index larger than the cube
+        cube_path = os.path.join(self.path, CUBE_FILE)
+        np.save(cube_path + '.tmp.npy', cube)
+        os.replace(cube_path + '.tmp.npy', cube_path)
+        self._write_index(index)
+
+    def _write_index(self, index):
+        index_path = os.path.join(self.path, INDEX_FILE)
+        with open(index_path + '.tmp', 'w') as f:
+            json.dump(index, f)
+        os.replace(index_path + '.tmp', index_path)
+
+
+def fetch_counts_by_year(faculty, stage_times):
+    """
+    Return the yearly counts of a faculty from OpenAlex API, or None if they are not found in OpenAlex.
+    Run in the worker processes of functions.harvest.
+
+    Input:
+    - faculty (Faculty): Faculty detail from the csv.
+    - stage_times (StageTimes): Time taken by each stage.
+    """
+
+    # Imported here, so that reading the cube does not need the API modules
+    import functions.openalex_api_utils as api_utils
+
+    with stage_times.measure('api_id'):
+        faculty_api_id, retrieve_method = api_utils.get_api_id_and_method(faculty)
+    if not retrieve_method:
+        return None
+
+    with stage_times.measure('stats'):
+        return api_utils.get_author_stats(faculty, faculty_api_id)['counts_by_year']
+
+
+def build(roster_csv=DEFAULT_ROSTER_CSV, cube_dir=CUBE_DIR, processes=None, threads=None):
+    """
+    Add the yearly counts of every faculty in roster_csv to the cube, fetching them from OpenAlex API.
+    Counts are fetched by the worker processes of functions.harvest, and written to the cube in this process.
+
+    Input:
+    - roster_csv (string): Path of the faculty csv.
+    - cube_dir (string): Folder of the cube.
+    - processes (int): No. of worker processes. Default to harvest.PROCESSES.
+    - threads (int): No. of threads in each worker process. Default to harvest.THREADS_PER_PROCESS.
+    """
+
+    import functions.harvest as harvest
+    from functions.faculty import Faculty
+
+    cube = CitationCube(cube_dir, writable=True)
+    faculty_list = [Faculty.from_row(row) for _, row in pd.read_csv(roster_csv).iterrows()]
+
+    for i, result in enumerate(harvest.harvest(faculty_list, fetch_counts_by_year,
+                                               processes or harvest.PROCESSES, threads or harvest.THREADS_PER_PROCESS)):
+        # Failed faculty keep their previous counts, the rest of the roster is still built
+        not_found = not result['error'] and result['value'] is None
+        if result['value'] is not None:
+            cube.update(result['faculty'].faculty_id, result['value'])
+        print(harvest.format_progress(i, len(faculty_list), result, 'not found in OpenAlex' if not_found else None))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build the faculty x year citation cube.')
+    parser.add_argument('command', choices=['build'])
+    parser.add_argument('--csv', default=DEFAULT_ROSTER_CSV, help='Faculty csv to add to the cube.')
+    parser.add_argument('--out', default=CUBE_DIR, help='Folder of the cube.')
+    parser.add_argument('--processes', type=int, help='No. of worker processes fetching the counts.')
+    parser.add_argument('--threads', type=int, help='No. of threads in each worker process.')
+    args = parser.parse_args()
+
+    build(args.csv, args.out, args.processes, args.threads)
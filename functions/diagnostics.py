@@ -0,0 +1,71 @@
+import streamlit as st
+
+import functions.circuit_breaker as circuit_breaker
+import functions.metrics as metrics
+
+# Names of the upstream services shown to users
+UPSTREAM_NAMES = {'openalex_breaker': 'OpenAlex', 'drntu_breaker': 'DR-NTU'}
+
+
+def is_debug_enabled():
+    """
+    Return True if the page was opened with ?debug=1 in the URL.
+    """
+
+    return st.experimental_get_query_params().get('debug', ['0'])[0] == '1'
+
+
+def is_profile_requested():
+    """
+    Return True if the page was opened with ?profile=1 in the URL, to profile its reruns (see functions.profiler).
+    """
+
+    return st.experimental_get_query_params().get('profile', ['0'])[0] == '1'
+
+
+def render_profile_saved(base_path):
+    """
+    Show where the profile of this rerun was saved, when it was asked for with ?profile=1 or ?debug=1.
+
+    Input:
+    - base_path (string): Path of the saved files without their extension, or None if the rerun was not saved.
+    """
+
+    if base_path is not None and (is_profile_requested() or is_debug_enabled()):
+        st.caption(f'Profile of this rerun saved to {base_path}.*')
+
+
+def render_diagnostics():
+    """
+    Show the process metrics (cache size and hit rate, network calls, ...) in the sidebar.
+    Only shown when the page was opened with ?debug=1 in the URL.
+    """
+
+    if not is_debug_enabled():
+        return
+
+    with st.sidebar.expander('Diagnostics'):
+        st.json(metrics.snapshot())
+
+
+def render_upstream_status(error=None):
+    """
+    Show a warning for each upstream service whose circuit breaker is not closed,
+    and for the work skipped in this render, eg. as the render deadline was exhausted.
+
+    Input:
+    - error (UpstreamUnavailableError): Error that stopped the render, if any.
+    """
+
+    not_responding = [breaker.name for breaker in [circuit_breaker.openalex_breaker, circuit_breaker.drntu_breaker]
+                      if breaker.state != 'closed']
+
+    for name in not_responding:
+        st.warning(f'{UPSTREAM_NAMES[name]} is not responding. Cached data is shown where available.')
+
+    skipped_calls = circuit_breaker.get_skipped_calls()
+
+    if isinstance(error, circuit_breaker.DeadlineExceededError) or skipped_calls > 0:
+        st.info('Some data took too long to load and was skipped. Refresh the page in a few seconds to load it.')
+    elif error is not None and error.upstream not in not_responding:
+        st.warning(f'{UPSTREAM_NAMES.get(error.upstream, error.upstream)} could not be reached. Please try again later.')
@@ -0,0 +1,215 @@
+import re
+import unicodedata
+from functools import lru_cache
+
+# OpenAlex institution id of Nanyang Technological University
+NTU_INSTITUTION_ID = 'I172675005'
+
+# Minimum confidence (0 - 100) for a candidate to be accepted as the same author
+DEFAULT_THRESHOLD = 70
+
+# Confidence added when the candidate authorship is affiliated with NTU
+NTU_AFFILIATION_BONUS = 10
+
+# Name score is scaled by this factor when initials had to be expanded to match,
+# as "T. J. Cham" is weaker evidence than "Tat Jen Cham"
+INITIALS_PENALTY = 0.95
+
+
+@lru_cache(maxsize=4096)
+def name_tokens(name):
+    """
+    Return the normalized tokens of a person's name.
+    Diacritics and punctuation are removed, and the name is lowercased,
+    so that 'Tat-Jen Chàm' and 'tat jen cham' give the same tokens.
+
+    Input:
+    - name (string): Name of a person.
+
+    Output:
+    - tokens (tuple(string)): Tokens of the normalized name, in their original order.
+    """
+
+    if not isinstance(name, str):
+        return ()
+
+    # Split accented characters into base character + accent, then drop the accents
+    decomposed = unicodedata.normalize('NFKD', name)
+    stripped = ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+    # Treat hyphens, dots, commas and other punctuation as separators
+    cleaned = re.sub(r'[^\w\s]', ' ', stripped.lower())
+
+    return tuple(cleaned.split())
+
+
+@lru_cache(maxsize=4096)
+def normalize_name(name):
+    """
+    Return the order-independent normalized form of a person's name.
+    Tokens are sorted so that Asian (family name first) and Western
+    (family name last) orders give the same string.
+
+    Input:
+    - name (string): Name of a person.
+
+    Output:
+    - normalized_name (string): Sorted, normalized tokens joined by spaces.
+    """
+
+    return ' '.join(sorted(name_tokens(name)))
+
+
+def expand_initials(candidate_tokens, find_tokens):
+    """
+    Return candidate_tokens with initials replaced by the matching tokens of find_tokens.
+    Initials are only expanded when every full token of the candidate also appears in find_tokens,
+    eg. ('t', 'j', 'cham') is expanded to ('tat', 'jen', 'cham') when searching for 'Cham Tat Jen'.
+
+    Input:
+    - candidate_tokens (tuple(string)): Normalized tokens of the candidate name.
+    - find_tokens (tuple(string)): Normalized tokens of the name being searched for.
+
+    Output:
+    There will be two outputs wrapped in tuple: (tokens, expanded).
+    - tokens (tuple(string)): Candidate tokens, with initials expanded if possible.
+    - expanded (bool): True if any initial was expanded.
+    """
+
+    initials = [token for token in candidate_tokens if len(token) == 1]
+    full_tokens = [token for token in candidate_tokens if len(token) > 1]
+
+    # Nothing to expand, or the full tokens do not agree with the searched name
+    if len(initials) == 0 or not set(full_tokens) <= set(find_tokens):
+        return candidate_tokens, False
+
+    # Tokens of the searched name that are not yet used by the candidate
+    remaining = [token for token in find_tokens if token not in full_tokens]
+
+    expanded_tokens = list(full_tokens)
+    for initial in initials:
+        match = next((token for token in remaining if token[0] == initial), None)
+
+        # An initial that cannot be explained by the searched name
+        if match is None:
+            return candidate_tokens, False
+
+        remaining.remove(match)
+        expanded_tokens.append(match)
+
+    return tuple(expanded_tokens), True
+
+
+def score_names(find_name, candidate_names):
+    """
+    Return the similarity score (0 - 100) of find_name against every name in candidate_names.
+    All candidates are scored with a single rapidfuzz call.
+
+    Input:
+    - find_name (string): Name to search for.
+    - candidate_names (List(string)): Names to compare against.
+
+    Output:
+    - scores (List(float)): Similarity score of each candidate, in the order of candidate_names.
+    """
+
+    if len(candidate_names) == 0:
+        return []
+
+    find_tokens = name_tokens(find_name)
+
+    choices = []
+    penalties = []
+    for candidate in candidate_names:
+        tokens, expanded = expand_initials(name_tokens(candidate), find_tokens)
+        choices.append(' '.join(sorted(tokens)))
+        penalties.append(INITIALS_PENALTY if expanded else 1.0)
+
+    # Score every candidate against the searched name in one vectorized call
+    # Imported here, as it is only needed once a faculty is matched, not to render the faculty list
+    from rapidfuzz import fuzz, process
+
+    scores = process.cdist([normalize_name(find_name)], choices, scorer=fuzz.token_sort_ratio)[0]
+
+    return [float(score) * penalty for score, penalty in zip(scores, penalties)]
+
+
+def get_orcid_id(orcid):
+    """
+    Return the bare ORCID id (eg. '0000-0002-8740-634X') from an ORCID link or id.
+    Return None if orcid is not a string.
+
+    Input:
+    - orcid (string): ORCID link or id.
+    """
+
+    if not isinstance(orcid, str) or orcid == '':
+        return None
+
+    return orcid.rstrip('/').split('/')[-1].upper()
+
+
+def is_ntu_affiliated(authorship):
+    """
+    Return True if any institution of an OpenAlex authorship is NTU.
+
+    Input:
+    - authorship (Dict): Authorship details of a publication from OpenAlex API.
+    """
+
+    for institution in authorship.get('institutions') or []:
+        institution_id = institution.get('id') or ''
+        if institution_id.endswith(NTU_INSTITUTION_ID):
+            return True
+
+    return False
+
+
+def match_author(author_name, authorships, orcid=None, threshold=DEFAULT_THRESHOLD):
+    """
+    Return the index of the authorship (in authorships) that most likely belongs to author_name.
+
+    The confidence of each candidate is its name similarity, raised by an NTU affiliation.
+    A candidate with the same ORCID as the author is always accepted.
+
+    Input:
+    - author_name (string): Name of the author to search for.
+    - authorships (List(Dict)): Authorships of a publication from OpenAlex API.
+    - orcid (string): ORCID link or id of the author. If None, ORCID is not used.
+    - threshold (float): Minimum confidence (0 - 100) for a candidate to be accepted.
+
+    Output:
+    There will be two outputs wrapped in tuple: (index, confidence).
+    - index (int): Index of the matching authorship.
+                   If no candidate reaches threshold, return None.
+    - confidence (float): Confidence (0 - 100) of the match.
+                          If no candidate reaches threshold, return the best confidence found.
+    """
+
+    if len(authorships) == 0:
+        return None, 0.0
+
+    candidate_names = [authorship['author'].get('display_name') for authorship in authorships]
+    name_scores = score_names(author_name, candidate_names)
+
+    orcid_id = get_orcid_id(orcid)
+
+    best_index = None
+    best_confidence = 0.0
+    for index, authorship in enumerate(authorships):
+        # Same ORCID means the same person, no matter how the name is written
+        if orcid_id and get_orcid_id(authorship['author'].get('orcid')) == orcid_id:
+            return index, 100.0
+
+        confidence = name_scores[index]
+        if is_ntu_affiliated(authorship):
+            confidence = min(100.0, confidence + NTU_AFFILIATION_BONUS)
+
+        if confidence > best_confidence:
+            best_index = index
+            best_confidence = confidence
+
+    if best_confidence < threshold:
+        return None, best_confidence
+
+    return best_index, best_confidence
@@ -1,13 +1,130 @@
-import bs4 # imported to compare if certain bs4 object are a certain bs4 type
-from bs4 import BeautifulSoup
-import requests
+import hashlib
+import os
 import re
 
 from functions import utils
+from functions import metrics
+from functions import page_store
+from functions.cache_store import MISSING, cached
+from functions.circuit_breaker import call_upstream, drntu_breaker
+from functions.swr_cache import swr_cache
+
+# DR-NTU profiles rarely change, so cached results are served for up to HARD_TTL seconds,
+# and refreshed in the background once they are older than SOFT_TTL seconds
+SOFT_TTL = 60 * 60 * 24
+HARD_TTL = 60 * 60 * 24 * 30
+
+# Base URL of DR-NTU. Profile links from the csv are always written with DRNTU_URL,
+# which is replaced by DRNTU_BASE_URL when the request is sent, eg. to use a local stub in load tests.
+DRNTU_URL = 'https://dr.ntu.edu.sg'
+DRNTU_BASE_URL = os.environ.get('DRNTU_BASE_URL', DRNTU_URL)
+
+def get_page(link):
+    """
+    Return the current version of a DR-NTU page.
+    If the page was stored before (see functions.page_store), a conditional request is sent,
+    and the page is not downloaded again if it has not changed.
+    UpstreamUnavailableError is raised if DR-NTU is not responding, or the render deadline is exhausted.
+
+    Input:
+    - link (string): URL of the page.
+
+    Output:
+    There will be two outputs wrapped in tuple: (content_hash, html).
+    - content_hash (string): Hash of the content of the page.
+    - html (string): html of the page. None if the page has not changed since it was stored.
+    """
+
+    # Imported here, as it is not needed to render the faculty list
+    import requests
+
+    store = page_store.get_page_store()
+    stored = store.get_validators(link)
+
+    headers = {}
+    if stored is not None:
+        etag, last_modified, _ = stored
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+
+    def send(timeout):
+        metrics.record_network_call('drntu')
+        response = requests.get(link.replace(DRNTU_URL, DRNTU_BASE_URL, 1), headers=headers, timeout=timeout)
+        # Server errors count as failures of DR-NTU, missing pages do not
+        if response.status_code >= 500:
+            response.raise_for_status()
+        return response
+
+    response = call_upstream(drntu_breaker, send)
+
+    if response.status_code == 304 and stored is not None:
+        metrics.increment('drntu_pages.not_modified')
+        store.mark_checked(link)
+        return stored[2], None
 
-import streamlit as st
+    metrics.increment('drntu_pages.downloaded_bytes', len(response.content))
+    content_hash = hashlib.sha1(response.content).hexdigest()
+
+    # Missing pages are not stored, so they are requested in full again
+    if response.status_code == 200:
+        if stored is not None and stored[2] == content_hash:
+            # Servers that do not send validators still answer with the same content
+            metrics.increment('drntu_pages.unchanged')
+        store.save_page(link, response.headers.get('ETag'), response.headers.get('Last-Modified'), content_hash, response.text)
+
+    return content_hash, response.text
+
+def parse_html(html):
+    """
+    Return the BeautifulSoup object of a DR-NTU page.
+
+    Input:
+    - html (string): html of the page.
+    """
+
+    # Imported here, as bs4 and lxml are slow to import and not needed to render the faculty list
+    from bs4 import BeautifulSoup
+
+    return BeautifulSoup(html, 'lxml')
+
+def extract_from_page(link, name, extract):
+    """
+    Return a value extracted from a DR-NTU page.
+    If the page has not changed since the value was last extracted, the stored value is returned
+    without parsing the page.
 
-@st.cache_data
+    Input:
+    - link (string): URL of the page.
+    - name (string): Name of the extracted value, unique for the page, eg. 'interests'.
+    - extract (function): Function that returns the value from the BeautifulSoup object of the page.
+                          The value must be JSON serializable.
+
+    Output:
+    - value: Return value of extract.
+    """
+
+    content_hash, html = get_page(link)
+    store = page_store.get_page_store()
+
+    value = store.get_extracted(link, name, content_hash)
+    if value is not MISSING:
+        metrics.increment('drntu_pages.reused')
+        return value
+
+    # Not modified, but the value was never extracted from this version
+    if html is None:
+        html = store.get_html(link)
+
+    metrics.increment('drntu_pages.parsed')
+    value = extract(parse_html(html))
+    store.set_extracted(link, name, content_hash, value)
+
+    return value
+
+
+@swr_cache(SOFT_TTL, HARD_TTL)
 def get_research_interest_from_drNTU(drNTU_link):
     """
     Return the list of tags of the researcher in their DR-NTU page.
@@ -18,8 +135,13 @@ def get_research_interest_from_drNTU(drNTU_link):
     Output:
     - tag_list (List(string)) : List of research interest found on DR-NTU profile page of that faculty.
     """
-    soup_source = requests.get(drNTU_link).text
-    soup = BeautifulSoup(soup_source,'lxml')
+    return extract_from_page(drNTU_link, 'interests', extract_research_interest)
+
+
+def extract_research_interest(soup):
+    """
+    Return the list of tags of the researcher, from the BeautifulSoup object of their DR-NTU page.
+    """
 
     tag_list = []
 
@@ -31,6 +153,71 @@ def get_research_interest_from_drNTU(drNTU_link):
     return tag_list
 
 
+@swr_cache(SOFT_TTL, HARD_TTL)
+def get_bio_from_drNTU(drNTU_link):
+    """
+    Return the biography of the researcher in their DR-NTU page.
+
+    Input:
+    - drNTU_link (string): DR-NTU profile URL of a SCSE faculty.
+
+    Output:
+    - bio (string) : Biography found on DR-NTU profile page of that faculty.
+                     If the faculty has no biography, return None.
+    """
+    return extract_from_page(drNTU_link, 'bio', extract_bio)
+
+
+def extract_bio(soup):
+    """
+    Return the biography of the researcher, from the BeautifulSoup object of their DR-NTU page.
+    If the faculty has no biography, return None.
+    """
+
+    bio_div = soup.find('div', id='biographyDiv', class_='dynaFieldValue')
+
+    # If "Biography" section does not exist for this faculty
+    if not bio_div:
+        return None
+
+    bio = bio_div.get_text('\n', strip=True)
+
+    # If the section exists but is empty
+    if bio == '':
+        return None
+
+    return bio
+
+
+@swr_cache(SOFT_TTL, HARD_TTL)
+def get_image_link_from_drNTU(drNTU_link):
+    """
+    Return the link of the profile picture of the researcher in their DR-NTU page.
+
+    Input:
+    - drNTU_link (string): DR-NTU profile URL of a SCSE faculty.
+
+    Output:
+    - img_link (string) : URL of the picture. If the faculty has no picture, return None.
+    """
+    return extract_from_page(drNTU_link, 'img_link', extract_image_link)
+
+
+def extract_image_link(soup):
+    """
+    Return the link of the profile picture of the researcher, from the BeautifulSoup object of their DR-NTU page.
+    If the faculty has no picture, return None.
+    """
+
+    picture = soup.find('img', id='picture')
+
+    if picture is None or not picture.get('src'):
+        return None
+
+    # The src is relative to the site, and its file name may have spaces
+    return DRNTU_URL + picture['src'].replace(' ', '%20')
+
+
 # From Individual Assignment 1
 def get_cleaned_pub_list(unprocessed_pub_list):
     """
@@ -96,23 +283,35 @@ def get_cleaned_pub_list(unprocessed_pub_list):
     
     return cleaned_pub_list
 
-st.cache_resource
-def get_unprocessed_pub_list(drNTU_link):
+# Shared by get_doi_list_from_drNTU and get_pub_list_from_article,
+# and expires after SOFT_TTL so that their background refresh checks for the latest page
+@cached(SOFT_TTL)
+def get_pub_citations_from_drNTU(drNTU_link):
     """
-    Return publication details from DR-NTU faculty's profile in publication tab.
+    Return the cleaned publication citations in the publication tab of a DR-NTU faculty's profile.
 
     Input:
     -  drNTU_link (string): DR-NTU profile link (in publication tab) of a SCSE faculty.
 
+    Output:
+    - cleaned_pub_list (List(string)): Citations, see get_cleaned_pub_list.
+    """
+
+    return extract_from_page(drNTU_link+'/selectedPublications.html', 'citations',
+                             lambda soup: get_cleaned_pub_list(get_unprocessed_pub_list(soup)))
+
+def get_unprocessed_pub_list(soup):
+    """
+    Return publication details from DR-NTU faculty's profile in publication tab.
+
+    Input:
+    - soup (BeautifulSoup): Parsed publication tab of a DR-NTU profile.
+
     Output:
     - unprocessed_pub_list (list): List of publication details extracted by BeautifulSoup.
                                        It also contains elements that are tags, without any text.
     """
 
-    # print(drNTU_link+'/selectedPublications.html')
-    soup_source = requests.get(drNTU_link+'/selectedPublications.html').text
-    soup = BeautifulSoup(soup_source,'lxml')
-
     # If "Articles (Journal)" tab does not exist for this faculty,
     # return an empty list
     if not soup.find('div', id="facultyjournalDiv"):
@@ -123,7 +322,7 @@ def get_unprocessed_pub_list(drNTU_link):
 
     return unprocessed_pub_list
 
-@st.cache_data
+@swr_cache(SOFT_TTL, HARD_TTL)
 def get_doi_list_from_drNTU(drNTU_link):
     """
     Return the list of DOI of all publications written by the researcher, in their DR-NTU page.
@@ -137,11 +336,8 @@ def get_doi_list_from_drNTU(drNTU_link):
 
     doi_list = []
     
-    # Get publication list from the profile page, but unprocessed
-    unprocessed_pub_list = get_unprocessed_pub_list(drNTU_link)
-
-    # Get the processed version of the publication 
-    cleaned_pub_list = get_cleaned_pub_list(unprocessed_pub_list)
+    # Get the processed version of the publication, without parsing the page again if it has not changed
+    cleaned_pub_list = get_pub_citations_from_drNTU(drNTU_link)
 
     # Regex to extract DOI
     doi_pattern = r'doi:\s+(\S+)'
@@ -156,6 +352,7 @@ def get_doi_list_from_drNTU(drNTU_link):
 
 
 # Modified code from Assignment 1
+@swr_cache(SOFT_TTL, HARD_TTL)
 def get_pub_list_from_article(drNTU_link):
     """
     Return list of all publication with title only, from the "Articles (Journal)" tab if it exist
@@ -172,11 +369,8 @@ def get_pub_list_from_article(drNTU_link):
     # List to store list of publication title and year.
     pub_title_list = []
     
-    # Get publication list from the profile page, but unprocessed
-    unprocessed_pub_list = get_unprocessed_pub_list(drNTU_link)
-
-    # Get the processed version of the publication 
-    cleaned_pub_list = get_cleaned_pub_list(unprocessed_pub_list)
+    # Get the processed version of the publication, without parsing the page again if it has not changed
+    cleaned_pub_list = get_pub_citations_from_drNTU(drNTU_link)
     
     # Extract title and year from all the publications
     for pub in cleaned_pub_list:
@@ -0,0 +1,134 @@
+import ast
+
+import numpy as np
+
+
+def to_bitset(mask):
+    """
+    Return a bitset (int whose bit i is row i) from a boolean mask of the rows.
+
+    Input:
+    - mask (np.ndarray): Boolean mask, one value per row.
+    """
+
+    return int.from_bytes(np.packbits(np.asarray(mask, dtype=bool), bitorder='little').tobytes(), 'little')
+
+
+def parse_interests(value):
+    # Interests are stored in the csv as stringified lists, and missing values are nan
+    if isinstance(value, str):
+        return ast.literal_eval(value)
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return list(value)
+    return []
+
+
+class FacetIndex:
+    """
+    Index of the faculty list by interest tag and name, to filter the list with bitwise operations.
+
+    Each tag is mapped to a bitset of the rows (positions in the faculty data) having that tag.
+    Filters are combined as bitsets, and turned into row positions only for the page that is shown.
+    Built once per version of the faculty data (the snapshot bundle, or the csv file).
+    """
+
+    def __init__(self, names, interests):
+        """
+        Input:
+        - names ( List(string) ): Name of the faculty of each row.
+        - interests ( List(List(string)) ): Interest tags of the faculty of each row.
+        """
+
+        self.row_count = len(names)
+        self.all_rows = (1 << self.row_count) - 1
+        self.lower_names = [str(name).lower() for name in names]
+
+        self.tag_bits = {}
+        for row, tags in enumerate(interests):
+            for tag in set(tags):
+                self.tag_bits[tag] = self.tag_bits.get(tag, 0) | (1 << row)
+
+        # Tags by no. of faculty, then by name
+        self.tags = sorted(self.tag_bits, key=lambda tag: (-self.tag_bits[tag].bit_count(), tag))
+
+        # Row positions ordered by name, used to page through the results in name order
+        self.name_order = np.argsort(np.array([str(name) for name in names], dtype=object), kind='stable')
+
+    @classmethod
+    def from_frame(cls, faculty_data):
+        """
+        Return the index of the faculty data.
+
+        Input:
+        - faculty_data (pd.DataFrame): Faculty csv, with the 'Name' and 'Interests' columns.
+        """
+
+        return cls(faculty_data['Name'].tolist(), [parse_interests(value) for value in faculty_data['Interests']])
+
+    def match_name(self, search_term):
+        """
+        Return the bitset of the rows whose name contains search_term (case insensitive).
+
+        Input:
+        - search_term (string): Part of a name. All rows match an empty search term.
+        """
+
+        search_term = search_term.lower()
+
+        if not search_term:
+            return self.all_rows
+
+        return to_bitset([search_term in name for name in self.lower_names])
+
+    def match_tags(self, tags, match_all):
+        """
+        Return the bitset of the rows having all (match_all) or any of the tags.
+
+        Input:
+        - tags ( List(string) ): Selected interest tags. All rows match when no tag is selected.
+        - match_all (bool): True to keep rows with all the tags, False for rows with any of them.
+        """
+
+        if len(tags) == 0:
+            return self.all_rows
+
+        bits = self.all_rows if match_all else 0
+        for tag in tags:
+            tag_bits = self.tag_bits.get(tag, 0)
+            bits = bits & tag_bits if match_all else bits | tag_bits
+
+        return bits
+
+    def facet_counts(self, bits):
+        """
+        Return the no. of rows of bits having each tag, for the tags of at least one of these rows.
+
+        Input:
+        - bits (int): Bitset of the rows to count, eg. the rows matching the other filters.
+
+        Output:
+        - counts ( Dict(string, int) ): No. of rows by tag, most frequent first.
+        """
+
+        counts = {tag: (self.tag_bits[tag] & bits).bit_count() for tag in self.tags}
+        counts = {tag: count for tag, count in counts.items() if count > 0}
+
+        return dict(sorted(counts.items(), key=lambda item: -item[1]))
+
+    def to_positions(self, bits, descending=False):
+        """
+        Return the positions of the rows of bits, ordered by name.
+
+        Input:
+        - bits (int): Bitset of rows.
+        - descending (bool): True to order names from Z to A.
+
+        Output:
+        - positions (np.ndarray): Row positions, eg. for faculty_data.iloc[positions[start:end]].
+        """
+
+        mask = np.unpackbits(np.frombuffer(bits.to_bytes((self.row_count + 7) // 8, 'little'), dtype=np.uint8),
+                             count=self.row_count, bitorder='little').astype(bool)
+        order = self.name_order[::-1] if descending else self.name_order
+
+        return order[mask[order]]
@@ -0,0 +1,103 @@
+import ast
+import math
+import re
+
+# Column in the csv -> attribute of Faculty
+COLUMNS = {
+    'Name': 'name',
+    'Email': 'email',
+    'dr_ntu_link': 'dr_ntu_link',
+    'website_link': 'website_links',
+    'dblp_link': 'dblp_link',
+    'citations_all_num': 'citations_all_num',
+    'orcid_link': 'orcid_link',
+    'img_link': 'img_link',
+    'google_scholar_link': 'google_scholar_link',
+    'Interests': 'interests',
+}
+
+# Columns stored in the csv as stringified lists
+LIST_COLUMNS = ['website_link', 'Interests']
+
+
+def get_faculty_id(drNTU_link, email=None, name=None):
+    """
+    Return the DR-NTU researcher id (eg. 'rp00083') from a DR-NTU profile link.
+    Return drNTU_link itself if it has no researcher id, or the email (or else the name) if there is no link,
+    so that faculty without a DR-NTU link still have their own id.
+
+    Input:
+    - drNTU_link (string): DR-NTU profile URL of a SCSE faculty, or None if missing.
+    - email (string): Email of the faculty, or None if missing.
+    - name (string): Name of the faculty, or None if missing.
+    """
+
+    # Missing values can also be nan, when read from the csv by pandas
+    if not isinstance(drNTU_link, str):
+        return next((value for value in [email, name] if isinstance(value, str)), None)
+
+    match = re.search(r'/(rp\d+)', drNTU_link)
+
+    if match:
+        return match.group(1)
+
+    return drNTU_link
+
+
+class Faculty:
+    """
+    Compact record of one faculty member from the csv.
+
+    Used instead of the csv row (pd.Series) as the argument of cached functions and in session state.
+    Two records are equal, and hash the same, if they have the same faculty_id (the DR-NTU researcher id),
+    so cache entries are not invalidated when unrelated columns of the csv change.
+    Missing values are None, and list columns are parsed into tuples.
+    """
+
+    __slots__ = ('faculty_id',) + tuple(COLUMNS.values())
+
+    def __init__(self, faculty_id, **fields):
+        self.faculty_id = faculty_id
+
+        for attribute in COLUMNS.values():
+            setattr(self, attribute, fields.get(attribute))
+
+    @classmethod
+    def from_row(cls, row):
+        """
+        Return the Faculty record of a csv row.
+
+        Input:
+        - row (pd.Series): Faculty detail from the csv.
+        """
+
+        fields = {}
+        for column, attribute in COLUMNS.items():
+            value = row.get(column)
+
+            # Missing values are nan in pandas
+            if isinstance(value, float) and math.isnan(value):
+                value = None
+
+            if column in LIST_COLUMNS:
+                value = tuple(ast.literal_eval(value)) if value is not None else ()
+
+            fields[attribute] = value
+
+        return cls(get_faculty_id(fields['dr_ntu_link'], fields['email'], fields['name']), **fields)
+
+    def cache_key(self):
+        """
+        Return the value used to hash this record in caches.
+        """
+
+        return ('Faculty', self.faculty_id)
+
+    def __eq__(self, other):
+        return isinstance(other, Faculty) and self.faculty_id == other.faculty_id
+
+    def __hash__(self):
+        return hash(self.cache_key())
+
+    def __repr__(self):
+        return f'Faculty({self.faculty_id!r}, {self.name!r})'
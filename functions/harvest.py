@@ -0,0 +1,254 @@
+import multiprocessing
+import os
+import queue
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+# No. of worker processes computing profiles. Parsing and aggregation hold the GIL,
+# so the roster is spread over processes to use more than one core.
+PROCESSES = int(os.environ.get('HARVEST_PROCESSES', min(4, os.cpu_count() or 1)))
+
+# No. of threads of each worker process, which overlap the waits on OpenAlex and DR-NTU
+THREADS_PER_PROCESS = int(os.environ.get('HARVEST_THREADS', 8))
+
+# No. of times a faculty is tried again after OpenAlex or DR-NTU did not respond,
+# waiting RETRY_DELAY_SECONDS, then twice as long after each attempt (long enough for an open circuit to reset)
+MAX_RETRIES = int(os.environ.get('HARVEST_RETRIES', 3))
+RETRY_DELAY_SECONDS = float(os.environ.get('HARVEST_RETRY_DELAY_SECONDS', 5))
+
+
+class StageTimes:
+    """
+    No. of calls, wall time and CPU time of each stage of the work done for the faculty (eg. 'stats', 'venue_stats').
+    The CPU time is the time of the thread running the stage, so it is not counted twice when threads overlap.
+    Times of the same stage in different workers are added up with merge().
+    """
+
+    def __init__(self):
+        self.stages = {}  # Stage -> [calls, wall seconds, CPU seconds]
+
+    @contextmanager
+    def measure(self, stage):
+        """
+        Add the wall and CPU time of the block to stage, eg. with stage_times.measure('bio'): ...
+
+        Input:
+        - stage (string): Name of the stage.
+        """
+
+        start_time = time.perf_counter()
+        start_cpu_time = time.thread_time()
+
+        try:
+            yield
+        finally:
+            totals = self.stages.setdefault(stage, [0, 0.0, 0.0])
+            totals[0] += 1
+            totals[1] += time.perf_counter() - start_time
+            totals[2] += time.thread_time() - start_cpu_time
+
+    def merge(self, other):
+        """
+        Add the times of other (StageTimes) to these times.
+        """
+
+        for stage, (calls, wall_seconds, cpu_seconds) in other.stages.items():
+            totals = self.stages.setdefault(stage, [0, 0.0, 0.0])
+            totals[0] += calls
+            totals[1] += wall_seconds
+            totals[2] += cpu_seconds
+
+    @classmethod
+    def from_dict(cls, times):
+        """
+        Return the StageTimes of the output of to_dict(), eg. read from the manifest of a snapshot bundle.
+        """
+
+        stage_times = cls()
+        stage_times.stages = {stage: [stage_time['calls'], stage_time['wall_seconds'], stage_time['cpu_seconds']]
+                              for stage, stage_time in times.items()}
+
+        return stage_times
+
+    def to_dict(self):
+        """
+        Return the times of each stage, as {stage: {'calls', 'wall_seconds', 'cpu_seconds'}}.
+        """
+
+        return {stage: {'calls': calls, 'wall_seconds': round(wall_seconds, 3), 'cpu_seconds': round(cpu_seconds, 3)}
+                for stage, (calls, wall_seconds, cpu_seconds) in self.stages.items()}
+
+    def format_report(self):
+        """
+        Return the times of each stage as a table, with the share of the wall time spent on the CPU.
+        Stages with a low share are waiting on the network, and gain from more threads;
+        stages with a high share gain from more processes.
+        """
+
+        lines = [f'{"stage":>22} {"calls":>6} {"wall s":>9} {"CPU s":>9} {"CPU %":>6}']
+        for stage, (calls, wall_seconds, cpu_seconds) in self.stages.items():
+            cpu_share = cpu_seconds / wall_seconds * 100 if wall_seconds > 0 else 0
+            lines.append(f'{stage:>22} {calls:>6} {wall_seconds:>9.2f} {cpu_seconds:>9.2f} {cpu_share:>5.0f}%')
+
+        return '\n'.join(lines)
+
+
+def run_task(task, faculty, max_retries, retry_delay):
+    """
+    Return the result of task(faculty, stage_times), trying again when an upstream did not respond.
+    Stages that succeeded before a retry are not fetched again, as their results are in the caches of the process.
+
+    Input:
+    - task (function): Top-level function (or functools.partial of one) taking a Faculty and a StageTimes.
+                       It must be picklable, as it is sent to the worker processes.
+    - faculty (Faculty): Faculty detail from the csv.
+    - max_retries (int): Max no. of retries.
+    - retry_delay (float): No. of seconds waited before the first retry, doubled after each retry.
+
+    Output:
+    - result (Dict): Dictionary with 'faculty', 'value' (return value of task, None if it failed),
+                     'error' (repr of the exception, None if it succeeded), 'attempts', 'stage_times',
+                     'wall_seconds', 'cpu_seconds' and 'network_calls'.
+    """
+
+    # Imported here, so that the parent process does not import the upstream modules
+    import functions.metrics as metrics
+    from functions.circuit_breaker import UpstreamUnavailableError
+
+    stage_times = StageTimes()
+    start_time = time.perf_counter()
+    start_cpu_time = time.thread_time()
+    network_calls_at_start = metrics.get_thread_network_calls()
+    result = {'faculty': faculty, 'value': None, 'error': None, 'attempts': 0}
+
+    while True:
+        result['attempts'] += 1
+        try:
+            result['value'] = task(faculty, stage_times)
+            break
+        except UpstreamUnavailableError as e:
+            if result['attempts'] > max_retries:
+                result['error'] = repr(e)
+                break
+            time.sleep(retry_delay * 2 ** (result['attempts'] - 1))
+        except Exception as e:
+            # Errors other than an unavailable upstream would happen again
+            result['error'] = repr(e)
+            break
+
+    result['stage_times'] = stage_times
+    result['wall_seconds'] = time.perf_counter() - start_time
+    result['cpu_seconds'] = time.thread_time() - start_cpu_time
+    result['network_calls'] = metrics.get_thread_network_calls() - network_calls_at_start
+
+    return result
+
+
+def run_worker(task, task_queue, result_queue, threads, max_retries, retry_delay):
+    """
+    Main function of a worker process: threads take faculty from task_queue until they get None,
+    and put the result of run_task() for each of them in result_queue.
+    """
+
+    def work():
+        while True:
+            faculty = task_queue.get()
+            if faculty is None:
+                return
+            result_queue.put(run_task(task, faculty, max_retries, retry_delay))
+
+    workers = [threading.Thread(target=work, daemon=True) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+def harvest(faculty_list, task, processes=PROCESSES, threads=THREADS_PER_PROCESS,
+            max_retries=MAX_RETRIES, retry_delay=RETRY_DELAY_SECONDS):
+    """
+    Run task for every faculty, spread over worker processes with threads in each of them,
+    and yield the results in the order they are done, eg. to merge them into a snapshot bundle in this process.
+
+    Faculty are taken one at a time from a queue shared by all workers, so a slow faculty does not hold up
+    the others. Workers share the SQLite stores of DR-NTU pages and author records, and the OpenAlex rate limit
+    (through a state file, see functions.rate_limiter), so running more processes does not exceed it.
+    Workers are started with 'spawn', so they do not inherit locks or connections of this process.
+
+    Input:
+    - faculty_list ( List(Faculty) ): Faculty to run task for.
+    - task (function): Work done for one faculty, see run_task().
+    - processes (int): No. of worker processes.
+    - threads (int): No. of threads in each worker process.
+    - max_retries (int): Max no. of retries of a faculty after an upstream did not respond.
+    - retry_delay (float): No. of seconds waited before the first retry.
+
+    Output:
+    - results (Iterator(Dict)): Result of each faculty, see run_task().
+                                RuntimeError is raised if the workers exit before all faculty are done.
+    """
+
+    context = multiprocessing.get_context('spawn')
+    task_queue = context.Queue()
+    result_queue = context.Queue()
+
+    for faculty in faculty_list:
+        task_queue.put(faculty)
+    for _ in range(processes * threads):
+        task_queue.put(None)
+
+    # Read by the workers when they import functions.rate_limiter. Spawned processes copy the environment at start.
+    rate_limit_file = None
+    if not os.environ.get('OPENALEX_RATE_LIMIT_FILE'):
+        rate_limit_file = tempfile.NamedTemporaryFile(prefix='openalex_rate_limit_', suffix='.json', delete=False).name
+        os.environ['OPENALEX_RATE_LIMIT_FILE'] = rate_limit_file
+
+    try:
+        workers = [context.Process(target=run_worker,
+                                   args=(task, task_queue, result_queue, threads, max_retries, retry_delay),
+                                   daemon=True)
+                   for _ in range(processes)]
+        for worker in workers:
+            worker.start()
+    finally:
+        if rate_limit_file:
+            del os.environ['OPENALEX_RATE_LIMIT_FILE']
+
+    try:
+        for _ in range(len(faculty_list)):
+            while True:
+                try:
+                    yield result_queue.get(timeout=1)
+                    break
+                except queue.Empty:
+                    # A worker killed (eg. out of memory) loses the faculty it was working on
+                    if not any(worker.is_alive() for worker in workers):
+                        raise RuntimeError('Harvest workers exited before all faculty were done')
+
+        for worker in workers:
+            worker.join()
+    finally:
+        for worker in workers:
+            if worker.is_alive():
+                worker.terminate()
+        if rate_limit_file:
+            os.remove(rate_limit_file)
+
+
+def format_progress(index, total, result, detail=None):
+    """
+    Return the progress line of a faculty done by harvest(), eg. '[3/86] Name: 1.2 s, 1 retries'.
+
+    Input:
+    - index (int): No. of faculty done before this one.
+    - total (int): No. of faculty harvested.
+    - result (Dict): Result of the faculty, see run_task().
+    - detail (string): Added at the end of the line if given, eg. the no. of works indexed.
+    """
+
+    return (f'[{index+1}/{total}] {result["faculty"].name}: {result["wall_seconds"]:.1f} s'
+            + (f', {result["attempts"] - 1} retries' if result['attempts'] > 1 else '')
+            + (f', failed: {result["error"]}' if result['error'] else '')
+            + (f', {detail}' if detail else ''))
@@ -0,0 +1,60 @@
+import re
+
+# Characters with a meaning in Streamlit markdown, including $ (LaTeX) and < (HTML)
+MARKDOWN_SPECIAL_CHARS = re.compile(r'([\\`*_{}\[\]()#+!|$<>~])')
+
+
+def escape_markdown(text):
+    """
+    Return text with its markdown characters escaped, so that it is shown as it is, eg. titles with '$' or '*'.
+
+    Input:
+    - text (string): Text to show, eg. a work title.
+    """
+
+    return MARKDOWN_SPECIAL_CHARS.sub(r'\\\1', str(text))
+
+
+def format_list_item(number, title, details, link=None, link_text='View Publication'):
+    """
+    Return the markdown of one item of a numbered list, with its details as a nested bullet list.
+
+    Input:
+    - number (int): No. of the item in the list.
+    - title (string): Title of the item, shown in bold. Escaped.
+    - details ( List(string or Tuple(string, List(string))) ): Lines shown under the title, already in markdown.
+                                                             A (line, sub_lines) tuple shows sub_lines nested under line.
+    - link (string): URL of the link shown after the details, or None for no link.
+    - link_text (string): Text of the link.
+
+    Output:
+    - item (string): Markdown of the item, without a trailing newline.
+    """
+
+    # Nested lines are indented by 4 spaces, which is past the '10. ' of two-digit numbers
+    lines = [f'{number}. **{escape_markdown(title)}**']
+
+    for detail in details:
+        if isinstance(detail, tuple):
+            line, sub_lines = detail
+            lines.append(f'    - {line}')
+            lines.extend(f'        - {sub_line}' for sub_line in sub_lines)
+        else:
+            lines.append(f'    - {detail}')
+
+    if isinstance(link, str) and link:
+        lines.append(f'    - [{link_text}]({link.replace("(", "%28").replace(")", "%29").replace(" ", "%20")})')
+
+    return '\n'.join(lines)
+
+
+def format_list(items):
+    """
+    Return the markdown of a numbered list, from items of format_list_item().
+    Items are separated by a blank line, so that a whole list is sent to the browser as one element.
+
+    Input:
+    - items ( List(string) ): Markdown of each item.
+    """
+
+    return '\n\n'.join(items)
@@ -0,0 +1,134 @@
+import threading
+from collections import Counter, deque
+
+# Max no. of samples kept for each observed value
+MAX_SAMPLES = 1000
+
+_lock = threading.Lock()
+_counters = Counter()
+_samples = {}
+_gauges = {}
+
+# Per-thread tally of network calls. Each Streamlit session reruns its script in
+# its own thread, so the difference before and after a rerun is the no. of calls of that rerun.
+_local = threading.local()
+
+
+def increment(name, value=1):
+    """
+    Add value to the counter called name.
+
+    Input:
+    - name (string): Name of the counter.
+    - value (int): Amount to add.
+    """
+
+    with _lock:
+        _counters[name] += value
+
+
+def get_count(name):
+    """
+    Return the current value of the counter called name.
+
+    Input:
+    - name (string): Name of the counter.
+    """
+
+    with _lock:
+        return _counters[name]
+
+
+def observe(name, value):
+    """
+    Record a sample (eg. a latency) for the value called name.
+    Only the most recent MAX_SAMPLES samples are kept.
+
+    Input:
+    - name (string): Name of the observed value.
+    - value (float): Sample to record.
+    """
+
+    with _lock:
+        if name not in _samples:
+            _samples[name] = deque(maxlen=MAX_SAMPLES)
+        _samples[name].append(value)
+
+
+def percentile(name, q):
+    """
+    Return the q-th percentile of the recorded samples of name.
+    Return None if there is no sample.
+
+    Input:
+    - name (string): Name of the observed value.
+    - q (float): Percentile to return, from 0 to 100.
+    """
+
+    with _lock:
+        samples = sorted(_samples.get(name, []))
+
+    if len(samples) == 0:
+        return None
+
+    index = min(len(samples) - 1, int(round(q / 100 * (len(samples) - 1))))
+    return samples[index]
+
+
+def register_gauges(prefix, get_values):
+    """
+    Register a function whose values are included in snapshot(), eg. the stats of a cache.
+
+    Input:
+    - prefix (string): Prefix of the metric names.
+    - get_values (function): Function with no arguments that returns a Dictionary of name to value.
+    """
+
+    with _lock:
+        _gauges[prefix] = get_values
+
+
+def record_network_call(upstream):
+    """
+    Count one network request to an upstream service.
+
+    Input:
+    - upstream (string): Name of the upstream service, eg. 'openalex' or 'drntu'.
+    """
+
+    increment(f'network_calls.{upstream}')
+    _local.network_calls = getattr(_local, 'network_calls', 0) + 1
+
+
+def get_thread_network_calls():
+    """
+    Return the no. of network requests made by the current thread so far.
+    """
+
+    return getattr(_local, 'network_calls', 0)
+
+
+def snapshot():
+    """
+    Return all counters, registered gauges, and the count, p50 and p95 of all observed values.
+
+    Output:
+    - metrics (Dict): Dictionary of metric name to value.
+    """
+
+    with _lock:
+        result = dict(_counters)
+        sample_names = list(_samples)
+        gauges = list(_gauges.items())
+
+    for prefix, get_values in gauges:
+        for name, value in get_values().items():
+            result[f'{prefix}.{name}'] = value
+
+    for name in sample_names:
+        with _lock:
+            result[f'{name}.count'] = len(_samples[name])
+        result[f'{name}.p50'] = percentile(name, 50)
+        result[f'{name}.p95'] = percentile(name, 95)
+
+    return result
@@ -1,18 +1,77 @@
 import json
+import os
 import urllib
 from urllib.request import urlopen
 from urllib.error import HTTPError
-from collections import Counter
 
-import functions.utils as utils
+import functions.disambiguation as disambiguation
 import functions.dr_ntu_utils as dr_ntu
+import functions.metrics as metrics
+from functions.author_store import get_author_store
+from functions.cache_store import cached
+from functions.circuit_breaker import UpstreamUnavailableError, call_upstream, openalex_breaker
+from functions.rate_limiter import openalex_limiter, openalex_single_flight
+from functions.swr_cache import swr_cache
+from functions.works_dedup import deduplicate_works
+from functions.works_store import WorksTable
+
+# Author stats and works change slowly, so cached results are served for up to HARD_TTL seconds,
+# and refreshed in the background once they are older than SOFT_TTL seconds
+SOFT_TTL = 60 * 60 * 6
+HARD_TTL = 60 * 60 * 24 * 7
+
+# No. of works fetched in addition to the no. asked for, so that the list is still full
+# after the versions of the same paper (eg. a preprint and its journal version) are merged
+DEDUP_EXTRA_WORKS = 10
+
+# No. of collaborated authors shown on the profile page, with the details of their author record
+TOP_COLLABORATORS = 10
+
+# Max no. of journals counted by fetch_venue_stats (the no. of groups in one page of a group_by response)
+VENUE_GROUPS = 200
+
+# Max no. of authors fetched in one request by get_author_records (the max page size of OpenAlex),
+# and the fields kept for each author
+AUTHOR_BATCH_SIZE = 50
+AUTHOR_FIELDS = 'id,display_name,orcid,last_known_institution,summary_stats,works_count,cited_by_count'
+
+# Base URL of OpenAlex API. Query URLs (and cache keys) are always written with OPENALEX_URL,
+# which is replaced by OPENALEX_BASE_URL when the request is sent, eg. to use a local stub in load tests.
+OPENALEX_URL = 'https://api.openalex.org'
+OPENALEX_BASE_URL = os.environ.get('OPENALEX_BASE_URL', OPENALEX_URL)
+
+def request_json(query_url):
+    """
+    Return the decoded JSON response of an OpenAlex query.
+    All OpenAlex requests go through here, so that they share the process-wide rate limit,
+    and identical requests made at the same time (eg. by several sessions) share one network call.
 
-import streamlit as st
+    Input:
+    - query_url (string): URL to query to API.
 
-@st.cache_data
-def get_api_result(query_url):
+    Output:
+    - result (Dict): Decoded JSON response.
+                     HTTPError is raised if the API returns an error.
+                     UpstreamUnavailableError is raised if OpenAlex is not responding, or the render deadline is exhausted.
     """
-    Return API result by using query_url.
+
+    def send(timeout):
+        metrics.record_network_call('openalex')
+        response = urlopen(query_url.replace(OPENALEX_URL, OPENALEX_BASE_URL, 1), timeout=timeout)
+        return json.loads(response.read().decode('utf-8'))
+
+    def is_failure(e):
+        # Errors about the query itself (eg. 404) are answers, not failures of OpenAlex
+        return not isinstance(e, HTTPError) or e.code >= 500 or e.code == 429
+
+    def request():
+        return call_upstream(openalex_breaker, send, is_failure, openalex_limiter)
+
+    return openalex_single_flight.do(query_url, request)
+
+def fetch_api_result(query_url):
+    """
+    Return API result by using query_url, without using the cache.
 
     Input:
     - query_url (string): URL to query to API.
@@ -22,15 +81,28 @@ def get_api_result(query_url):
                      If error occurs, return the error details.
     """
     try:
-        response = urlopen(query_url)
-        result = json.loads(response.read().decode('utf-8'))
+        result = request_json(query_url)
         return result
     except HTTPError as e:
         # Handle any HTTP error by returning a custom error message
         return {"error": f"HTTP error {e.code}: {e.reason}"}
-    
-@st.cache_data
-def get_author_info_from_OpenAlexAPI(author_name, keyword, mode):
+
+@cached(HARD_TTL)
+def get_api_result(query_url):
+    """
+    Return API result by using query_url.
+
+    Input:
+    - query_url (string): URL to query to API.
+
+    Output:
+    - result (Dict): Dictionary of results from the API.
+                     If error occurs, return the error details.
+    """
+    return fetch_api_result(query_url)
+
+@cached(HARD_TTL)
+def get_author_info_from_OpenAlexAPI(author_name, keyword, mode, orcid=None):
     """
     Return the dictionary of details of a specified author of the publication with specified doi.
     
@@ -49,9 +121,13 @@ def get_author_info_from_OpenAlexAPI(author_name, keyword, mode):
                      - if 'pub', search author based on name and publication title written by the author.
                      - if 'institution', search author based on last institution, name and x_concept.
                      - if 'name', search author based on name and x_concept.
+    - orcid (string): ORCID link of the author, if known.
+                      Only used when mode='doi' or mode='pub', to confirm which author of the publication is the faculty.
 
     Output:
     - author_info (dict): Dictionary containing the details of the author by OpenAlex API.
+                          When mode='doi' or mode='pub', return an empty list if no author
+                          of the publication is confidently the same person as author_name.
     """
     
     if mode == 'api_id':
@@ -73,14 +149,13 @@ def get_author_info_from_OpenAlexAPI(author_name, keyword, mode):
         if len(result['authorships']) == 0:
             return []
     
-        authors_list = []
-    
-        # Get all authors' name
-        for author in result['authorships']:
-            authors_list.append(author['author']['display_name'])
-    
-        # Compare the names with author_name and get the index with the highest similarity
-        similar_index = utils.get_most_similar_index(author_name, authors_list)
+        # Compare the authors with author_name and get the index with the highest confidence
+        similar_index, _ = disambiguation.match_author(author_name, result['authorships'], orcid)
+
+        # If no author is similar enough
+        if similar_index is None:
+            return []
+
         author_info = result['authorships'][similar_index]
 
         return author_info
@@ -109,14 +184,14 @@ def get_author_info_from_OpenAlexAPI(author_name, keyword, mode):
         if len(result['results']) == 0 or len(result['results'][0]['authorships']) == 0:
             return []
 
-        authors_list = []
-    
-        # Get all authors' name from the first candinate publication only
-        for author in result['results'][0]['authorships']:
-            authors_list.append(author['author']['display_name'])
-    
-        # Compare the names with author_name and get the index with the highest similarity
-        similar_index = utils.get_most_similar_index(author_name, authors_list)
+        # Compare the authors of the first candinate publication only with author_name
+        # and get the index with the highest confidence
+        similar_index, _ = disambiguation.match_author(author_name, result['results'][0]['authorships'], orcid)
+
+        # If no author is similar enough
+        if similar_index is None:
+            return []
+
         author_info = result['results'][0]['authorships'][similar_index]
 
         return author_info
@@ -188,13 +263,13 @@ def get_author_info_from_OpenAlexAPI(author_name, keyword, mode):
         # If no possible candinate
         return []
 
-@st.cache_data
+@cached(HARD_TTL)
 def get_api_id_and_method(selected_faculty):
     """
     Return OpenAlex API id of selected_faculty and the method of retrieval of their details.
 
     Input:
-    - selected_faculty (pd.Series): Faculty detail from the csv.
+    - selected_faculty (Faculty): Faculty detail from the csv.
 
     Output:
     There will be two outputs wrapped in tuple: (OpenAlex_API_id, method).
@@ -205,9 +280,9 @@ def get_api_id_and_method(selected_faculty):
     """
 
     # If the faculty has an ORCID link, get details based on that
-    if isinstance(selected_faculty['orcid_link'], str):
-        author_details = get_author_info_from_OpenAlexAPI(selected_faculty['Name'],
-                                                          selected_faculty['orcid_link'],
+    if isinstance(selected_faculty.orcid_link, str):
+        author_details = get_author_info_from_OpenAlexAPI(selected_faculty.name,
+                                                          selected_faculty.orcid_link,
                                                           'orcid')
 
         # If API did not give error
@@ -219,17 +294,21 @@ def get_api_id_and_method(selected_faculty):
 
     # If no ORCID or have ORCID but not in API, run the below codes
 
-    # Retrieve the doi from dr-ntu site
-    doi_list = dr_ntu.get_doi_list_from_drNTU(selected_faculty['dr_ntu_link'])
+    # ORCID may still be written on the faculty's authorships, so use it to confirm the author
+    orcid = selected_faculty.orcid_link if isinstance(selected_faculty.orcid_link, str) else None
+
+    # Retrieve the doi from dr-ntu site, if the faculty has a DR-NTU profile
+    doi_list = dr_ntu.get_doi_list_from_drNTU(selected_faculty.dr_ntu_link) if selected_faculty.dr_ntu_link else []
 
     # If DOI obtained, use that to search for the faculty in the API
     for doi in doi_list:
-        author_details = get_author_info_from_OpenAlexAPI(selected_faculty['Name'], 
+        author_details = get_author_info_from_OpenAlexAPI(selected_faculty.name, 
                                                           doi, 
-                                                          'doi')
+                                                          'doi',
+                                                          orcid)
         
-        # If API gave error, go to next DOI
-        if 'error' in author_details:
+        # If API gave error or no matching author, go to next DOI
+        if 'error' in author_details or len(author_details)==0:
             continue
 
         # Retrieve the author ID
@@ -239,10 +318,10 @@ def get_api_id_and_method(selected_faculty):
 
 
     # If cannot retrieve any DOI or still have not found author, use publication title to search
-    pub_list = dr_ntu.get_pub_list_from_article(selected_faculty['dr_ntu_link'])
+    pub_list = dr_ntu.get_pub_list_from_article(selected_faculty.dr_ntu_link) if selected_faculty.dr_ntu_link else []
 
     for pub in pub_list:
-        author_details = get_author_info_from_OpenAlexAPI(selected_faculty['Name'], pub, 'pub')
+        author_details = get_author_info_from_OpenAlexAPI(selected_faculty.name, pub, 'pub', orcid)
 
         # If API gave error or no results, go to next pub
         if 'error' in author_details or len(author_details)==0:
@@ -255,7 +334,7 @@ def get_api_id_and_method(selected_faculty):
 
 
     # If still have not found author, use name and institution to search
-    author_details = get_author_info_from_OpenAlexAPI(selected_faculty['Name'], '', 'institution')
+    author_details = get_author_info_from_OpenAlexAPI(selected_faculty.name, '', 'institution')
 
     # If API did not give error and have results
     if not ('error' in author_details or len(author_details)==0):
@@ -265,7 +344,7 @@ def get_api_id_and_method(selected_faculty):
 
 
     # If still have not found author, use name only to search
-    author_details = get_author_info_from_OpenAlexAPI(selected_faculty['Name'], '', 'name')
+    author_details = get_author_info_from_OpenAlexAPI(selected_faculty.name, '', 'name')
 
     # If API did not give error and have results
     if not ('error' in author_details or len(author_details)==0):
@@ -277,13 +356,15 @@ def get_api_id_and_method(selected_faculty):
     # If really cannot find faculty, set 'nan' for openAlex_authorID
     return float('nan'), None
 
-@st.cache_data
+@swr_cache(SOFT_TTL, HARD_TTL)
 def get_author_stats(selected_faculty, faculty_api_id):
     """
     Return dictionary of selected_faculty from API.
+    Use get_author_stats.with_age() to also get the time the stats were fetched.
 
     Input:
-    - selected_faculty (pd.Series): Faculty detail from the csv.
+    - selected_faculty (Faculty): Faculty detail from the csv.
+    - faculty_api_id (string): Faculty's API id.
 
     Output:
     - info_dict (Dictionary): Dictionary of faculty's detail.
@@ -291,9 +372,9 @@ def get_author_stats(selected_faculty, faculty_api_id):
     """
 
     
-    author_details = get_author_info_from_OpenAlexAPI(selected_faculty['Name'],
-                                                      faculty_api_id,
-                                                      'api_id')
+    # Not using get_author_info_from_OpenAlexAPI, as its cache would stop
+    # the background refresh from getting the latest stats
+    author_details = fetch_api_result('https://api.openalex.org/authors/' + faculty_api_id)
 
     info_dict = {}
 
@@ -323,10 +404,11 @@ def get_author_stats(selected_faculty, faculty_api_id):
 
     return info_dict
 
-@st.cache_data
+@swr_cache(SOFT_TTL, HARD_TTL)
 def get_author_pubs_from_OpenAlexAPI(author_id, pub_num, sort_by=[], sort_direction='asc'):
     """
     Return a specified no. of publications' details from a specified author.
+    Use get_author_pubs_from_OpenAlexAPI.with_age() to also get the time the publications were fetched.
 
     Input:
     - author_id (string): Unique author ID, from OpenAlex API.
@@ -340,38 +422,16 @@ def get_author_pubs_from_OpenAlexAPI(author_id, pub_num, sort_by=[], sort_direct
                                - Otherwise, sort by ascending order.
 
     Output:
-    - pub_list ( List(Dict) ): List of publications with each of their details written in dictionary format.
+    - pub_list (WorksTable): Publications, stored in a compact columnar table.
+                             Only the fields used by the dashboard are kept (see works_store.WORKS_SCHEMA).
+                             Versions of the same paper are merged (see works_dedup.deduplicate_works).
+                             UpstreamUnavailableError is raised if a page of the list could not be fetched.
     """
-    
-    # Keys to remove from each publication details
-    keys_to_remove = [
-        'display_name',
-        'language',
-        'primary_location',
-        'open_access',
-        'countries_distinct_count',
-        'institutions_distinct_count',
-        'corresponding_author_ids',
-        'corresponding_institution_ids',
-        'apc_list',
-        'apc_paid',
-        'has_fulltext',
-        'fulltext_origin',
-        'is_retracted',
-        'is_paratext',
-        'concepts',
-        'mesh',
-        'locations_count',
-        'best_oa_location',
-        'sustainable_development_goals',
-        'grants',
-        'referenced_works_count',
-        'ngrams_url',
-        'abstract_inverted_index',
-        'cited_by_api_url'
-    ]
 
     pub_list = []
+
+    # Extra works replace the duplicates merged below
+    fetch_num = pub_num + DEDUP_EXTRA_WORKS
     
     query_url = 'https://api.openalex.org/works?filter=author.id:' + author_id
 
@@ -391,99 +451,94 @@ def get_author_pubs_from_OpenAlexAPI(author_id, pub_num, sort_by=[], sort_direct
 
     # If pub_num is within range of "results per page range limits" given by the API,
     # request to get all results in one page
-    if 1 <= pub_num <= 200:
-        per_page = pub_num
+    if 1 <= fetch_num <= 200:
+        per_page = fetch_num
     else:
         per_page = 200
 
     # Count to track the page number of the results
     page = 1
     
-    while (len(pub_list) < pub_num):
+    while (len(pub_list) < fetch_num):
         # Get results from the API
         try:
-            response = urlopen(query_url + '&per-page=' + str(per_page) + '&page=' + str(page))
-            response_json = json.loads(response.read())
-            
-            # Add the pub details to the list
-            pub_list.extend(response_json['results'])
-    
-            # If all results available from the API is already stored,
-            # stop querying
-            if len(pub_list) == response_json['meta']['count']:
-                break
-            
-            # Else, go to next page
-            page += 1
+            response_json = request_json(query_url + '&per-page=' + str(per_page) + '&page=' + str(page))
+
+        # Most likely did too much request, so HTTP 403 Forbidden.
+        # Raised rather than returning the works fetched so far, so that a shorter list is not cached
+        # (or replaces the cached full list in a background refresh), and the full list is fetched later.
+        except HTTPError as e:
+            raise UpstreamUnavailableError(openalex_breaker.name, f'works list cut short ({e!r})') from e
 
-        # Most likely did too much request, so HTTP 403 Forbidden
-        except:
-            # So stop querying and use only the results that are obtained earlier
+        # Add the pub details to the list
+        pub_list.extend(response_json['results'])
+
+        # If all results available from the API is already stored (or the API has no more results),
+        # stop querying
+        if len(pub_list) >= response_json['meta']['count'] or len(response_json['results']) == 0:
             break
 
-    for pub_dict in pub_list:
-        for key in keys_to_remove:
-            pub_dict.pop(key, None)
+        # Else, go to next page
+        page += 1
 
-    return pub_list
+    # Keep only the fields used by the dashboard, in a columnar table, with one row per paper
+    return deduplicate_works(WorksTable.from_works(pub_list[:fetch_num]))[:pub_num]
 
-@st.cache_data
+@cached()
 def get_collab_info(faculty_id, faculty_pub_list):
     """
     Return list of authors who collaborated with a faculty for publication.
     (The faculty themself will not be included in this list.)
     The list will be in this format (and will refer to this list as result_list):
-    [collab_author_name, collab_author_api_id, is_scse, pub_id_list, collab_count]
+    [collab_author_name, collab_author_api_id, orcid, institution, pub_id_list, collab_count]
 
     - collab_author_name (string) will be the name of the collaborated author.
     - collab_author_api_id (string) is the OpenAlex API id of the collaborated author.
+    - orcid (string) is the ORCID link of the collaborated author, or None if not available.
+    - institution (string) is the institution of the collaborated author, or None if not available.
     - pub_id_list ( List(string) ) is the list of publication id (of OpenAlex API) that the author has collaborated with the faculty.
     - collab_count (int) is the no. of times the author has collaborated with this faculty.
 
     Input:
     - faculty_id (string): Faculty's API id.
-    - faculty_pub_list ( List(string) ): List of publication details of a faculty.
+    - faculty_pub_list (WorksTable): Publications of a faculty.
 
     Output:
     - sorted_result ( List(List(string)) ): The list that contains a result_list for each collaborated authors.
     """
-    
+
+    # Only the first authorship of each publication is used
+    work_indices, first_authorships = faculty_pub_list.first_authorships()
+
+    author_ids = first_authorships.field('author_id').to_pylist()
+    author_names = first_authorships.field('author_name').to_pylist()
+    orcids = first_authorships.field('orcid').to_pylist()
+    institutions = first_authorships.field('institution').to_pylist()
+    work_ids = faculty_pub_list.column('id')
+
     # Dictionary to store the all collaborated author's info
     author_data = {}
 
-    for data in faculty_pub_list:
-        # Get the 'id' and 'display_name' of the author
-        author_id = data['authorships'][0]['author']['id'].split('https://openalex.org/')[1]
-        author_name = data['authorships'][0]['author']['display_name']
+    for i, work_index in enumerate(work_indices):
+        author_id = author_ids[i]
 
-        if 'orcid' in data['authorships'][0]['author']:
-            orcid_id = data['authorships'][0]['author']['orcid']
-        else:
-            orcid_id = None
-
-        if 'institutions' in data['authorships'][0]:
-            if len(data['authorships'][0]['institutions']) > 0:
-                institution = data['authorships'][0]['institutions'][0]['display_name']
-        else:
-            institution = None
-    
-        # Get the 'id' of the work
-        work_id = data['id'].split('https://openalex.org/')[1]
-    
         if author_id == faculty_id:
             continue
-    
+
+        # Get the 'id' of the work
+        work_id = work_ids[work_index].split('https://openalex.org/')[1]
+
         # Check if the author_id is already in the author_data dictionary
         if author_id in author_data:
             # Append the work_id to the existing list
-            author_data[author_id][2].append(work_id)
+            author_data[author_id][4].append(work_id)
         else:
-            # Create a new entry for the author
-            author_data[author_id] = [author_name, author_id, [work_id]]
-    
+            # Create a new entry for the author, with the details from their first authorship
+            author_data[author_id] = [author_names[i], author_id, orcids[i], institutions[i], [work_id]]
+
     # Create the final list with the required format
     result_list = []
-    for author_id, (author_name, _, work_ids) in author_data.items():
+    for author_name, author_id, orcid_id, institution, work_ids in author_data.values():
         result_list.append([author_name, author_id, orcid_id, institution, work_ids, len(work_ids)])
 
     # Sort list according to the no. of times the author has collaborated with the author (descending),
@@ -492,14 +547,14 @@ def get_collab_info(faculty_id, faculty_pub_list):
 
     return sorted_result
 
-@st.cache_data
+@cached()
 def get_journal_frequency(faculty_pub_list):
     """
     Return list of tuples that contains the name of journal and the frequency of the journal appearing in faculty_pub_list.
     The tuples will be sorted by the frequency in descending order, then alphabetic order by the journal name.
 
     Input:
-    - faculty_pub_list ( List(string) ): List of publication details of a faculty.
+    - faculty_pub_list (WorksTable): Publications of a faculty.
 
     Output:
     - sorted_journal_counts ( List( tuple(string) )): List of tuples containing the name of journal and the frequency of it.
@@ -508,18 +563,8 @@ def get_journal_frequency(faculty_pub_list):
 
     """
 
-    journal_counts = Counter()
-
-    for entry in faculty_pub_list:
-        locations = entry.get('locations', [])
-        for location in locations:
-            source = location.get('source')
-            if source:
-                source_type = source.get('type')
-                if source_type == 'journal':
-                    journal_name = source.get('display_name')
-                    if journal_name:
-                        journal_counts[journal_name] += 1
+    # Counted on the columnar table, without going through each publication
+    journal_counts = faculty_pub_list.journal_counts()
 
     # Sort the result by frequency (descending) and then by journal name (ascending)
     sorted_journal_counts = sorted(
@@ -527,4 +572,136 @@ def get_journal_frequency(faculty_pub_list):
         key=lambda x: (-x[1], x[0])
     )
 
-    return sorted_journal_counts
\ No newline at end of file
+    return sorted_journal_counts
+
+@swr_cache(SOFT_TTL, HARD_TTL)
+def fetch_venue_stats(author_id):
+    """
+    Return the no. of works of an author in each journal, counted by OpenAlex over all their works.
+    Use get_venue_stats(), which falls back to counting the recent works when OpenAlex is not responding.
+
+    Input:
+    - author_id (string): Unique author ID, from OpenAlex API.
+
+    Output:
+    - venue_stats (Dict): Dictionary with 'journals', 'works_count' and 'source', see get_venue_stats().
+                          HTTPError or UpstreamUnavailableError is raised if OpenAlex did not answer.
+    """
+
+    # One request: OpenAlex groups the works by their primary venue, and counts the works of each group.
+    # The first VENUE_GROUPS journals are returned, which is more than the page shows.
+    query_url = ('https://api.openalex.org/works?filter=author.id:' + author_id
+                 + ',primary_location.source.type:journal&group_by=primary_location.source.id'
+                 + '&per-page=' + str(VENUE_GROUPS))
+    response_json = request_json(query_url)
+
+    # Works whose venue has no OpenAlex id are grouped under 'unknown'
+    journal_counts = [(group['key_display_name'], group['count']) for group in response_json['group_by']
+                      if group['key'] != 'unknown' and group['key_display_name']]
+
+    return {'journals': sorted(journal_counts, key=lambda x: (-x[1], x[0])),
+            'works_count': sum(count for _, count in journal_counts),
+            'source': 'openalex'}
+
+def get_venue_stats(author_id):
+    """
+    Return the journals an author published in, with their no. of works in each of them.
+    Counted by OpenAlex over all the works of the author. When OpenAlex is not responding, and the counts were
+    not fetched before, the journals of the cached recent works (the ones shown on the profile page) are counted instead.
+
+    Input:
+    - author_id (string): Unique author ID, from OpenAlex API.
+
+    Output:
+    - venue_stats (Dict): Dictionary with:
+                          - 'journals' ( List( tuple(string, int) ) ): Journal name and no. of works in it,
+                            sorted by the no. of works (descending), then by the journal name.
+                          - 'works_count' (int): No. of works counted.
+                          - 'source' (string): 'openalex' if counted by OpenAlex over all works,
+                            'recent_works' if counted from the recent works.
+                          UpstreamUnavailableError is raised if neither could be fetched.
+    """
+
+    try:
+        return fetch_venue_stats(author_id)
+    except (HTTPError, UpstreamUnavailableError):
+        metrics.increment('venue_stats.recent_works_fallback')
+
+    # Same arguments as the profile page, so the cached list is used
+    recent_pub_list = get_author_pubs_from_OpenAlexAPI(author_id, 50, sort_by=['publication_date'], sort_direction='desc')
+
+    return {'journals': get_journal_frequency(recent_pub_list),
+            'works_count': len(recent_pub_list),
+            'source': 'recent_works'}
+
+def parse_author_record(author_details):
+    """
+    Return the fields of an OpenAlex author kept in the author store.
+
+    Input:
+    - author_details (Dict): Author from the OpenAlex API, with the fields of AUTHOR_FIELDS.
+
+    Output:
+    - record (Dict): Dictionary with 'display_name', 'orcid', 'institution', 'h_index', 'works_count' and 'cited_by_count'.
+                     Missing values are None.
+    """
+
+    # Newer responses list the last known institutions instead
+    institution = author_details.get('last_known_institution') or (author_details.get('last_known_institutions') or [None])[0]
+
+    return {
+        'display_name': author_details.get('display_name'),
+        'orcid': author_details.get('orcid'),
+        'institution': institution['display_name'] if institution else None,
+        'h_index': (author_details.get('summary_stats') or {}).get('h_index'),
+        'works_count': author_details.get('works_count'),
+        'cited_by_count': author_details.get('cited_by_count'),
+    }
+
+def get_author_records(author_ids):
+    """
+    Return the records of OpenAlex authors (eg. the collaborators of a faculty), from the author store shared by all faculty.
+    Authors missing from the store, or stored more than SOFT_TTL seconds ago, are fetched AUTHOR_BATCH_SIZE at a time,
+    with one request per batch instead of one request per author.
+
+    Input:
+    - author_ids ( List(string) ): OpenAlex ids of the authors (eg. 'A5023888391').
+
+    Output:
+    - records ( Dict(string, Dict) ): Record of each author (see parse_author_record), by author id.
+                                      Authors not found, or not fetched as OpenAlex is not responding, are left out.
+                                      Records up to HARD_TTL seconds old are used when OpenAlex is not responding.
+    """
+
+    author_ids = list(dict.fromkeys(author_id for author_id in author_ids if author_id))
+    store = get_author_store()
+    records = store.get_records(author_ids, SOFT_TTL)
+
+    missing_ids = [author_id for author_id in author_ids if author_id not in records]
+    metrics.increment('author_records.stored', len(author_ids) - len(missing_ids))
+
+    for start in range(0, len(missing_ids), AUTHOR_BATCH_SIZE):
+        batch = missing_ids[start:start + AUTHOR_BATCH_SIZE]
+        query_url = ('https://api.openalex.org/authors?filter=openalex_id:' + '|'.join(batch)
+                     + '&select=' + AUTHOR_FIELDS + '&per-page=' + str(AUTHOR_BATCH_SIZE))
+
+        try:
+            response_json = request_json(query_url)
+        except (HTTPError, UpstreamUnavailableError):
+            # The records are extra details, so the authors are shown with their stale records, or without them
+            metrics.increment('author_records.failed_batches')
+            records.update(store.get_records(missing_ids[start:], HARD_TTL))
+            break
+
+        # Authors not in the response (eg. merged into another author) are stored as not found
+        batch_records = dict.fromkeys(batch)
+        for author_details in response_json['results']:
+            author_id = author_details['id'].split('https://openalex.org/')[1]
+            if author_id in batch_records:
+                batch_records[author_id] = parse_author_record(author_details)
+
+        store.save_records(batch_records)
+        records.update(batch_records)
+        metrics.increment('author_records.fetched', len(batch))
+
+    return {author_id: record for author_id, record in records.items() if record is not None}
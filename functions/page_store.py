@@ -0,0 +1,161 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+import functions.metrics as metrics
+from functions.cache_store import MISSING
+
+# SQLite file of the stored DR-NTU pages. Kept across restarts, so that a cold start
+# only sends conditional requests for the pages it has seen before.
+STORE_PATH = os.environ.get('DASHBOARD_DRNTU_PAGE_STORE', 'drntu_pages.sqlite')
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS pages (
+    url TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    content_hash TEXT NOT NULL,
+    html BLOB NOT NULL,
+    checked_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS extracted (
+    url TEXT NOT NULL,
+    name TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (url, name)
+) WITHOUT ROWID;
+'''
+
+
+class PageStore:
+    """
+    Stores the last version of each DR-NTU page: its validators (ETag and Last-Modified),
+    a hash of its content, its html (compressed), and the values extracted from it (eg. DOIs or interests).
+
+    Values are stored with the content hash of the page they were extracted from,
+    so they are reused for as long as the page does not change, without parsing the page again.
+    """
+
+    def __init__(self, path=STORE_PATH):
+        self.path = path
+        # Connections are shared by the threads of the Streamlit server
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._lock = threading.Lock()
+
+        with self._lock:
+            self._conn.executescript(SCHEMA)
+
+        metrics.register_gauges('drntu_page_store', self.stats)
+
+    def get_validators(self, url):
+        """
+        Return (etag, last_modified, content_hash) of the stored version of a page, or None if it is not stored.
+
+        Input:
+        - url (string): URL of the page.
+        """
+
+        with self._lock:
+            return self._conn.execute('SELECT etag, last_modified, content_hash FROM pages WHERE url = ?', (url,)).fetchone()
+
+    def get_html(self, url):
+        """
+        Return the html of the stored version of a page, or None if it is not stored.
+
+        Input:
+        - url (string): URL of the page.
+        """
+
+        with self._lock:
+            row = self._conn.execute('SELECT html FROM pages WHERE url = ?', (url,)).fetchone()
+
+        return None if row is None else zlib.decompress(row[0]).decode('utf-8')
+
+    def save_page(self, url, etag, last_modified, content_hash, html):
+        """
+        Store a new version of a page. Values extracted from other versions are dropped.
+
+        Input:
+        - url (string): URL of the page.
+        - etag (string): ETag header of the response, or None.
+        - last_modified (string): Last-Modified header of the response, or None.
+        - content_hash (string): Hash of html.
+        - html (string): Content of the page.
+        """
+
+        with self._lock, self._conn:
+            self._conn.execute('INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?)',
+                               (url, etag, last_modified, content_hash, zlib.compress(html.encode('utf-8')), time.time()))
+            self._conn.execute('DELETE FROM extracted WHERE url = ? AND content_hash != ?', (url, content_hash))
+
+    def mark_checked(self, url):
+        """
+        Record that the stored version of a page was found to be the latest.
+
+        Input:
+        - url (string): URL of the page.
+        """
+
+        with self._lock, self._conn:
+            self._conn.execute('UPDATE pages SET checked_at = ? WHERE url = ?', (time.time(), url))
+
+    def get_extracted(self, url, name, content_hash):
+        """
+        Return the value called name extracted from the version content_hash of a page,
+        or MISSING if it was not extracted from that version.
+
+        Input:
+        - url (string): URL of the page.
+        - name (string): Name of the extracted value, eg. 'interests'.
+        - content_hash (string): Hash of the current version of the page.
+        """
+
+        with self._lock:
+            row = self._conn.execute('SELECT value FROM extracted WHERE url = ? AND name = ? AND content_hash = ?',
+                                     (url, name, content_hash)).fetchone()
+
+        return MISSING if row is None else json.loads(row[0])
+
+    def set_extracted(self, url, name, content_hash, value):
+        """
+        Store the value called name extracted from the version content_hash of a page.
+
+        Input:
+        - url (string): URL of the page.
+        - name (string): Name of the extracted value, eg. 'interests'.
+        - content_hash (string): Hash of the version of the page the value was extracted from.
+        - value: JSON serializable value.
+        """
+
+        with self._lock, self._conn:
+            self._conn.execute('INSERT OR REPLACE INTO extracted VALUES (?, ?, ?, ?)',
+                               (url, name, content_hash, json.dumps(value)))
+
+    def stats(self):
+        """
+        Return the no. of stored pages.
+        """
+
+        with self._lock:
+            return {'pages': self._conn.execute('SELECT COUNT(*) FROM pages').fetchone()[0]}
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_page_store():
+    """
+    Return the page store shared by all threads of the process, opened on first use.
+    """
+
+    global _store
+
+    with _store_lock:
+        if _store is None:
+            _store = PageStore()
+        return _store
@@ -0,0 +1,261 @@
+import cProfile
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+import functions.metrics as metrics
+
+# Folder the profiles of reruns are saved in
+PROFILE_DIR = os.environ.get('DASHBOARD_PROFILE_DIR', 'profiles')
+
+# If '1', every rerun is profiled with cProfile, like opening a page with ?profile=1
+PROFILE_ALL = os.environ.get('DASHBOARD_PROFILE') == '1'
+
+# Reruns taking longer than this no. of ms are saved automatically, from their stack samples.
+# 0 turns off the automatic capture.
+SLOW_RERUN_MS = float(os.environ.get('DASHBOARD_PROFILE_SLOW_MS', 0))
+
+# No. of seconds between two stack samples
+SAMPLE_INTERVAL_SECONDS = float(os.environ.get('DASHBOARD_PROFILE_INTERVAL_SECONDS', 0.005))
+
+# Sampling stops after this no. of seconds, in case the end of the rerun is never reached (eg. st.stop())
+MAX_SAMPLE_SECONDS = 120
+
+# Profiler of the rerun run by the current thread (the script thread of a session)
+_local = threading.local()
+
+
+def get_frame_name(code):
+    # Function, file and first line of a frame, as shown in flame graphs. ';' separates frames in collapsed stacks.
+    file_name = os.path.relpath(code.co_filename) if not code.co_filename.startswith('<') else code.co_filename
+    if file_name.startswith('..'):
+        file_name = os.path.basename(code.co_filename)
+    return f'{code.co_name} ({file_name}:{code.co_firstlineno})'.replace(';', ':')
+
+
+class RerunProfiler:
+    """
+    Profile of one rerun of a page, covering the script thread and the fetch threads working for that rerun.
+
+    The stacks of these threads are sampled every SAMPLE_INTERVAL_SECONDS by a background thread, which is cheap
+    enough to run on every rerun when SLOW_RERUN_MS is set. When deterministic, each thread also runs cProfile,
+    which counts every call but slows the rerun down, so it is only used when asked for.
+
+    Saved as <PROFILE_DIR>/<time>-<page>-<ms>ms.collapsed (the sampled stacks, one 'frame;frame;... count' per line,
+    for flamegraph.pl or speedscope) and, when deterministic, .prof (pstats, for snakeviz or python -m pstats).
+    """
+
+    def __init__(self, page, deterministic):
+        """
+        Input:
+        - page (string): Name of the page, used in the file names, eg. 'faculty_profile'.
+        - deterministic (bool): True to also run cProfile.
+        """
+
+        self.page = page
+        self.deterministic = deterministic
+        self.samples = Counter()  # Stack (tuple of frame names, outermost first) -> no. of samples
+        self.sample_count = 0
+        self.elapsed_ms = None
+
+        self._lock = threading.Lock()
+        self._threads = {}  # Thread ident -> name of the root frame of its stacks
+        self._profiles = []
+        self._stop_event = threading.Event()
+        self._sampler = threading.Thread(target=self._sample, name='rerun-profiler', daemon=True)
+
+    def start(self):
+        """
+        Start profiling the current thread (the script thread).
+        """
+
+        self._start_time = time.perf_counter()
+        self._threads[threading.get_ident()] = 'script'
+
+        if self.deterministic:
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+
+        self._sampler.start()
+
+    def stop(self):
+        """
+        Stop profiling, and return the duration of the rerun in ms.
+        """
+
+        if self.deterministic:
+            self._profile.disable()
+            self._profiles.append(self._profile)
+
+        self.elapsed_ms = (time.perf_counter() - self._start_time) * 1000
+        self._stop_event.set()
+        self._sampler.join()
+
+        return self.elapsed_ms
+
+    @contextmanager
+    def track_thread(self):
+        """
+        Profile the current thread while in the block, eg. a fetch thread getting the data of this rerun.
+        """
+
+        ident = threading.get_ident()
+        with self._lock:
+            self._threads[ident] = 'fetch'
+
+        profile = cProfile.Profile() if self.deterministic else None
+        if profile:
+            profile.enable()
+
+        try:
+            yield
+        finally:
+            if profile:
+                profile.disable()
+            with self._lock:
+                self._threads.pop(ident, None)
+                if profile:
+                    self._profiles.append(profile)
+
+    def _sample(self):
+        # Record the stacks of the tracked threads until stopped
+        deadline = time.perf_counter() + MAX_SAMPLE_SECONDS
+
+        while not self._stop_event.wait(SAMPLE_INTERVAL_SECONDS) and time.perf_counter() < deadline:
+            frames = sys._current_frames()
+            with self._lock:
+                threads = list(self._threads.items())
+
+            for ident, root in threads:
+                frame = frames.get(ident)
+                stack = []
+                while frame is not None:
+                    stack.append(get_frame_name(frame.f_code))
+                    frame = frame.f_back
+                self.samples[(root,) + tuple(reversed(stack))] += 1
+
+            self.sample_count += 1
+
+    def save(self, profile_dir=PROFILE_DIR):
+        """
+        Save the profile of the rerun, and return the path of the saved files without their extension.
+
+        Input:
+        - profile_dir (string): Folder to save the files in.
+        """
+
+        os.makedirs(profile_dir, exist_ok=True)
+        base_path = os.path.join(profile_dir, f'{datetime.now().strftime("%Y%m%dT%H%M%S%f")}-{self.page}-{self.elapsed_ms:.0f}ms')
+
+        with open(base_path + '.collapsed', 'w') as f:
+            for stack, count in self.samples.most_common():
+                f.write(';'.join(stack) + f' {count}\n')
+
+        if self._profiles:
+            stats = pstats.Stats(self._profiles[0])
+            for profile in self._profiles[1:]:
+                stats.add(profile)
+            stats.dump_stats(base_path + '.prof')
+
+        metrics.increment('profiler.saved')
+
+        return base_path
+
+
+def start_rerun(page, requested=False):
+    """
+    Start profiling a rerun of a page, if asked for (requested or DASHBOARD_PROFILE=1), or if slow reruns are captured
+    (DASHBOARD_PROFILE_SLOW_MS). Called by the script thread at the start of the page.
+
+    Input:
+    - page (string): Name of the page, eg. 'faculty_profile'.
+    - requested (bool): True if the page was opened with ?profile=1 (see diagnostics.is_profile_requested).
+
+    Output:
+    - profiler (RerunProfiler): Profiler of the rerun, or None if the rerun is not profiled.
+    """
+
+    # Profiler left running by an earlier rerun of this thread that did not call finish_rerun() (see profile_rerun)
+    previous = getattr(_local, 'profiler', None)
+    if previous is not None:
+        previous.stop()
+
+    deterministic = requested or PROFILE_ALL
+    _local.profiler = RerunProfiler(page, deterministic) if deterministic or SLOW_RERUN_MS > 0 else None
+
+    if _local.profiler is not None:
+        _local.profiler.start()
+
+    return _local.profiler
+
+
+@contextmanager
+def profile_rerun(page, requested=False):
+    """
+    Profile the rerun run in the block, see start_rerun(). Used around the body of a page, eg.
+    with profiler.profile_rerun('faculty_list', diagnostics.is_profile_requested()): ...
+
+    The profiler is also stopped when the script ends before the end of the block (eg. by an exception,
+    st.stop() or st.rerun()). Streamlit runs the next rerun in a new thread, so a profiler left running
+    would keep sampling the finished one.
+
+    Input:
+    - page (string): Name of the page, eg. 'faculty_profile'.
+    - requested (bool): True if the page was opened with ?profile=1 (see diagnostics.is_profile_requested).
+    """
+
+    start_rerun(page, requested)
+
+    try:
+        yield
+    finally:
+        # Does nothing if finish_rerun() was called at the end of the block, eg. to show the saved profile
+        finish_rerun()
+
+
+def get_rerun_profiler():
+    """
+    Return the profiler of the rerun run by the current thread, or None. Passed to the fetch threads of the rerun.
+    """
+
+    return getattr(_local, 'profiler', None)
+
+
+def track_thread(profiler):
+    """
+    Return a context manager profiling the current thread for profiler, or doing nothing if profiler is None.
+
+    Input:
+    - profiler (RerunProfiler): Profiler of the rerun the thread works for, from get_rerun_profiler().
+    """
+
+    return profiler.track_thread() if profiler is not None else nullcontext()
+
+
+def finish_rerun():
+    """
+    Stop profiling the rerun of the current thread. Save its profile if it was asked for,
+    or if the rerun took longer than SLOW_RERUN_MS.
+
+    Output:
+    - base_path (string): Path of the saved files without their extension, or None if nothing was saved.
+    """
+
+    profiler = getattr(_local, 'profiler', None)
+    _local.profiler = None
+
+    if profiler is None:
+        return None
+
+    elapsed_ms = profiler.stop()
+    metrics.observe('profiler.rerun_ms', elapsed_ms)
+
+    if profiler.deterministic or elapsed_ms > SLOW_RERUN_MS:
+        return profiler.save()
+
+    return None
@@ -0,0 +1,256 @@
+import json
+import os
+import threading
+import time
+
+import functions.metrics as metrics
+from functions.circuit_breaker import DeadlineExceededError, get_remaining_seconds, openalex_breaker, skip_call
+
+
+class TokenBucket:
+    """
+    Token bucket shared by all threads of the process.
+
+    Tokens are added at rate per second, up to capacity. acquire() takes one token,
+    waiting until one is available (or giving up after a max wait), so at most rate requests per second
+    are made on average (with bursts of up to capacity requests).
+    The no. of waiting threads and the wait times are reported to functions.metrics under name.
+    """
+
+    def __init__(self, name, rate, capacity=None):
+        self.name = name
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+
+        self._lock = threading.Lock()
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._waiting = 0
+
+        metrics.register_gauges(name, self.stats)
+
+    def acquire(self, max_wait_seconds=None):
+        """
+        Take one token, waiting until one is available.
+
+        Input:
+        - max_wait_seconds (float): Max no. of seconds to wait, eg. the time left before the render deadline.
+                                    If None, wait as long as needed.
+
+        Output:
+        - wait_seconds (float): No. of seconds spent waiting, or None if no token was taken,
+                                as none would be available within max_wait_seconds.
+        """
+
+        start_time = time.monotonic()
+
+        with self._lock:
+            self._waiting += 1
+
+        try:
+            while True:
+                sleep_seconds = self._try_take()
+                if sleep_seconds == 0:
+                    break
+                # Given up without sleeping, as the wait would end after max_wait_seconds
+                if max_wait_seconds is not None and time.monotonic() - start_time + sleep_seconds > max_wait_seconds:
+                    metrics.increment(f'{self.name}.wait_exceeded')
+                    return None
+                time.sleep(sleep_seconds)
+        finally:
+            with self._lock:
+                self._waiting -= 1
+
+        wait_seconds = time.monotonic() - start_time
+        metrics.observe(f'{self.name}.wait_seconds', wait_seconds)
+
+        return wait_seconds
+
+    def stats(self):
+        """
+        Return the no. of threads waiting for a token.
+        """
+
+        with self._lock:
+            return {'queue_depth': self._waiting}
+
+    def _try_take(self):
+        # Take a token if available and return 0,
+        # else return the no. of seconds until the next token is added
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0
+
+            return (1 - self._tokens) / self.rate
+
+
+class FileTokenBucket(TokenBucket):
+    """
+    Token bucket shared by all processes that use the same state file, eg. several Streamlit workers.
+
+    The bucket state is kept in a small JSON file, which is locked while it is updated.
+    Only available on platforms with fcntl (Linux and macOS).
+    """
+
+    def __init__(self, name, rate, path, capacity=None):
+        super().__init__(name, rate, capacity)
+        self.path = path
+
+    def _try_take(self):
+        # Imported here as fcntl does not exist on Windows
+        import fcntl
+
+        with open(self.path, 'a+') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                content = f.read()
+                state = json.loads(content) if content else {'tokens': self.capacity, 'updated_at': time.time()}
+
+                # Wall clock time, as monotonic time is not shared between processes
+                now = time.time()
+                tokens = min(self.capacity, state['tokens'] + max(0, now - state['updated_at']) * self.rate)
+
+                if tokens >= 1:
+                    tokens -= 1
+                    sleep_seconds = 0
+                else:
+                    sleep_seconds = (1 - tokens) / self.rate
+
+                f.seek(0)
+                f.truncate()
+                json.dump({'tokens': tokens, 'updated_at': now}, f)
+                f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+        return sleep_seconds
+
+
+class SingleFlight:
+    """
+    Coalesces identical calls made at the same time.
+
+    While a call for a key is running, other callers of do() with the same key wait for it
+    and get its result (or a copy of its exception) instead of making the call again.
+    Waiting callers keep their own render deadline (see functions.circuit_breaker): they wait at most until it,
+    and make the call themselves if the running call was only cut short by the deadline of its caller.
+    The no. of coalesced calls is counted in functions.metrics under name.
+    """
+
+    def __init__(self, name, upstream):
+        """
+        Input:
+        - name (string): Name used for the metrics.
+        - upstream (string): Name of the breaker of the upstream, for the DeadlineExceededError of waiting callers.
+        """
+
+        self.name = name
+        self.upstream = upstream
+        self._lock = threading.Lock()
+        self._calls = {}  # Key -> [done event, result, exception]
+
+        metrics.register_gauges(name, self.stats)
+
+    def do(self, key, func):
+        """
+        Return func(), or the result of the call of func already running for key.
+
+        Input:
+        - key (string): Identifies identical calls, eg. the request URL.
+        - func (function): Function with no arguments that makes the call.
+
+        Output:
+        - result: Return value of func. The exception of the call is raised, as a copy in the waiting callers.
+                  DeadlineExceededError is raised if the deadline of a waiting caller passes before the call ends.
+        """
+
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                is_leader = call is None
+                if is_leader:
+                    call = [threading.Event(), None, None]
+                    self._calls[key] = call
+
+            if is_leader:
+                break
+
+            metrics.increment(f'{self.name}.coalesced')
+
+            remaining_seconds = get_remaining_seconds()
+            if not call[0].wait(None if remaining_seconds is None else max(0, remaining_seconds)):
+                raise skip_call(self.upstream)
+
+            # Cut short by the deadline of its caller, which may be sooner than the one of this caller
+            if isinstance(call[2], DeadlineExceededError):
+                continue
+
+            if call[2] is not None:
+                raise copy_exception(call[2]) from call[2]
+            return call[1]
+
+        try:
+            call[1] = func()
+        except BaseException as e:
+            call[2] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call[0].set()
+
+        return call[1]
+
+    def stats(self):
+        """
+        Return the no. of calls in flight.
+        """
+
+        with self._lock:
+            return {'in_flight': len(self._calls)}
+
+
+def copy_exception(e):
+    """
+    Return a new exception of the same type as e, with the same attributes.
+    Raising the same exception in several threads at the same time would mix up its traceback.
+
+    Input:
+    - e (BaseException): Exception to copy, eg. the HTTPError of a call shared by several callers.
+    """
+
+    # Without calling __init__, whose arguments differ between exception types
+    copied = type(e).__new__(type(e), *e.args)
+    copied.args = e.args
+    copied.__dict__.update(e.__dict__)
+
+    return copied
+
+
+def create_token_bucket(name, rate, path=None):
+    """
+    Return a FileTokenBucket if path is given, else a TokenBucket.
+
+    Input:
+    - name (string): Name used for the metrics.
+    - rate (float): No. of requests allowed per second.
+    - path (string): State file shared by processes. If None, the bucket is only shared within the process.
+    """
+
+    if path:
+        return FileTokenBucket(name, rate, path)
+
+    return TokenBucket(name, rate)
+
+
+# OpenAlex allows 10 requests per second. Set OPENALEX_RATE_LIMIT_FILE to share the limit between processes.
+openalex_limiter = create_token_bucket('openalex_rate_limit',
+                                       float(os.environ.get('OPENALEX_RATE_LIMIT', 10)),
+                                       os.environ.get('OPENALEX_RATE_LIMIT_FILE'))
+openalex_single_flight = SingleFlight('openalex_single_flight', openalex_breaker.name)
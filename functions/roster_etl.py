@@ -0,0 +1,387 @@
+import argparse
+import hashlib
+import inspect
+import os
+import re
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+# Roster from the DR-NTU scrape, and the roster used by the dashboard built from it
+# by 'python -m functions.roster_etl build'
+DEFAULT_INPUT_CSV = 'Takesawa_Saori.csv'
+DEFAULT_OUTPUT = 'Takesawa_Saori_updated'
+
+# Folder of the cached outputs of the stages, see run_stage()
+CACHE_DIR = os.environ.get('DASHBOARD_ETL_CACHE_DIR', 'etl_cache')
+
+# Columns of the built roster, in order
+OUTPUT_COLUMNS = ['Name', 'Email', 'dr_ntu_link', 'website_link', 'dblp_link', 'citations_all_num',
+                  'orcid_link', 'img_link', 'google_scholar_link', 'Interests']
+
+# Columns holding lists, which are written as stringified lists (eg. "['a', 'b']") like the notebook did
+LIST_COLUMNS = ['website_link', 'Interests']
+
+# Links moved out of website_link into their own columns: (column, link part kept, link part removed).
+# Only the first link containing the kept part is kept, but every link containing the removed part is dropped from website_link.
+ORCID_LINKS = ('orcid_link', 'https://orcid.org/', 'https://orcid.org')
+GOOGLE_SCHOLAR_LINKS = ('google_scholar_link', 'https://scholar.google.com', 'https://scholar.google')
+
+
+def get_item_pattern(part):
+    """
+    Return the regex of an item of a stringified list of links (eg. "['a', \"b'c\"]") containing part,
+    with the item (without its quotes) as the group 'single' or 'double', by the quotes used by repr().
+
+    Input:
+    - part (string): Text the item contains, eg. 'https://orcid.org'.
+    """
+
+    part = re.escape(part)
+
+    # repr() quotes each link with a quote it does not contain, so an item is the text between two quotes of the same style
+    return rf"'(?P<single>[^']*{part}[^']*)'|\"(?P<double>[^\"]*{part}[^\"]*)\""
+
+
+def to_list_strings(column):
+    """
+    Return a column of lists as stringified lists, eg. "['a', 'b']", as written by the notebook.
+    Missing lists, and values that are already strings, are kept as they are.
+
+    Input:
+    - column (pd.Series): Lists, stringified lists, or None.
+    """
+
+    return column.map(lambda value: str(list(value)) if isinstance(value, (list, tuple, np.ndarray)) else value)
+
+
+def move_links(website_links, column, kept_part, removed_part):
+    """
+    Return website_links without the links containing removed_part, and the first link containing kept_part as column.
+    The stringified lists are edited with regexes, without parsing each list. They are matched as pyarrow strings,
+    whose regexes run over the whole column without a Python call per row.
+
+    Input:
+    - website_links (pd.Series): Stringified lists of links, as in the csv. Missing values are nan.
+    - column (string): Name of the column of the moved link.
+    - kept_part (string): Part of the link moved to column, eg. 'https://orcid.org/'.
+    - removed_part (string): Links containing it are dropped from website_links, eg. 'https://orcid.org'.
+    """
+
+    website_links = website_links.astype('string[pyarrow]')
+
+    # First match of the row, in either quote style
+    moved = website_links.str.extract(get_item_pattern(kept_part))
+    moved = moved['single'].fillna(moved['double'])
+
+    # Each removed link with the separator before it, then the separator left after '[' if the first link was removed
+    kept = (website_links.str.replace(rf'(?:, )?(?:{get_item_pattern(removed_part)})', '', regex=True)
+            .str.replace(r'^\[, ', '[', regex=True))
+
+    return pd.DataFrame({'website_link': kept, column: moved})
+
+
+def extract_orcid_links(roster):
+    # ORCID link out of the website links
+    return move_links(roster['website_link'], *ORCID_LINKS)
+
+
+def extract_google_scholar_links(roster):
+    # Google Scholar link out of the website links
+    return move_links(roster['website_link'], *GOOGLE_SCHOLAR_LINKS)
+
+
+def fill_missing_orcid_links(roster):
+    # ORCID link of the faculty without one, from their OpenAlex author record.
+    # Imported here, as only this stage needs the API modules.
+    import functions.openalex_api_utils as api_utils
+    from functions.faculty import Faculty, get_faculty_id
+
+    orcid_links = roster['orcid_link'].copy()
+    author_ids = {}
+
+    for row in roster.index[roster['orcid_link'].isna()]:
+        faculty = Faculty(get_faculty_id(roster.at[row, 'dr_ntu_link'], roster.at[row, 'Email'], roster.at[row, 'Name']),
+                          name=roster.at[row, 'Name'], dr_ntu_link=roster.at[row, 'dr_ntu_link'])
+        faculty_api_id, retrieve_method = api_utils.get_api_id_and_method(faculty)
+        if retrieve_method:
+            author_ids[row] = faculty_api_id
+
+    # One request for up to AUTHOR_BATCH_SIZE faculty
+    records = api_utils.get_author_records(list(author_ids.values()))
+    for row, author_id in author_ids.items():
+        orcid_links[row] = records.get(author_id, {}).get('orcid') or orcid_links[row]
+
+    return pd.DataFrame({'orcid_link': orcid_links})
+
+
+def get_interests(drNTU_link):
+    # Interests of one faculty (without the tag of the school), or None if they have none or their page cannot be read
+    import functions.dr_ntu_utils as ntu_utils
+    from functions.circuit_breaker import UpstreamUnavailableError
+
+    try:
+        interests = ntu_utils.get_research_interest_from_drNTU(drNTU_link)
+    except (AttributeError, UpstreamUnavailableError):
+        return None
+
+    return interests or None
+
+
+def scrape_interests(roster):
+    # Interest tags of each faculty from their DR-NTU page
+    return pd.DataFrame({'Interests': roster['dr_ntu_link'].map(get_interests)})
+
+
+def scrape_image_links(roster):
+    # Profile image of each faculty from their DR-NTU page
+    import functions.dr_ntu_utils as ntu_utils
+
+    return pd.DataFrame({'img_link': roster['dr_ntu_link'].map(ntu_utils.get_image_link_from_drNTU)})
+
+
+def get_code_hash(func, digest=None, seen=None):
+    """
+    Return the hash of the source of func and of the functions and constants of this module it uses, directly or not,
+    so that a change to a shared helper (eg. move_links) also changes the key of the stages using it.
+
+    Input:
+    - func (function): Function of a stage.
+    - digest (hashlib object): Hash updated with the sources, used by the recursive calls.
+    - seen ( Set(string) ): Names of the functions already hashed, used by the recursive calls.
+    """
+
+    digest = hashlib.sha256() if digest is None else digest
+    seen = set() if seen is None else seen
+
+    seen.add(func.__name__)
+    digest.update(inspect.getsource(func).encode('utf-8'))
+
+    # Functions of other modules (eg. the DR-NTU extractors) are left out, their output is cached by their own stores
+    for name in sorted(func.__code__.co_names):
+        value = globals().get(name)
+        if name in seen:
+            continue
+        if inspect.isfunction(value) and value.__module__ == __name__:
+            get_code_hash(value, digest, seen)
+        elif isinstance(value, (str, tuple, list)):
+            seen.add(name)
+            digest.update(repr(value).encode('utf-8'))
+
+    return digest
+
+
+class Stage:
+    """
+    One step of the roster build: a function of some columns of the roster, returning new or changed columns.
+    Stages needing the network (DR-NTU or OpenAlex) are not run with --offline, unless their output is cached.
+    """
+
+    def __init__(self, name, input_columns, output_columns, func, needs_network=False):
+        self.name = name
+        self.input_columns = input_columns
+        self.output_columns = output_columns
+        self.func = func
+        self.needs_network = needs_network
+
+    def get_key(self, roster):
+        """
+        Return the hash of the stage code (see get_code_hash) and of its input columns, used as the key of its cached output.
+
+        Input:
+        - roster (pd.DataFrame): Roster before the stage.
+        """
+
+        digest = get_code_hash(self.func)
+        # Lists are hashed as their stringified form, as pandas cannot hash lists
+        inputs = roster[self.input_columns].apply(to_list_strings).astype(str)
+        digest.update(pd.util.hash_pandas_object(inputs, index=True).values.tobytes())
+
+        return digest.hexdigest()[:16]
+
+
+# Stages of the build, in order. Each one works on the output of the previous ones.
+STAGES = [
+    Stage('orcid_links', ['website_link'], ['website_link', 'orcid_link'], extract_orcid_links),
+    Stage('google_scholar_links', ['website_link'], ['website_link', 'google_scholar_link'], extract_google_scholar_links),
+    Stage('missing_orcid_links', ['Name', 'dr_ntu_link', 'orcid_link'], ['orcid_link'], fill_missing_orcid_links,
+          needs_network=True),
+    Stage('interests', ['dr_ntu_link'], ['Interests'], scrape_interests, needs_network=True),
+    Stage('image_links', ['dr_ntu_link'], ['img_link'], scrape_image_links, needs_network=True),
+]
+
+# Stages only run when asked for. Faculty with an ORCID profile list it in their website links,
+# and the notebook's search of the missing ones found none.
+OPTIONAL_STAGES = ['missing_orcid_links']
+
+
+def run_stage(stage, roster, cache_dir, offline=False, rerun=False):
+    """
+    Return the output columns of a stage, from its cache if its code and input columns have not changed.
+
+    Input:
+    - stage (Stage): Stage to run.
+    - roster (pd.DataFrame): Roster before the stage.
+    - cache_dir (string): Folder of the cached outputs, as <stage name>-<key>.pkl.
+    - offline (bool): True to not run stages needing the network. Their cached output is still used.
+    - rerun (bool): True to run the stage even if its output is cached, eg. to scrape DR-NTU again.
+
+    Output:
+    - output (pd.DataFrame): Output columns, or None if the stage needs the network and offline is True.
+    - status (string): 'cached', 'ran' or 'skipped'.
+    """
+
+    cache_path = os.path.join(cache_dir, f'{stage.name}-{stage.get_key(roster)}.pkl')
+
+    if os.path.exists(cache_path) and not rerun:
+        return pd.read_pickle(cache_path), 'cached'
+
+    if stage.needs_network and offline:
+        return None, 'skipped'
+
+    output = stage.func(roster)
+
+    # Written to a temporary file first, so that an interrupted build does not leave a partial cache
+    os.makedirs(cache_dir, exist_ok=True)
+    output.to_pickle(cache_path + '.tmp')
+    os.replace(cache_path + '.tmp', cache_path)
+
+    return output, 'ran'
+
+
+def build_roster(input_csv=DEFAULT_INPUT_CSV, cache_dir=CACHE_DIR, offline=False, rerun=(), optional=()):
+    """
+    Return the dashboard roster built from the DR-NTU scrape, and the columns that could not be built.
+
+    Input:
+    - input_csv (string): Roster from the DR-NTU scrape, with Name, Email, dr_ntu_link, website_link, dblp_link
+                          and citations_all_num.
+    - cache_dir (string): Folder of the cached outputs of the stages.
+    - offline (bool): True to not run stages needing the network, see run_stage().
+    - rerun ( List(string) ): Names of the stages to run even if their output is cached.
+    - optional ( List(string) ): Names of the OPTIONAL_STAGES to run.
+
+    Output:
+    - roster (pd.DataFrame): Roster with the OUTPUT_COLUMNS that could be built, lists as stringified lists.
+    - skipped_columns ( List(string) ): Columns of the stages skipped as they need the network.
+    """
+
+    roster = pd.read_csv(input_csv)
+    skipped_columns = []
+
+    for stage in STAGES:
+        if stage.name in OPTIONAL_STAGES and stage.name not in optional:
+            continue
+
+        output, status = run_stage(stage, roster, cache_dir, offline, stage.name in rerun)
+        print(f'{stage.name:>22}: {status}')
+
+        if output is None:
+            skipped_columns.extend(column for column in stage.output_columns if column not in roster.columns)
+            continue
+
+        roster = roster.assign(**{column: output[column] for column in stage.output_columns})
+
+    for column in LIST_COLUMNS:
+        if column in roster.columns:
+            roster[column] = to_list_strings(roster[column])
+
+    return roster[[column for column in OUTPUT_COLUMNS if column in roster.columns]], skipped_columns
+
+
+def write_roster(roster, output):
+    """
+    Write the roster to <output>.csv and <output>.parquet.
+
+    Input:
+    - roster (pd.DataFrame): Roster from build_roster().
+    - output (string): Path of the files, without extension.
+    """
+
+    roster.to_csv(output + '.csv', index=False)
+    roster.to_parquet(output + '.parquet', index=False)
+
+
+def compare_rosters(expected_csv, actual_csv):
+    """
+    Return the rows that differ between two roster csv files, by column.
+
+    Input:
+    - expected_csv (string): Roster the output should match, eg. the current Takesawa_Saori_updated.csv.
+    - actual_csv (string): Roster written by write_roster().
+
+    Output:
+    - differences ( Dict(string, List(int)) ): Rows that differ, by column. Columns missing from actual_csv are left out.
+                                                A column missing from expected_csv, or a different no. of rows, is a difference.
+    """
+
+    expected = pd.read_csv(expected_csv)
+    actual = pd.read_csv(actual_csv)
+
+    if len(expected) != len(actual):
+        return {'(rows)': list(range(abs(len(expected) - len(actual))))}
+
+    differences = {}
+    for column in actual.columns:
+        if column not in expected.columns:
+            differences[column] = list(range(len(actual)))
+            continue
+        is_same = (expected[column] == actual[column]) | (expected[column].isna() & actual[column].isna())
+        if not is_same.all():
+            differences[column] = list(np.flatnonzero(~is_same.to_numpy()))
+
+    return differences
+
+
+def check(input_csv, expected, cache_dir, offline, rerun, optional):
+    """
+    Build the roster into a temporary folder and compare it with the current one. Return the exit code:
+    1 if any built column differs from the current roster, else 0.
+    """
+
+    roster, skipped_columns = build_roster(input_csv, cache_dir, offline, rerun, optional)
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        write_roster(roster, os.path.join(output_dir, 'roster'))
+        differences = compare_rosters(expected + '.csv', os.path.join(output_dir, 'roster.csv'))
+
+    for column, rows in differences.items():
+        print(f'{column}: {len(rows)} rows differ, eg. rows {rows[:5]}')
+
+    if skipped_columns:
+        print(f'Not checked, as they need the network: {", ".join(skipped_columns)}')
+
+    print('Same as the current roster' if not differences else f'Differs from {expected}.csv')
+
+    return 1 if differences else 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build the dashboard roster from the DR-NTU scrape.')
+    parser.add_argument('command', choices=['build'])
+    parser.add_argument('--csv', default=DEFAULT_INPUT_CSV, help='Roster from the DR-NTU scrape.')
+    parser.add_argument('--out', default=DEFAULT_OUTPUT, help='Path of the built roster, without .csv or .parquet.')
+    parser.add_argument('--cache-dir', default=CACHE_DIR, help='Folder of the cached outputs of the stages.')
+    parser.add_argument('--offline', action='store_true', help='Do not run stages needing the network, only use their cache.')
+    parser.add_argument('--rerun', nargs='*', default=[], choices=[stage.name for stage in STAGES],
+                        help='Stages to run even if their output is cached.')
+    parser.add_argument('--fill-orcid', action='store_true', help='Also search OpenAlex for missing ORCID links.')
+    parser.add_argument('--check', action='store_true',
+                        help='Compare the build with the roster at --out instead of writing it. Exit code 1 if they differ.')
+    args = parser.parse_args()
+
+    optional = ['missing_orcid_links'] if args.fill_orcid else []
+
+    if args.check:
+        sys.exit(check(args.csv, args.out, args.cache_dir, args.offline, args.rerun, optional))
+
+    roster, skipped_columns = build_roster(args.csv, args.cache_dir, args.offline, args.rerun, optional)
+
+    if skipped_columns:
+        print(f'Not written, as {", ".join(skipped_columns)} need the network and are not cached')
+        sys.exit(1)
+
+    write_roster(roster, args.out)
+    print(f'Wrote {args.out}.csv and {args.out}.parquet: {len(roster)} faculty')
@@ -0,0 +1,479 @@
+import argparse
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter, defaultdict
+
+import numpy as np
+import pandas as pd
+
+import functions.openalex_api_utils as api_utils
+from functions.faculty import Faculty
+
+# SQLite file of the search index, built by 'python -m functions.search_index harvest'
+INDEX_PATH = os.environ.get('DASHBOARD_SEARCH_INDEX', 'search_index.sqlite')
+
+# Roster csv of the faculty whose works are harvested
+DEFAULT_ROSTER_CSV = 'Takesawa_Saori_updated.csv'
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Fields of OpenAlex works requested when harvesting
+HARVEST_FIELDS = ['id', 'title', 'publication_date', 'doi', 'updated_date', 'abstract_inverted_index']
+
+# Common English words that are not indexed
+STOPWORDS = frozenset('''
+a an and are as at be by for from has have in is it its of on or that the this to was were which with
+we our their these those using based via into than can not also new
+'''.split())
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS works (
+    doc INTEGER PRIMARY KEY,
+    work_id TEXT UNIQUE NOT NULL,
+    title TEXT,
+    publication_date TEXT,
+    doi TEXT,
+    updated_date TEXT,
+    length INTEGER NOT NULL,
+    terms TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT PRIMARY KEY,
+    docs BLOB NOT NULL,
+    tfs BLOB NOT NULL,
+    lengths BLOB NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS work_faculty (
+    doc INTEGER NOT NULL,
+    faculty_id TEXT NOT NULL,
+    PRIMARY KEY (doc, faculty_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS work_faculty_faculty ON work_faculty (faculty_id);
+CREATE TABLE IF NOT EXISTS faculty (
+    faculty_id TEXT PRIMARY KEY,
+    name TEXT,
+    harvested_at REAL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meta VALUES ('version', 0);
+INSERT OR IGNORE INTO meta VALUES ('work_count', 0);
+INSERT OR IGNORE INTO meta VALUES ('total_length', 0);
+'''
+
+
+def tokenize(text):
+    """
+    Return the indexed terms of text, in order.
+
+    Input:
+    - text (string): Title, abstract or query.
+
+    Output:
+    - terms ( List(string) ): Lowercase words and numbers, without stopwords and single letters.
+    """
+
+    if not text:
+        return []
+
+    return [term for term in re.findall(r'\w+', text.lower()) if len(term) > 1 and term not in STOPWORDS]
+
+
+def rebuild_abstract(inverted_index):
+    """
+    Return the abstract of a work from its OpenAlex abstract_inverted_index.
+    Return None if the work has no abstract.
+
+    Input:
+    - inverted_index (Dict): Word -> list of positions of the word in the abstract.
+    """
+
+    if not inverted_index:
+        return None
+
+    positions = []
+    for word, word_positions in inverted_index.items():
+        for position in word_positions:
+            positions.append((position, word))
+
+    positions.sort()
+    return ' '.join(word for _, word in positions)
+
+
+class SearchIndex:
+    """
+    BM25 inverted index over the titles and abstracts of faculty works, stored in a SQLite file.
+
+    Each term has one row holding its posting list as arrays (doc numbers, term frequencies
+    and doc lengths), so a query reads one row per query term and is scored with numpy.
+    Works are added (or replaced) one faculty at a time with add_faculty_works(),
+    so the index is updated incrementally while works are harvested.
+    """
+
+    def __init__(self, path=INDEX_PATH):
+        self.path = path
+        # Connections are shared by the threads of the Streamlit server
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+
+        # Links of works to faculty, read again when the index version changes (see _get_links())
+        self._links_version = None
+        self._links = None
+
+        with self._lock:
+            self._conn.executescript(SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    def get_harvested_at(self, faculty_id):
+        """
+        Return the time the works of a faculty were last added, or None if they never were.
+
+        Input:
+        - faculty_id (string): DR-NTU researcher id of the faculty (eg. 'rp00083').
+        """
+
+        with self._lock:
+            row = self._conn.execute('SELECT harvested_at FROM faculty WHERE faculty_id = ?', (faculty_id,)).fetchone()
+
+        return row[0] if row else None
+
+    def add_faculty_works(self, faculty, works):
+        """
+        Index the works of a faculty, replacing the works indexed for them before.
+        Works that are already indexed with the same updated_date are not re-indexed.
+
+        Input:
+        - faculty (Faculty): Faculty detail from the csv.
+        - works ( List(Dict) ): Works from OpenAlex API, with the fields of HARVEST_FIELDS.
+
+        Output:
+        - indexed_count (int): No. of works whose terms were (re-)indexed.
+        """
+
+        # Term -> {doc: (tf, length)} of postings to add, and term -> docs to remove
+        added = defaultdict(dict)
+        removed = defaultdict(set)
+        indexed_count = 0
+
+        with self._lock, self._conn:
+            self._conn.execute('INSERT OR REPLACE INTO faculty VALUES (?, ?, ?)',
+                               (faculty.faculty_id, faculty.name, time.time()))
+
+            previous_docs = [row[0] for row in self._conn.execute(
+                'SELECT doc FROM work_faculty WHERE faculty_id = ?', (faculty.faculty_id,))]
+            self._conn.execute('DELETE FROM work_faculty WHERE faculty_id = ?', (faculty.faculty_id,))
+
+            for work in works:
+                work_id = work['id'].split('https://openalex.org/')[-1]
+                row = self._conn.execute('SELECT doc, updated_date, terms FROM works WHERE work_id = ?',
+                                         (work_id,)).fetchone()
+
+                if row and row[1] == work.get('updated_date'):
+                    doc = row[0]
+                else:
+                    terms = tokenize(work.get('title')) + tokenize(rebuild_abstract(work.get('abstract_inverted_index')))
+                    term_counts = Counter(terms)
+
+                    if row:
+                        doc = row[0]
+                        for term in row[2].split():
+                            removed[term].add(doc)
+                        self._conn.execute('UPDATE works SET title = ?, publication_date = ?, doi = ?, updated_date = ?, '
+                                           'length = ?, terms = ? WHERE doc = ?',
+                                           (work.get('title'), work.get('publication_date'), work.get('doi'),
+                                            work.get('updated_date'), len(terms), ' '.join(term_counts), doc))
+                    else:
+                        doc = self._conn.execute('INSERT INTO works (work_id, title, publication_date, doi, updated_date, '
+                                                 'length, terms) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                                                 (work_id, work.get('title'), work.get('publication_date'), work.get('doi'),
+                                                  work.get('updated_date'), len(terms), ' '.join(term_counts))).lastrowid
+
+                    for term, tf in term_counts.items():
+                        added[term][doc] = (tf, len(terms))
+                    indexed_count += 1
+
+                self._conn.execute('INSERT OR IGNORE INTO work_faculty VALUES (?, ?)', (doc, faculty.faculty_id))
+
+            # Works of the faculty that are no longer listed for any faculty are removed
+            for doc in previous_docs:
+                if self._conn.execute('SELECT 1 FROM work_faculty WHERE doc = ?', (doc,)).fetchone() is None:
+                    terms = self._conn.execute('SELECT terms FROM works WHERE doc = ?', (doc,)).fetchone()[0]
+                    for term in terms.split():
+                        removed[term].add(doc)
+                    self._conn.execute('DELETE FROM works WHERE doc = ?', (doc,))
+
+            # Each changed posting list is read and written once
+            for term in set(added) | set(removed):
+                self._update_postings(term, added.get(term, {}), removed.get(term, set()))
+
+            # Kept in meta, so that search() does not have to go through all the works
+            work_count, total_length = self._conn.execute('SELECT COUNT(*), COALESCE(SUM(length), 0) FROM works').fetchone()
+            self._conn.executemany('UPDATE meta SET value = ? WHERE key = ?',
+                                   [(work_count, 'work_count'), (total_length, 'total_length')])
+            self._conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'version'")
+
+        return indexed_count
+
+    def search(self, query, limit=20):
+        """
+        Return the works that best match query, ranked by BM25, and the faculty who wrote them.
+
+        Input:
+        - query (string): Words to search for in the titles and abstracts.
+        - limit (int): Max no. of works and of faculty to return.
+
+        Output:
+        There will be two outputs wrapped in tuple: (works, faculty).
+        - works ( List(Dict) ): Dictionaries with 'work_id', 'title', 'publication_date', 'doi', 'score'
+                                and 'faculty_ids', best match first.
+        - faculty ( List(Dict) ): Dictionaries with 'faculty_id', 'name', 'score' (sum of the scores of their
+                                  matching works) and 'work_count', best match first.
+        """
+
+        terms = set(tokenize(query))
+        if len(terms) == 0:
+            return [], []
+
+        with self._lock:
+            meta = dict(self._conn.execute('SELECT key, value FROM meta'))
+            work_count, total_length = meta['work_count'], meta['total_length']
+            if work_count == 0:
+                return [], []
+            average_length = max(1, total_length / work_count)
+
+            term_docs = []
+            term_scores = []
+            for term in terms:
+                row = self._conn.execute('SELECT docs, tfs, lengths FROM postings WHERE term = ?', (term,)).fetchone()
+                if row is None:
+                    continue
+
+                docs = np.frombuffer(row[0], dtype=np.int64)
+                tfs = np.frombuffer(row[1], dtype=np.int32).astype(np.float64)
+                lengths = np.frombuffer(row[2], dtype=np.int32)
+
+                idf = math.log(1 + (work_count - len(docs) + 0.5) / (len(docs) + 0.5))
+                norms = BM25_K1 * (1 - BM25_B + BM25_B * lengths / average_length)
+                term_docs.append(docs)
+                term_scores.append(idf * tfs * (BM25_K1 + 1) / (tfs + norms))
+
+            if len(term_docs) == 0:
+                return [], []
+
+            # Sum the scores of each doc over the query terms
+            docs, inverse = np.unique(np.concatenate(term_docs), return_inverse=True)
+            scores = np.bincount(inverse, weights=np.concatenate(term_scores))
+
+            top = np.argsort(-scores, kind='stable')[:limit]
+            top_docs = docs[top].tolist()
+            placeholders = ','.join('?' * len(top_docs))
+            work_rows = {row[0]: row[1:] for row in self._conn.execute(
+                f'SELECT doc, work_id, title, publication_date, doi FROM works WHERE doc IN ({placeholders})', top_docs)}
+
+            link_docs, link_faculty, faculty_ids, faculty_names = self._get_links()
+
+        # Faculty scores are taken from all matching works, not only the top ones
+        link_positions = np.searchsorted(docs, link_docs)
+        link_positions[link_positions == len(docs)] = 0
+        is_match = docs[link_positions] == link_docs
+        faculty_scores = np.bincount(link_faculty[is_match], weights=scores[link_positions[is_match]],
+                                     minlength=len(faculty_ids))
+        faculty_work_counts = np.bincount(link_faculty[is_match], minlength=len(faculty_ids))
+
+        works = []
+        for doc, score in zip(top_docs, scores[top].tolist()):
+            work_id, title, publication_date, doi = work_rows[doc]
+            faculty_indices = link_faculty[is_match & (link_docs == doc)]
+            works.append({'work_id': work_id, 'title': title, 'publication_date': publication_date, 'doi': doi,
+                          'score': score, 'faculty_ids': [faculty_ids[i] for i in faculty_indices]})
+
+        faculty = []
+        for i in np.argsort(-faculty_scores, kind='stable')[:limit]:
+            if faculty_work_counts[i] == 0:
+                break
+            faculty.append({'faculty_id': faculty_ids[i], 'name': faculty_names[i],
+                            'score': float(faculty_scores[i]), 'work_count': int(faculty_work_counts[i])})
+
+        return works, faculty
+
+    def stats(self):
+        """
+        Return the no. of faculty, works and distinct terms in the index.
+        """
+
+        with self._lock:
+            return {
+                'faculty': self._conn.execute('SELECT COUNT(*) FROM faculty').fetchone()[0],
+                'works': self._conn.execute('SELECT COUNT(*) FROM works').fetchone()[0],
+                'terms': self._conn.execute('SELECT COUNT(*) FROM postings').fetchone()[0],
+            }
+
+    def _update_postings(self, term, added, removed):
+        # Replace the posting list of term, with the docs in removed taken out and the docs in added put in
+        row = self._conn.execute('SELECT docs, tfs, lengths FROM postings WHERE term = ?', (term,)).fetchone()
+
+        if row is None:
+            docs = np.empty(0, dtype=np.int64)
+            tfs = np.empty(0, dtype=np.int32)
+            lengths = np.empty(0, dtype=np.int32)
+        else:
+            docs = np.frombuffer(row[0], dtype=np.int64)
+            tfs = np.frombuffer(row[1], dtype=np.int32)
+            lengths = np.frombuffer(row[2], dtype=np.int32)
+
+        keep = ~np.isin(docs, list(removed | set(added)))
+        docs = np.concatenate([docs[keep], np.array(list(added), dtype=np.int64)])
+        tfs = np.concatenate([tfs[keep], np.array([value[0] for value in added.values()], dtype=np.int32)])
+        lengths = np.concatenate([lengths[keep], np.array([value[1] for value in added.values()], dtype=np.int32)])
+
+        if len(docs) == 0:
+            self._conn.execute('DELETE FROM postings WHERE term = ?', (term,))
+            return
+
+        order = np.argsort(docs, kind='stable')
+        self._conn.execute('INSERT OR REPLACE INTO postings VALUES (?, ?, ?, ?)',
+                           (term, docs[order].tobytes(), tfs[order].tobytes(), lengths[order].tobytes()))
+
+    def _get_links(self):
+        # Return (link_docs, link_faculty, faculty_ids, faculty_names) for all links of works to faculty,
+        # where link_faculty indexes faculty_ids. Must be called with the lock held.
+        version = self._conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+
+        if version != self._links_version:
+            faculty_rows = self._conn.execute('SELECT faculty_id, name FROM faculty ORDER BY faculty_id').fetchall()
+            faculty_ids = [row[0] for row in faculty_rows]
+            faculty_names = [row[1] for row in faculty_rows]
+            faculty_indices = {faculty_id: i for i, faculty_id in enumerate(faculty_ids)}
+
+            link_rows = self._conn.execute('SELECT doc, faculty_id FROM work_faculty').fetchall()
+            link_docs = np.array([row[0] for row in link_rows], dtype=np.int64)
+            link_faculty = np.array([faculty_indices[row[1]] for row in link_rows], dtype=np.int64)
+
+            self._links = (link_docs, link_faculty, faculty_ids, faculty_names)
+            self._links_version = version
+
+        return self._links
+
+
+def fetch_all_works(author_id):
+    """
+    Return all works of an author from OpenAlex API, with the fields of HARVEST_FIELDS.
+    Uses cursor paging, so it is not limited to the first 10000 results.
+
+    Input:
+    - author_id (string): Unique author ID, from OpenAlex API.
+    """
+
+    works = []
+    cursor = '*'
+
+    while cursor:
+        response_json = api_utils.request_json('https://api.openalex.org/works?filter=author.id:' + author_id
+                                               + '&select=' + ','.join(HARVEST_FIELDS)
+                                               + '&per-page=200&cursor=' + cursor)
+        works.extend(response_json['results'])
+        cursor = response_json['meta'].get('next_cursor') if len(response_json['results']) > 0 else None
+
+    return works
+
+
+def fetch_faculty_works(faculty, stage_times):
+    """
+    Return all works of a faculty from OpenAlex API, or None if they are not found in OpenAlex.
+    Run in the worker processes of functions.harvest.
+
+    Input:
+    - faculty (Faculty): Faculty detail from the csv.
+    - stage_times (StageTimes): Time taken by each stage.
+    """
+
+    with stage_times.measure('api_id'):
+        faculty_api_id, retrieve_method = api_utils.get_api_id_and_method(faculty)
+    if not retrieve_method:
+        return None
+
+    with stage_times.measure('works'):
+        return fetch_all_works(faculty_api_id)
+
+
+def harvest(roster_csv=DEFAULT_ROSTER_CSV, index_path=INDEX_PATH, max_age=None, processes=None, threads=None):
+    """
+    Fetch the works of every faculty in roster_csv and add them to the search index.
+    Works are fetched by the worker processes of functions.harvest, and indexed in this process.
+    The index is committed after each faculty, so it can be searched while the harvest runs.
+
+    Input:
+    - roster_csv (string): Path of the faculty csv.
+    - index_path (string): Path of the SQLite index file.
+    - max_age (float): If given, faculty harvested less than max_age seconds ago are skipped.
+    - processes (int): No. of worker processes. Default to harvest.PROCESSES.
+    - threads (int): No. of threads in each worker process. Default to harvest.THREADS_PER_PROCESS.
+    """
+
+    # Imported as a module name, as harvest is also the name of this function
+    import functions.harvest as harvest_module
+
+    index = SearchIndex(index_path)
+    faculty_list = [Faculty.from_row(row) for _, row in pd.read_csv(roster_csv).iterrows()]
+
+    if max_age is not None:
+        harvested_ats = {faculty.faculty_id: index.get_harvested_at(faculty.faculty_id) for faculty in faculty_list}
+        faculty_list = [faculty for faculty in faculty_list
+                        if harvested_ats[faculty.faculty_id] is None
+                        or time.time() - harvested_ats[faculty.faculty_id] >= max_age]
+
+    for i, result in enumerate(harvest_module.harvest(faculty_list, fetch_faculty_works,
+                                                      processes or harvest_module.PROCESSES,
+                                                      threads or harvest_module.THREADS_PER_PROCESS)):
+        # Failed faculty keep their previous works, the rest of the roster is still harvested
+        works = result['value']
+        detail = None
+        if works is not None:
+            indexed_count = index.add_faculty_works(result['faculty'], works)
+            detail = f'{len(works)} works, {indexed_count} (re-)indexed'
+        elif not result['error']:
+            detail = 'not found in OpenAlex'
+        print(harvest_module.format_progress(i, len(faculty_list), result, detail))
+
+    print(index.stats())
+    index.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build or search the full-text index of faculty works.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    harvest_parser = subparsers.add_parser('harvest', help='Fetch the works of every faculty and index them.')
+    harvest_parser.add_argument('--csv', default=DEFAULT_ROSTER_CSV, help='Faculty csv to harvest.')
+    harvest_parser.add_argument('--index', default=INDEX_PATH, help='Path of the SQLite index file.')
+    harvest_parser.add_argument('--max-age-days', type=float, help='Skip faculty harvested more recently than this.')
+    harvest_parser.add_argument('--processes', type=int, help='No. of worker processes fetching the works.')
+    harvest_parser.add_argument('--threads', type=int, help='No. of threads in each worker process.')
+
+    search_parser = subparsers.add_parser('search', help='Search the index from the command line.')
+    search_parser.add_argument('query')
+    search_parser.add_argument('--index', default=INDEX_PATH, help='Path of the SQLite index file.')
+
+    args = parser.parse_args()
+
+    if args.command == 'harvest':
+        max_age = args.max_age_days * 24 * 60 * 60 if args.max_age_days is not None else None
+        harvest(args.csv, args.index, max_age, args.processes, args.threads)
+    else:
+        start_time = time.perf_counter()
+        works, faculty = SearchIndex(args.index).search(args.query)
+        print(f'{len(works)} works in {(time.perf_counter() - start_time) * 1000:.1f} ms')
+        for work in works:
+            print(f'{work["score"]:6.2f}  {work["title"]}  ({", ".join(work["faculty_ids"])})')
+        for member in faculty:
+            print(f'{member["score"]:6.2f}  {member["name"]}  ({member["work_count"]} works)')
@@ -0,0 +1,395 @@
+import argparse
+import json
+import math
+import os
+import shutil
+import time
+from contextlib import nullcontext
+from datetime import datetime
+from functools import lru_cache, partial
+
+import pandas as pd
+
+from functions.faculty import Faculty
+from functions.works_store import WorksTable
+
+# Folder containing the snapshot bundles, one sub-folder per version
+SNAPSHOT_DIR = os.environ.get('DASHBOARD_SNAPSHOT_DIR', 'snapshots')
+
+# Runtime switch. If set, the pages read only from this bundle version ('latest' for the newest one).
+SNAPSHOT_VERSION = os.environ.get('DASHBOARD_SNAPSHOT')
+
+# Name of the file in SNAPSHOT_DIR that holds the newest version
+LATEST_FILE = 'LATEST'
+
+# Roster csv used to build the bundle
+DEFAULT_ROSTER_CSV = 'Takesawa_Saori_updated.csv'
+
+# Version of the bundle layout, increased when the files written by build_snapshot() change
+BUNDLE_FORMAT = 3
+
+# Profile keys holding a WorksTable, saved as faculty/<faculty_id>.<name>.parquet next to the profile json
+WORKS_KEYS = {'recent_works': 'recent', 'cited_works': 'cited'}
+
+
+def is_enabled():
+    """
+    Return True if the pages should read from a snapshot bundle instead of calling the APIs.
+    """
+
+    return bool(SNAPSHOT_VERSION)
+
+
+def get_bundle_dir(version=None):
+    """
+    Return the folder of a snapshot bundle.
+
+    Input:
+    - version (string): Version of the bundle, or 'latest'.
+                        If None, the version of the DASHBOARD_SNAPSHOT environment variable is used.
+    """
+
+    version = version or SNAPSHOT_VERSION
+
+    if version == 'latest':
+        with open(os.path.join(SNAPSHOT_DIR, LATEST_FILE)) as f:
+            version = f.read().strip()
+
+    return os.path.join(SNAPSHOT_DIR, version)
+
+
+def get_dataset_version(roster_csv=DEFAULT_ROSTER_CSV):
+    """
+    Return the version of the faculty data read by the pages: the snapshot bundle in use,
+    or the modification time of the roster csv. Passed to the cached loaders of the roster,
+    so that they load it again after a new bundle is used or the csv is updated.
+
+    Input:
+    - roster_csv (string): Faculty csv read when snapshot mode is off.
+    """
+
+    if is_enabled():
+        return get_bundle_dir()
+
+    return f'{roster_csv}@{os.path.getmtime(roster_csv)}'
+
+
+@lru_cache(maxsize=1)
+def load_manifest():
+    """
+    Return the manifest of the snapshot bundle in use.
+    """
+
+    with open(os.path.join(get_bundle_dir(), 'manifest.json')) as f:
+        return json.load(f)
+
+
+def load_roster():
+    """
+    Return the faculty csv stored in the snapshot bundle in use.
+
+    Output:
+    - faculty_data (pd.DataFrame): Same columns as the roster csv.
+    """
+
+    return pd.read_parquet(os.path.join(get_bundle_dir(), 'roster.parquet'))
+
+
+@lru_cache(maxsize=256)
+def load_profile(faculty_id):
+    """
+    Return the prebuilt profile data of a faculty from the snapshot bundle in use.
+
+    Input:
+    - faculty_id (string): DR-NTU researcher id of the faculty (eg. 'rp00083').
+
+    Output:
+    - profile (Dict): Dictionary with the keys written by build_profile().
+                      If the faculty failed to build, the faculty is treated as not found in OpenAlex.
+    """
+
+    profile_path = os.path.join(get_bundle_dir(), 'faculty', faculty_id + '.json')
+
+    if not os.path.exists(profile_path):
+        return {'faculty_id': faculty_id, 'api_id': None, 'retrieve_method': None, 'bio': None}
+
+    with open(profile_path) as f:
+        profile = json.load(f)
+
+    for key, name in WORKS_KEYS.items():
+        works_path = os.path.join(get_bundle_dir(), 'faculty', f'{faculty_id}.{name}.parquet')
+        if os.path.exists(works_path):
+            profile[key] = WorksTable.read_parquet(works_path)
+
+    return profile
+
+
+def get_cube_dir():
+    """
+    Return the folder of the citation cube in the snapshot bundle in use.
+    """
+
+    return os.path.join(get_bundle_dir(), 'citation_cube')
+
+
+def get_thumbnail_path(faculty_id):
+    """
+    Return the path of the profile image of a faculty in the snapshot bundle in use.
+    Return None if the image was not downloaded.
+
+    Input:
+    - faculty_id (string): DR-NTU researcher id of the faculty (eg. 'rp00083').
+    """
+
+    thumbnail = load_manifest()['thumbnails'].get(faculty_id)
+
+    if thumbnail is None:
+        return None
+
+    return os.path.join(get_bundle_dir(), thumbnail)
+
+
+def build_profile(faculty, stage_times=None):
+    """
+    Return all the data shown on the profile page of a faculty, by running the same data functions as the page.
+
+    Input:
+    - faculty (Faculty): Faculty detail from the csv.
+    - stage_times (StageTimes): If given, the time taken by each data function is added to it (see functions.harvest).
+
+    Output:
+    - profile (Dict): Dictionary with 'api_id', 'retrieve_method', 'fetched_at', 'bio', and, if the faculty was found in OpenAlex,
+                      'stats', 'recent_works', 'cited_works', 'collaborators', 'collaborator_records' and 'venue_stats'.
+    """
+
+    # Imported here, as only building a snapshot needs the API modules, not the app reading one
+    import functions.openalex_api_utils as api_utils
+    import functions.dr_ntu_utils as ntu_utils
+
+    measure = stage_times.measure if stage_times is not None else lambda stage: nullcontext()
+
+    profile = {'faculty_id': faculty.faculty_id, 'fetched_at': time.time()}
+
+    with measure('bio'):
+        profile['bio'] = ntu_utils.get_bio_from_drNTU(faculty.dr_ntu_link) if faculty.dr_ntu_link else None
+
+    with measure('api_id'):
+        faculty_api_id, retrieve_method = api_utils.get_api_id_and_method(faculty)
+
+    # nan is not valid JSON
+    if isinstance(faculty_api_id, float) and math.isnan(faculty_api_id):
+        faculty_api_id = None
+
+    profile['api_id'] = faculty_api_id
+    profile['retrieve_method'] = retrieve_method
+
+    if not retrieve_method:
+        return profile
+
+    with measure('stats'):
+        profile['stats'] = api_utils.get_author_stats(faculty, faculty_api_id)
+    with measure('recent_works'):
+        profile['recent_works'] = api_utils.get_author_pubs_from_OpenAlexAPI(faculty_api_id, 50,
+                                                                             sort_by=['publication_date'],
+                                                                             sort_direction='desc')
+    with measure('cited_works'):
+        profile['cited_works'] = api_utils.get_author_pubs_from_OpenAlexAPI(faculty_api_id, 10,
+                                                                            sort_by=['cited_by_count'],
+                                                                            sort_direction='desc')
+    with measure('collaborators'):
+        profile['collaborators'] = api_utils.get_collab_info(faculty_api_id, profile['recent_works'])
+    with measure('collaborator_records'):
+        profile['collaborator_records'] = api_utils.get_author_records(
+            [collab[1] for collab in profile['collaborators'][:api_utils.TOP_COLLABORATORS]])
+    with measure('venue_stats'):
+        profile['venue_stats'] = api_utils.get_venue_stats(faculty_api_id)
+
+    return profile
+
+
+def download_thumbnail(faculty, thumbnail_dir):
+    """
+    Download the profile image of a faculty into thumbnail_dir.
+    Return the file name of the image, or None if it could not be downloaded.
+
+    Input:
+    - faculty (Faculty): Faculty detail from the csv.
+    - thumbnail_dir (string): Folder to save the image in.
+    """
+
+    import requests
+
+    try:
+        response = requests.get(faculty.img_link, timeout=30)
+        response.raise_for_status()
+    except requests.RequestException:
+        return None
+
+    extension = {'image/png': '.png', 'image/gif': '.gif'}.get(response.headers.get('Content-Type'), '.jpg')
+    file_name = faculty.faculty_id + extension
+
+    with open(os.path.join(thumbnail_dir, file_name), 'wb') as f:
+        f.write(response.content)
+
+    return file_name
+
+
+def harvest_faculty(faculty, stage_times, thumbnail_dir):
+    """
+    Return the profile and the downloaded thumbnail of a faculty. Run in the worker processes of functions.harvest.
+
+    Input:
+    - faculty (Faculty): Faculty detail from the csv.
+    - stage_times (StageTimes): Time taken by each stage, including the download of the thumbnail.
+    - thumbnail_dir (string): Folder to save the image in.
+
+    Output:
+    There will be two outputs wrapped in tuple: (profile, thumbnail).
+    - profile (Dict): Output of build_profile().
+    - thumbnail (string): File name of the image, or None if it could not be downloaded.
+    """
+
+    profile = build_profile(faculty, stage_times)
+
+    with stage_times.measure('thumbnail'):
+        thumbnail = download_thumbnail(faculty, thumbnail_dir)
+
+    return profile, thumbnail
+
+
+def build_snapshot(roster_csv=DEFAULT_ROSTER_CSV, snapshot_dir=SNAPSHOT_DIR, processes=None, threads=None):
+    """
+    Build a new snapshot bundle for every faculty in roster_csv, and mark it as the latest version.
+
+    The bundle is a folder named by its version (the build time), containing:
+    - manifest.json: version, build time, faculty ids, thumbnails, faculty that failed, and the harvest report
+                     (time taken by each stage, retries and network calls).
+    - roster.csv and roster.parquet: the roster used.
+    - faculty/<faculty_id>.json: output of build_profile() for each faculty, without the works.
+    - faculty/<faculty_id>.recent.parquet and .cited.parquet: recent and most cited works of each faculty.
+    - thumbnails/<faculty_id>.<ext>: profile image of each faculty.
+    - citation_cube/: yearly work and citation counts of all faculty, see functions.citation_cube.
+
+    Profiles are computed by the worker processes of functions.harvest, and written to the bundle in this process.
+
+    Input:
+    - roster_csv (string): Path of the faculty csv.
+    - snapshot_dir (string): Folder to write the bundle in.
+    - processes (int): No. of worker processes. Default to harvest.PROCESSES.
+    - threads (int): No. of threads in each worker process. Default to harvest.THREADS_PER_PROCESS.
+
+    Output:
+    - bundle_dir (string): Folder of the new bundle.
+    """
+
+    import functions.citation_cube as citation_cube
+    import functions.harvest as harvest
+
+    processes = processes or harvest.PROCESSES
+    threads = threads or harvest.THREADS_PER_PROCESS
+
+    version = datetime.now().strftime('%Y%m%dT%H%M%S')
+    bundle_dir = os.path.join(snapshot_dir, version)
+    faculty_dir = os.path.join(bundle_dir, 'faculty')
+    thumbnail_dir = os.path.join(bundle_dir, 'thumbnails')
+    os.makedirs(faculty_dir)
+    os.makedirs(thumbnail_dir)
+    cube = citation_cube.CitationCube(os.path.join(bundle_dir, 'citation_cube'), writable=True)
+
+    faculty_data = pd.read_csv(roster_csv)
+    shutil.copyfile(roster_csv, os.path.join(bundle_dir, 'roster.csv'))
+    faculty_data.to_parquet(os.path.join(bundle_dir, 'roster.parquet'), index=False)
+
+    manifest = {
+        'format': BUNDLE_FORMAT,
+        'version': version,
+        'source_csv': roster_csv,
+        'faculty_ids': [],
+        'thumbnails': {},
+        'failed': {},
+    }
+
+    faculty_list = [Faculty.from_row(row) for _, row in faculty_data.iterrows()]
+    stage_times = harvest.StageTimes()
+    harvested_ids = set()
+    retries = 0
+    network_calls = 0
+    cpu_seconds = 0
+
+    start_time = time.time()
+
+    for i, result in enumerate(harvest.harvest(faculty_list, partial(harvest_faculty, thumbnail_dir=thumbnail_dir),
+                                               processes, threads)):
+        faculty = result['faculty']
+        stage_times.merge(result['stage_times'])
+        retries += result['attempts'] - 1
+        network_calls += result['network_calls']
+        cpu_seconds += result['cpu_seconds']
+        print(harvest.format_progress(i, len(faculty_list), result))
+
+        if result['error']:
+            # Keep building the rest of the roster, the faculty is listed in the manifest
+            manifest['failed'][faculty.faculty_id] = result['error']
+            continue
+
+        profile, thumbnail = result['value']
+
+        # Works are saved in Parquet, the rest of the profile in json
+        for key, name in WORKS_KEYS.items():
+            if key in profile:
+                profile.pop(key).write_parquet(os.path.join(faculty_dir, f'{faculty.faculty_id}.{name}.parquet'))
+
+        with open(os.path.join(faculty_dir, faculty.faculty_id + '.json'), 'w') as f:
+            json.dump(profile, f)
+
+        harvested_ids.add(faculty.faculty_id)
+
+        if 'stats' in profile:
+            cube.update(faculty.faculty_id, profile['stats']['counts_by_year'])
+
+        if thumbnail:
+            manifest['thumbnails'][faculty.faculty_id] = 'thumbnails/' + thumbnail
+
+    # In the order of the roster, as faculty are done in any order
+    manifest['faculty_ids'] = [faculty.faculty_id for faculty in faculty_list if faculty.faculty_id in harvested_ids]
+    manifest['harvest'] = {
+        'processes': processes,
+        'threads': threads,
+        'retries': retries,
+        'network_calls': network_calls,
+        'cpu_seconds': round(cpu_seconds, 1),
+        'stages': stage_times.to_dict(),
+    }
+
+    manifest['build_seconds'] = round(time.time() - start_time, 1)
+    manifest['built_at'] = datetime.now().isoformat()
+
+    with open(os.path.join(bundle_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    # Written last, so a partially built bundle is never used as the latest
+    with open(os.path.join(snapshot_dir, LATEST_FILE), 'w') as f:
+        f.write(version)
+
+    return bundle_dir
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build a snapshot bundle of all faculty profiles.')
+    parser.add_argument('command', choices=['build'])
+    parser.add_argument('--csv', default=DEFAULT_ROSTER_CSV, help='Faculty csv to build the bundle from.')
+    parser.add_argument('--out', default=SNAPSHOT_DIR, help='Folder to write the bundle in.')
+    parser.add_argument('--processes', type=int, help='No. of worker processes computing profiles.')
+    parser.add_argument('--threads', type=int, help='No. of threads in each worker process.')
+    args = parser.parse_args()
+
+    bundle_dir = build_snapshot(args.csv, args.out, args.processes, args.threads)
+    with open(os.path.join(bundle_dir, 'manifest.json')) as f:
+        manifest = json.load(f)
+    report = manifest['harvest']
+    print(f'Built {bundle_dir}: {len(manifest["faculty_ids"])} faculty, {len(manifest["failed"])} failed, '
+          f'{manifest["build_seconds"]} s with {report["processes"]} processes x {report["threads"]} threads, '
+          f'{report["cpu_seconds"]} CPU s, {report["retries"]} retries, {report["network_calls"]} network calls')
+
+    import functions.harvest as harvest
+    print(harvest.StageTimes.from_dict(report['stages']).format_report())
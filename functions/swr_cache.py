@@ -0,0 +1,114 @@
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from functions.cache_store import MISSING, cache_single_flight, default_cache, get_key_function
+
+# No. of threads refreshing stale entries in the background
+MAX_REFRESH_WORKERS = 4
+
+# Shared by all functions decorated with swr_cache
+_refresh_executor = ThreadPoolExecutor(max_workers=MAX_REFRESH_WORKERS, thread_name_prefix='swr-refresh')
+
+
+def swr_cache(soft_ttl, hard_ttl, cache=None):
+    """
+    Decorator that caches the results of a function with stale-while-revalidate.
+
+    - If the cached result is younger than soft_ttl, it is returned.
+    - If it is older than soft_ttl but younger than hard_ttl, it is returned immediately
+      and a single background refresh is started, so the next call gets the new result.
+    - If it is older than hard_ttl (or not cached), the function is called and the caller waits.
+
+    Results are stored in a BoundedCache, so they can also be evicted when memory runs out.
+    As with cache_store.cached, every caller gets the same cached object, so results must not be modified.
+
+    The decorated function also has with_age(*args, **kwargs), which returns (result, fetched_at),
+    where fetched_at is the time (in seconds since epoch) the result was fetched,
+    and cache and get_cache_key(*args, **kwargs), as with cache_store.cached.
+
+    Input:
+    - soft_ttl (float): No. of seconds after which a cached result is refreshed in the background.
+    - hard_ttl (float): No. of seconds after which a cached result is not returned anymore.
+    - cache (BoundedCache): Cache to use. If None, the shared default cache is used.
+    """
+
+    def decorator(func):
+        get_key = get_key_function(func)
+        store = cache if cache is not None else default_cache
+
+        refreshing = set()    # Keys being refreshed in the background
+        lock = threading.Lock()
+
+        def fetch(key, args, kwargs):
+            result = func(*args, **kwargs)
+            fetched_at = time.time()
+
+            # Dropped by the cache once older than hard_ttl
+            store.set(key, (result, fetched_at), hard_ttl)
+
+            return result, fetched_at
+
+        def refresh(key, args, kwargs):
+            try:
+                fetch(key, args, kwargs)
+            except Exception:
+                # Keep serving the cached result, and try again on a later call
+                pass
+            finally:
+                with lock:
+                    refreshing.discard(key)
+
+        def with_age(*args, **kwargs):
+            key = get_key(args, kwargs)
+
+            entry = store.get(key)
+
+            # Not cached, evicted, or older than hard_ttl. Callers missing the same key at the same time share one call.
+            if entry is MISSING:
+                return cache_single_flight.do(key, lambda: fetch(key, args, kwargs))
+
+            result, fetched_at = entry
+
+            if time.time() - fetched_at >= soft_ttl:
+                with lock:
+                    start_refresh = key not in refreshing
+                    refreshing.add(key)
+
+                # Only one refresh for each key at a time
+                if start_refresh:
+                    _refresh_executor.submit(refresh, key, args, kwargs)
+
+            return result, fetched_at
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return with_age(*args, **kwargs)[0]
+
+        wrapper.with_age = with_age
+        wrapper.cache = store
+        wrapper.get_cache_key = lambda *args, **kwargs: get_key(args, kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def format_age(fetched_at):
+    """
+    Return how long ago fetched_at was, in words (eg. '5 minutes ago').
+
+    Input:
+    - fetched_at (float): Time in seconds since epoch.
+    """
+
+    age = max(0, time.time() - fetched_at)
+
+    if age < 60:
+        return 'just now'
+
+    for unit_seconds, unit_name in [(60 * 60 * 24, 'day'), (60 * 60, 'hour'), (60, 'minute')]:
+        if age >= unit_seconds:
+            count = int(age // unit_seconds)
+            return f'{count} {unit_name}{"s" if count > 1 else ""} ago'
@@ -1,26 +1,3 @@
-from thefuzz import process
-
-def get_most_similar_index(find_string, string_list):
-    """
-    Return the index of the string (in string_list), that is the most similar with find_string.
-
-    Input:
-    - find_string (string): String to find in string_list.
-    - string_list (List(string)): List of strings.
-
-    Output:
-    - similar_index (int): Index of the string (in string_list) that is most similar to find_string.
-                           If there is no string that is at least 70% similar to find_string,
-                           return None.
-    """
-
-    # Get the name that is most similar
-    similar_name, _ = process.extractOne(find_string, string_list)
-    similar_name_index = string_list.index(similar_name)
-
-    return similar_name_index
-
-
 def have_words(input_string, at_least_num):
     """
     Return True if the string contains at least at_least_num words.
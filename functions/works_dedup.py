@@ -0,0 +1,257 @@
+import re
+import unicodedata
+from collections import defaultdict
+
+import pyarrow as pa
+
+import functions.metrics as metrics
+from functions.works_store import LOCATION_TYPE, WorksTable
+
+# Min similarity (0 - 100) of two normalized titles for the works to be versions of the same paper
+TITLE_THRESHOLD = 92
+
+# Titles with fewer words are only merged by DOI, as short titles (eg. 'Editorial') are shared by different works
+MIN_TITLE_WORDS = 4
+
+# Max no. of years between the publication of two versions, eg. a preprint and its journal version
+MAX_YEAR_GAP = 3
+
+# Blocks larger than this are not compared, to bound the cost on very generic title keys
+MAX_BLOCK_SIZE = 1000
+
+# DOIs of preprint servers, whose works are replaced by their published version
+PREPRINT_DOI_PREFIXES = ('10.48550/arxiv.', '10.1101/', '10.2139/ssrn.', '10.36227/techrxiv.')
+
+# Words left out of the blocking keys
+STOPWORDS = frozenset('a an and are as at be by for from in is of on or the to with via using towards toward'.split())
+
+
+def normalize_title(title):
+    """
+    Return the normalized form of a work title: lowercase, without accents, punctuation and extra spaces.
+    Return '' if title is not a string.
+
+    Input:
+    - title (string): Title of a work.
+    """
+
+    if not isinstance(title, str):
+        return ''
+
+    decomposed = unicodedata.normalize('NFKD', title)
+    stripped = ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+    return ' '.join(re.sub(r'[^\w\s]', ' ', stripped.lower()).split())
+
+
+def normalize_doi(doi):
+    """
+    Return the bare lowercase DOI (eg. '10.1109/abc.2020.1') from a DOI link or DOI.
+    Return None if doi is not a string.
+
+    Input:
+    - doi (string): DOI link (eg. 'https://doi.org/10.1109/ABC.2020.1') or DOI.
+    """
+
+    if not isinstance(doi, str):
+        return None
+
+    return re.sub(r'^(https?://)?(dx\.)?doi\.org/', '', doi.strip().lower())
+
+
+def get_title_numbers(normalized_title):
+    """
+    Return the words of a normalized title that contain digits, eg. ('3d', '2') for 'part 2 of 3d scenes'.
+    Versions of the same paper have the same numbers, while eg. 'Part 1' and 'Part 2' of a series do not.
+
+    Input:
+    - normalized_title (string): Title from normalize_title().
+    """
+
+    return tuple(word for word in normalized_title.split() if any(char.isdigit() for char in word))
+
+
+def get_blocking_keys(normalized_title):
+    """
+    Return the blocking keys of a normalized title. Only works that share a key are compared.
+    Return an empty list if the title is too short to be merged by title.
+
+    Two keys are used, so that versions whose titles differ at the start or at the end still share one:
+    - the first 3 words of the title, without stopwords.
+    - the first 6 letters of the 3 longest words of the title, in alphabetical order,
+      so that eg. a plural or a changed word ending does not change the key.
+
+    Input:
+    - normalized_title (string): Title from normalize_title().
+    """
+
+    words = [word for word in normalized_title.split() if word not in STOPWORDS]
+
+    if len(normalized_title.split()) < MIN_TITLE_WORDS or len(words) == 0:
+        return []
+
+    longest_words = sorted(word[:6] for word in sorted(set(words), key=lambda word: (-len(word), word))[:3])
+
+    return ['prefix:' + ' '.join(words[:3]), 'longest:' + ' '.join(longest_words)]
+
+
+def find_duplicate_groups(titles, dois, years):
+    """
+    Return the groups of works that are versions of the same paper.
+
+    Works are grouped when they have the same DOI, or when their titles are at least TITLE_THRESHOLD similar,
+    have the same numbers (see get_title_numbers()) and were published at most MAX_YEAR_GAP years apart.
+    Titles are only compared within blocks of works sharing a blocking key (see get_blocking_keys()),
+    so the no. of comparisons grows with the size of the blocks rather than with the square of the no. of works.
+
+    Input:
+    - titles ( List(string) ): Title of each work.
+    - dois ( List(string) ): DOI of each work, or None.
+    - years ( List(int) ): Publication year of each work, or None.
+
+    Output:
+    - groups ( List(List(int)) ): Indices of the works of each group, ordered by their first index.
+                                  Works without duplicates are in a group of their own.
+    """
+
+    # Imported here, as rapidfuzz is only needed once works are fetched
+    from rapidfuzz import fuzz, process
+
+    # Union-find over the works
+    parents = list(range(len(titles)))
+
+    def find(i):
+        while parents[i] != i:
+            parents[i] = parents[parents[i]]
+            i = parents[i]
+        return i
+
+    def union(i, j):
+        root_i, root_j = find(i), find(j)
+        if root_i != root_j:
+            parents[max(root_i, root_j)] = min(root_i, root_j)
+
+    # Same DOI
+    first_with_doi = {}
+    for i, doi in enumerate(dois):
+        doi = normalize_doi(doi)
+        if doi:
+            union(first_with_doi.setdefault(doi, i), i)
+
+    # Similar titles, compared within blocks
+    normalized_titles = [normalize_title(title) for title in titles]
+    title_numbers = [get_title_numbers(normalized_title) for normalized_title in normalized_titles]
+    blocks = defaultdict(list)
+    for i, normalized_title in enumerate(normalized_titles):
+        for key in get_blocking_keys(normalized_title):
+            blocks[key].append(i)
+
+    compared_pairs = 0
+
+    for members in blocks.values():
+        if len(members) < 2 or len(members) > MAX_BLOCK_SIZE:
+            continue
+
+        block_titles = [normalized_titles[i] for i in members]
+        scores = process.cdist(block_titles, block_titles, scorer=fuzz.ratio, score_cutoff=TITLE_THRESHOLD)
+        compared_pairs += len(members) * (len(members) - 1) // 2
+
+        for a, b in zip(*scores.nonzero()):
+            # Each pair is seen twice, and every title matches itself
+            if a >= b:
+                continue
+            i, j = members[a], members[b]
+            if title_numbers[i] != title_numbers[j]:
+                continue
+            if years[i] is not None and years[j] is not None and abs(years[i] - years[j]) > MAX_YEAR_GAP:
+                continue
+            union(i, j)
+
+    metrics.observe('works_dedup.compared_pairs', compared_pairs)
+
+    groups = defaultdict(list)
+    for i in range(len(titles)):
+        groups[find(i)].append(i)
+
+    # The root of each group is its smallest index, so the groups are in the order of their first work
+    return [groups[root] for root in sorted(groups)]
+
+
+def is_published_version(doi, locations):
+    """
+    Return True if a work is not a preprint: its DOI is not from a preprint server,
+    and it has a journal or conference location.
+
+    Input:
+    - doi (string): DOI of the work, or None.
+    - locations ( List(Dict) ): Locations of the work, with 'source_name' and 'source_type'.
+    """
+
+    doi = normalize_doi(doi)
+    if doi and doi.startswith(PREPRINT_DOI_PREFIXES):
+        return False
+
+    return any(location['source_type'] in ('journal', 'conference') for location in locations)
+
+
+def deduplicate_works(works):
+    """
+    Return works with the versions of the same paper (eg. the arXiv preprint and the journal version) merged.
+
+    Each group of versions (see find_duplicate_groups()) becomes one work:
+    - The id, title, DOI, date and authors are the ones of the published version
+      (or of the most cited version if none is published).
+    - The no. of citations is the sum over the versions.
+    - The locations are the distinct locations of all versions.
+    Works keep the order of the first version of each group.
+
+    Input:
+    - works (WorksTable): Works, eg. of one faculty.
+
+    Output:
+    - deduplicated_works (WorksTable): Works without duplicates.
+                                       works itself is returned if it has no duplicates.
+    """
+
+    if len(works) < 2:
+        return works
+
+    titles = works.column('title')
+    dois = works.column('doi')
+    cited_by_counts = works.column('cited_by_count')
+    dates = works.column('publication_date')
+    years = [int(date[:4]) if isinstance(date, str) and date[:4].isdigit() else None for date in dates]
+
+    groups = find_duplicate_groups(titles, dois, years)
+
+    if len(groups) == len(works):
+        return works
+
+    locations = works.table.column('locations').to_pylist()
+
+    kept_indices = []
+    merged_cited_by_counts = []
+    merged_locations = []
+
+    for group in groups:
+        kept_index = max(group, key=lambda i: (is_published_version(dois[i], locations[i]), cited_by_counts[i] or 0, -i))
+        kept_indices.append(kept_index)
+        merged_cited_by_counts.append(sum(cited_by_counts[i] or 0 for i in group))
+
+        # Locations of the kept version first, then the other locations of the group, without repeats
+        group_locations = []
+        for i in [kept_index] + [i for i in group if i != kept_index]:
+            for location in locations[i]:
+                if location not in group_locations:
+                    group_locations.append(location)
+        merged_locations.append(group_locations)
+
+    metrics.increment('works_dedup.merged_works', len(works) - len(groups))
+
+    table = works.table.take(pa.array(kept_indices))
+    table = table.set_column(table.schema.get_field_index('cited_by_count'), 'cited_by_count',
+                             pa.array(merged_cited_by_counts, type=pa.int64()))
+    table = table.set_column(table.schema.get_field_index('locations'), 'locations',
+                             pa.array(merged_locations, type=pa.list_(LOCATION_TYPE)))
+
+    return WorksTable(table)
@@ -0,0 +1,265 @@
+import hashlib
+from collections import Counter
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# Only the fields of OpenAlex works that are shown or aggregated by the dashboard are stored
+LOCATION_TYPE = pa.struct([
+    ('source_name', pa.string()),
+    ('source_type', pa.string()),
+])
+
+AUTHORSHIP_TYPE = pa.struct([
+    ('author_id', pa.string()),
+    ('author_name', pa.string()),
+    ('orcid', pa.string()),
+    ('institution', pa.string()),
+])
+
+WORKS_SCHEMA = pa.schema([
+    ('id', pa.string()),
+    ('title', pa.string()),
+    ('publication_date', pa.string()),
+    ('cited_by_count', pa.int64()),
+    ('doi', pa.string()),
+    ('locations', pa.list_(LOCATION_TYPE)),
+    ('authorships', pa.list_(AUTHORSHIP_TYPE)),
+])
+
+# Columns that hold one value per work, and can be read with WorkRow[name]
+SCALAR_COLUMNS = ['id', 'title', 'publication_date', 'cited_by_count', 'doi']
+
+
+def get_location(location):
+    """
+    Return the stored fields of an OpenAlex location.
+    Return None if the location has no source.
+
+    Input:
+    - location (Dict): Location of a work from OpenAlex API.
+    """
+
+    source = location.get('source')
+    if not source:
+        return None
+
+    return {'source_name': source.get('display_name'), 'source_type': source.get('type')}
+
+
+def get_authorship(authorship):
+    """
+    Return the stored fields of an OpenAlex authorship.
+
+    Input:
+    - authorship (Dict): Authorship of a work from OpenAlex API.
+    """
+
+    author = authorship.get('author') or {}
+    institutions = authorship.get('institutions') or []
+
+    return {
+        'author_id': (author.get('id') or '').split('https://openalex.org/')[-1],
+        'author_name': author.get('display_name'),
+        'orcid': author.get('orcid'),
+        'institution': institutions[0].get('display_name') if len(institutions) > 0 else None,
+    }
+
+
+class WorkRow:
+    """
+    Read-only view of one work in a WorksTable. Values are read from the Arrow columns when accessed,
+    so rendering a few works does not convert whole columns to Python objects.
+    """
+
+    __slots__ = ('_works', '_index')
+
+    def __init__(self, works, index):
+        self._works = works
+        self._index = index
+
+    def __getitem__(self, key):
+        if key not in SCALAR_COLUMNS:
+            raise KeyError(key)
+
+        return self._works.table.column(key)[self._index].as_py()
+
+    def source_names(self):
+        """
+        Return the names of the sources (journals, repositories, ...) the work is published in.
+        """
+
+        locations = self._works.table.column('locations')[self._index].values
+        if locations is None:
+            return []
+
+        return pc.struct_field(locations, [0]).to_pylist()
+
+
+class WorksTable:
+    """
+    List of works stored as a columnar Arrow table.
+
+    Uses much less memory than a list of OpenAlex dictionaries, and can be aggregated
+    without creating a dictionary per work. Supports len(), indexing and slicing
+    (which return WorkRow views and WorksTable respectively) and iteration over WorkRow views.
+    """
+
+    def __init__(self, table):
+        self.table = table
+        self._fingerprint = None
+
+    @classmethod
+    def from_works(cls, works):
+        """
+        Return a WorksTable of works from OpenAlex API.
+
+        Input:
+        - works ( List(Dict) ): Works from OpenAlex API.
+        """
+
+        columns = {name: [] for name in WORKS_SCHEMA.names}
+
+        for work in works:
+            for name in SCALAR_COLUMNS:
+                columns[name].append(work.get(name))
+
+            locations = [get_location(location) for location in work.get('locations') or []]
+            columns['locations'].append([location for location in locations if location is not None])
+            columns['authorships'].append([get_authorship(authorship) for authorship in work.get('authorships') or []])
+
+        return cls(pa.Table.from_pydict(columns, schema=WORKS_SCHEMA))
+
+    @classmethod
+    def read_parquet(cls, path):
+        """
+        Return the WorksTable saved in a Parquet file by write_parquet().
+
+        Input:
+        - path (string): Path of the Parquet file.
+        """
+
+        # Imported here, as Parquet is only used by snapshot bundles
+        import pyarrow.parquet as pq
+
+        return cls(pq.read_table(path, schema=WORKS_SCHEMA))
+
+    def write_parquet(self, path):
+        """
+        Save the works in a Parquet file.
+
+        Input:
+        - path (string): Path of the Parquet file.
+        """
+
+        import pyarrow.parquet as pq
+
+        pq.write_table(self.table, path, compression='zstd')
+
+    @property
+    def nbytes(self):
+        # Used by the cache to measure the size of the works. Nothing else is kept with the table,
+        # as columns converted to Python lists are not stored on the (shared, cached) WorksTable.
+        return self.table.nbytes
+
+    def column(self, name):
+        """
+        Return the values of a column as a Python list.
+        The list is converted on each call, and not kept, so that it is freed once the caller is done with it.
+
+        Input:
+        - name (string): Name of the column, see WORKS_SCHEMA.
+        """
+
+        return self.table.column(name).to_pylist()
+
+    def source_names(self):
+        """
+        Return the names of the sources of each work, as a list of lists of strings.
+        Read from the locations column without creating a dictionary per location.
+        """
+
+        locations = self.table.column('locations').combine_chunks()
+        # offsets index into the unsliced values, even when the table is a slice
+        names = pa.ListArray.from_arrays(locations.offsets, pc.struct_field(locations.values, [0]))
+
+        return names.to_pylist()
+
+    def cache_key(self):
+        """
+        Return the value used to hash this table in caches, based on the ids and citation counts of the works.
+        """
+
+        if self._fingerprint is None:
+            digest = hashlib.sha1()
+            digest.update('\n'.join(work_id or '' for work_id in self.column('id')).encode('utf-8'))
+            digest.update(np.array(self.column('cited_by_count'), dtype=np.int64).tobytes())
+            self._fingerprint = digest.hexdigest()
+
+        return ('WorksTable', len(self), self._fingerprint)
+
+    def to_pylist(self):
+        """
+        Return the works as a list of dictionaries, with the fields of WORKS_SCHEMA.
+        """
+
+        return self.table.to_pylist()
+
+    def journal_counts(self):
+        """
+        Return the no. of locations of the works in each journal.
+
+        Output:
+        - journal_counts (Counter): Journal name -> no. of locations in that journal.
+        """
+
+        locations = pc.list_flatten(self.table.column('locations'))
+        if len(locations) == 0:
+            return Counter()
+
+        is_journal = pc.fill_null(pc.equal(pc.struct_field(locations, [1]), 'journal'), False)
+        journal_names = pc.drop_null(pc.filter(pc.struct_field(locations, [0]), is_journal))
+
+        counts = pc.value_counts(journal_names)
+        return Counter(dict(zip(counts.field('values').to_pylist(), counts.field('counts').to_pylist())))
+
+    def first_authorships(self):
+        """
+        Return the first authorship of each work that has at least one author.
+
+        Output:
+        There will be two outputs wrapped in tuple: (work_indices, authorships).
+        - work_indices (np.ndarray): Index of each work that has an author.
+        - authorships (pa.StructArray): First authorship of each of those works.
+        """
+
+        authorships_column = self.table.column('authorships').combine_chunks()
+        authorships = pc.list_flatten(authorships_column)
+        parent_indices = pc.list_parent_indices(authorships_column).to_numpy()
+
+        # The first authorship of a work is the first flattened authorship with that parent index
+        work_indices, first_positions = np.unique(parent_indices, return_index=True)
+
+        return work_indices, authorships.take(pa.array(first_positions))
+
+    def __len__(self):
+        return self.table.num_rows
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                raise ValueError('WorksTable only supports slices with a step of 1')
+            return WorksTable(self.table.slice(start, max(0, stop - start)))
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('WorksTable index out of range')
+
+        return WorkRow(self, index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield WorkRow(self, index)
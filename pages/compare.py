@@ -0,0 +1,59 @@
+import os
+
+import streamlit as st
+import pandas as pd
+
+import functions.citation_cube as citation_cube
+import functions.diagnostics as diagnostics
+import functions.snapshot as snapshot
+from functions.faculty import get_faculty_id
+
+@st.cache_resource
+def get_citation_cube(cube_dir):
+    # One memory-mapped cube shared by all sessions, reopened by the cube itself when it is updated
+    return citation_cube.CitationCube(cube_dir)
+
+@st.cache_data
+def load_faculty_names(dataset_version):
+    # Loaded again for each version of the faculty data, see snapshot.get_dataset_version()
+    if snapshot.is_enabled():
+        faculty_data = snapshot.load_roster()
+    else:
+        faculty_data = pd.read_csv('Takesawa_Saori_updated.csv')
+
+    # Faculty id -> name, for the faculty in the roster
+    faculty_ids = [get_faculty_id(link, email, name)
+                   for link, email, name in zip(faculty_data['dr_ntu_link'], faculty_data['Email'], faculty_data['Name'])]
+    return dict(zip(faculty_ids, faculty_data['Name']))
+
+st.header('Compare Faculty')
+
+cube_dir = snapshot.get_cube_dir() if snapshot.is_enabled() else citation_cube.CUBE_DIR
+
+if not os.path.exists(os.path.join(cube_dir, citation_cube.INDEX_FILE)):
+    st.info('The citation cube has not been built yet. Run `python -m functions.citation_cube build` to build it.')
+    st.stop()
+
+cube = get_citation_cube(cube_dir)
+faculty_names = load_faculty_names(snapshot.get_dataset_version())
+
+# Only faculty with counts in the cube can be compared. Name -> faculty id.
+faculty_ids = {faculty_names[faculty_id]: faculty_id for faculty_id in cube.faculty_ids if faculty_id in faculty_names}
+
+selected_names = st.multiselect('Faculty', sorted(faculty_ids), max_selections=10)
+
+metric_label = st.radio('Metric', list(citation_cube.METRIC_LABELS.values()), horizontal=True)
+metric = citation_cube.METRICS[list(citation_cube.METRIC_LABELS.values()).index(metric_label)]
+
+years = cube.years
+start_year, end_year = st.slider('Years', min_value=years[0], max_value=years[-1],
+                                 value=(max(years[0], years[-1] - 10), years[-1]))
+
+if len(selected_names) > 0:
+    selected_ids = [faculty_ids[name] for name in selected_names]
+    chart_data = cube.to_chart_frame(selected_ids, selected_names, metric, start_year, end_year)
+    st.line_chart(chart_data, x='Year', y=selected_names)
+else:
+    st.write('Select faculty to compare.')
+
+diagnostics.render_diagnostics()
@@ -1,18 +1,35 @@
 import streamlit as st
 from urllib.parse import urlparse
-import ast
 import pandas as pd
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 
 import functions.openalex_api_utils as api_utils
+import functions.cache_warmer as cache_warmer
+import functions.circuit_breaker as circuit_breaker
+import functions.citation_cube as citation_cube
 import functions.dr_ntu_utils as ntu_utils
-    
+import functions.metrics as metrics
+import functions.diagnostics as diagnostics
+import functions.markdown_list as markdown_list
+import functions.profiler as profiler
+import functions.snapshot as snapshot
+from functions.swr_cache import format_age
+from functions.works_store import WorksTable
+
+# Sections of the profile page. Only the selected section is computed on each rerun.
+SECTIONS = ["Biography", "Interests", "Publications", "Collaborated Authors", "Journals Featured in", "External Links"]
+
+# No. of threads, shared by all sessions, fetching the data of the profile sections at the same time
+FETCH_WORKERS = 8
+
 def link_button(display_string, link, use_container_width=False):
     # If link non nan,
     if isinstance(link, str):
         st.link_button(display_string, link, use_container_width=use_container_width)
     # Else if link not available,
-    else: 
+    else:
         st.link_button(display_string, '', disabled=True, use_container_width=use_container_width)
 
 def convert_to_alphabet_date(input_date):
@@ -29,271 +46,512 @@ def convert_to_alphabet_date(input_date):
 
     return formatted_date
 
+def format_pub(number, work):
+    details = [f'Published date: {convert_to_alphabet_date(work["publication_date"])}',
+               f'No. of citations: {work["cited_by_count"]}']
+
+    source_names = work.source_names()
+    if len(source_names) > 0:
+        details.append(('Published in:', [markdown_list.escape_markdown(name) for name in source_names]))
+
+    return markdown_list.format_list_item(number, work["title"], details, link=work["doi"])
+
 def print_pubs(pub_list):
-    for i in range(len(pub_list)):
-        st.write(f'{i+1}. **{pub_list[i]["title"]}**')
-        st.write(f'- Published date: {convert_to_alphabet_date(pub_list[i]["publication_date"])}')
-        st.write(f'- No. of citations: {pub_list[i]["cited_by_count"]}')
-        
-        if 'locations' in pub_list[i]:
-            if len(pub_list[i]['locations']) > 0:
-                for j in range(len(pub_list[i]['locations'])):
-                    if 'source' in pub_list[i]['locations'][j]:
-                        if pub_list[i]['locations'][j]["source"]:
-                            if j == 0:
-                                st.write('- Published in:')
-                            st.write(f'----- {pub_list[i]["locations"][j]["source"]["display_name"]}')
-        if isinstance(pub_list[i]["doi"], str):
-            st.link_button('View Publication', pub_list[i]["doi"])
-        st.text('')
-
-st.title("Faculty Profile")
-st.write('---')  # Add a separator
-
-# If clicked on 'View profile'
-if st.session_state.selected_faculty is not None:
-
-    faculty_detail = st.session_state.selected_faculty
-
-    col1, col2, col3 = st.columns([1,1,1])  # Divide the row into three columns
+    # pub_list is a WorksTable, or a list of its WorkRow.
+    # The whole list is one markdown element, rather than several elements per work
+    if len(pub_list) > 0:
+        st.markdown(markdown_list.format_list([format_pub(i+1, work) for i, work in enumerate(pub_list)]))
 
-    with col1:
-        st.image(faculty_detail['img_link'], width=200)
+@st.cache_data
+def load_journal_ranking():
+    return pd.read_csv('journal_ranking_data.csv')
 
-    with col2:
-        st.subheader(faculty_detail["Name"])
-        st.write(f'Email: {faculty_detail["Email"]}')
+def join_journal_ranking(journals):
+    # Journals with their no. of works, and the SJR index, quartile and publisher of the ones in the ranking data.
+    # Journals are matched by title, with the first row of the ranking data for each title.
+    journal_df = pd.DataFrame(journals, columns=['Title', 'count'])
+    ranking_df = load_journal_ranking().drop_duplicates('Title')[['Title', 'SJR-index', 'Best Quartile', 'Publisher']]
 
-    with col3:
-        pass
+    return journal_df.merge(ranking_df, on='Title', how='left', indicator='ranked')
 
-    
-    tab0, tab1, tab2, tab3, tab4, tab5 = st.tabs(["Biography", "Interests", "Publications", "Collaborated Authors", "Journals Featured in", "External Links"])
+# The get_* functions below read from the snapshot bundle when snapshot mode is on,
+# so that the page makes no API calls at all
 
+def resolve_faculty_api_id(faculty_detail):
+    # Resolve the OpenAlex id only once per selected faculty,
+    # and only when a section that needs OpenAlex data is opened
     if not st.session_state.faculty_api_id:
-        faculty_api_id, retrieve_method = api_utils.get_api_id_and_method(faculty_detail)
+        if snapshot.is_enabled():
+            profile = snapshot.load_profile(faculty_detail.faculty_id)
+            faculty_api_id, retrieve_method = profile['api_id'], profile['retrieve_method']
+        else:
+            faculty_api_id, retrieve_method = api_utils.get_api_id_and_method(faculty_detail)
         st.session_state.faculty_api_id = faculty_api_id
         st.session_state.retrieve_method = retrieve_method
 
-    if st.session_state.retrieve_method:
-        if not st.session_state.faculty_info:
-            st.session_state.faculty_info = api_utils.get_author_stats(faculty_detail, st.session_state.faculty_api_id)
+    return st.session_state.retrieve_method is not None
 
-        with tab0:
-            bio = ntu_utils.get_bio_from_drNTU(faculty_detail['dr_ntu_link'])
-            if bio:
-                st.write(bio)
+# The faculty's OpenAlex id is passed in, rather than read from session state,
+# as these functions are also run by the fetch threads (see fetch_async), which cannot use st
 
+def get_faculty_info(faculty_detail, faculty_api_id):
+    if snapshot.is_enabled():
+        profile = snapshot.load_profile(faculty_detail.faculty_id)
+        return profile['stats'], profile['fetched_at']
 
-        with tab2:
-            st.write(f'Last updated: {str(convert_to_alphabet_date(st.session_state.faculty_info["updated_date"]))}')
-            st.write('---')  # Add a separator
+    # Not kept in session state, so that a background refresh of the stats shows on the next rerun
+    return api_utils.get_author_stats.with_age(faculty_detail, faculty_api_id)
 
-            st.subheader('No. of works and citations in past 10 years')
+def get_recent_pub_list(faculty_detail, faculty_api_id):
+    if snapshot.is_enabled():
+        return snapshot.load_profile(faculty_detail.faculty_id)['recent_works']
 
-            col1, col2 = st.columns([2,1])
+    return api_utils.get_author_pubs_from_OpenAlexAPI(faculty_api_id, 50,\
+                                                      sort_by=['publication_date'],\
+                                                      sort_direction='desc')
 
-            with col1:
-                pub_stats_df = pd.DataFrame(st.session_state.faculty_info['counts_by_year']).sort_values(by='year')
-                pub_stats_df['year'] = pub_stats_df['year'].astype(str).str.replace(',', '')
-                pub_stats_df.rename(columns={'year': 'Year', 'works_count': 'No. of works', 'cited_by_count': 'No. of citations'},
-                                    inplace=True)
-                st.line_chart(pub_stats_df,
-                            x="Year", y=["No. of works", "No. of citations"], color=["#FF0000", "#0000FF"])
-            with col2:
-                st.markdown(f'h index: {str(st.session_state.faculty_info["h_index"])}',
-                            help='The h-index is calculated by counting the number of publications \
-                                    for which an author has been cited by other authors at least that same \
-                                    number of times. For instance, an h-index of 17 means that the scientist \
-                                    has published at least 17 papers that have each been cited at least 17 times.\
-                                    \n(Extracted from: https://mdanderson.libanswers.com/faq/26221#:~:text=The%20h%2Dindex%20is%20calculated,cited%20at%20least%2017%20times.)')
-                st.markdown(f'i-10 index: {str(st.session_state.faculty_info["i10_index"])}',
-                            help='The i-10 index indicates the number of academic publications an author has \
-                                written that have been cited by at least 10 sources.\
-                                \n(Extracted from: https://en.wikipedia.org/wiki/Author-level_metrics)')
-                st.markdown(f'Total no. of citations: {str(int(faculty_detail["citations_all_num"]))}',
-                            help='The total number of times the works of this faculty\'s is cited by others.')
-
-            st.write('---')  # Add a separator
-            st.subheader('Top 10 recent works')
-            recent_pub_list = api_utils.get_author_pubs_from_OpenAlexAPI(st.session_state.faculty_api_id, 50,\
-                                                                  sort_by=['publication_date'],\
-                                                                  sort_direction='desc')
-            print_pubs(recent_pub_list[:10])
-
-            st.write('---')  # Add a separator
-            st.subheader('Top 10 cited works')
-            cited_pub_list = api_utils.get_author_pubs_from_OpenAlexAPI(st.session_state.faculty_api_id, 10,\
-                                                                  sort_by=['cited_by_count'],\
-                                                                  sort_direction='desc')
-            print_pubs(cited_pub_list)
-
-        with tab1:
-            st.write(f'Last updated: {str(convert_to_alphabet_date(st.session_state.faculty_info["updated_date"]))}')
-            st.write('---')  # Add a separator
-
-            col1, col2 = st.columns(2)
+def get_cited_pub_list(faculty_detail, faculty_api_id):
+    if snapshot.is_enabled():
+        return snapshot.load_profile(faculty_detail.faculty_id)['cited_works']
+
+    return api_utils.get_author_pubs_from_OpenAlexAPI(faculty_api_id, 10,\
+                                                      sort_by=['cited_by_count'],\
+                                                      sort_direction='desc')
+
+def get_collab_info(faculty_detail, faculty_api_id):
+    if snapshot.is_enabled():
+        return snapshot.load_profile(faculty_detail.faculty_id)['collaborators']
+
+    # Not kept in session state, as get_collab_info is already cached
+    return api_utils.get_collab_info(faculty_api_id, get_recent_pub_list(faculty_detail, faculty_api_id))
+
+def get_collaborators(faculty_detail, faculty_api_id):
+    # The collaborated authors, and the author records of the ones shown, fetched in one batch
+    collab_info = get_collab_info(faculty_detail, faculty_api_id)
+
+    if snapshot.is_enabled():
+        # Bundles built before the records were added have none
+        return collab_info, snapshot.load_profile(faculty_detail.faculty_id).get('collaborator_records', {})
+
+    shown_ids = [collab[1] for collab in collab_info[:api_utils.TOP_COLLABORATORS]]
+    return collab_info, api_utils.get_author_records(shown_ids)
+
+def get_collab_work_details(faculty_detail, work_id):
+    if snapshot.is_enabled():
+        # Collaborated works are taken from the recent works, which are in the bundle
+        for work in get_recent_pub_list(faculty_detail, None):
+            if work['id'] == 'https://openalex.org/' + work_id:
+                return work
+        return None
+
+    query_url = 'https://api.openalex.org/works/' + work_id
+    result = api_utils.get_api_result(query_url)
+    if 'error' in result:
+        return None
+
+    return WorksTable.from_works([result])[0]
+
+def get_venue_stats(faculty_detail, faculty_api_id):
+    if snapshot.is_enabled():
+        profile = snapshot.load_profile(faculty_detail.faculty_id)
+        # Bundles built before the venue stats were added have the journals of the recent works
+        if 'venue_stats' not in profile:
+            return {'journals': profile['journals'], 'works_count': len(profile['recent_works']), 'source': 'recent_works'}
+        return profile['venue_stats']
+
+    return api_utils.get_venue_stats(faculty_api_id)
+
+def get_bio(faculty_detail):
+    if snapshot.is_enabled():
+        return snapshot.load_profile(faculty_detail.faculty_id)['bio']
+
+    # No bio for faculty without a DR-NTU profile
+    if not faculty_detail.dr_ntu_link:
+        return None
+
+    return ntu_utils.get_bio_from_drNTU(faculty_detail.dr_ntu_link)
+
+def get_image(faculty_detail):
+    if snapshot.is_enabled():
+        thumbnail_path = snapshot.get_thumbnail_path(faculty_detail.faculty_id)
+        if thumbnail_path:
+            return thumbnail_path
+
+    return faculty_detail.img_link
+
+@st.cache_resource
+def get_fetch_executor():
+    return ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix='profile-fetch')
+
+# No. of network calls made by the fetch threads for this rerun
+fetch_network_calls = []
+
+def fetch_async(func, *args):
+    # Run func(*args) in a fetch thread, under the deadline of this rerun, and profiled with it if it is profiled
+    deadline = circuit_breaker.get_deadline()
+    rerun_profiler = profiler.get_rerun_profiler()
+
+    def run():
+        circuit_breaker.set_deadline(deadline)
+        network_calls_at_start = metrics.get_thread_network_calls()
+        try:
+            with profiler.track_thread(rerun_profiler):
+                return func(*args)
+        finally:
+            fetch_network_calls.append(metrics.get_thread_network_calls() - network_calls_at_start)
+            circuit_breaker.clear_deadline()
+
+    return get_fetch_executor().submit(run)
+
+def render_progressively(faculty_detail, parts, rerun_start_time):
+    """
+    Show a loading message for each part of a section, then replace it as soon as the data of its part arrives.
+    The data of all parts is fetched at the same time.
+
+    Input:
+    - faculty_detail (Faculty): Faculty detail from the csv.
+    - parts ( List(Tuple(string, Future, function)) ): Loading message, fetch (from fetch_async) and render function
+                                                       of each part, in page order. The render function is called
+                                                       with the faculty and the fetched data.
+    - rerun_start_time (float): time.perf_counter() at the start of the rerun, to measure the time to first content.
+
+    Output:
+    The first UpstreamUnavailableError of the fetches is raised, after all other parts are shown.
+    """
+
+    # A placeholder for each part, holding its loading message until its data arrives
+    placeholders = []
+    for loading_message, _, _ in parts:
+        placeholders.append(st.empty())
+        placeholders[-1].caption(loading_message)
+
+    # A fetch can be shared by several parts
+    parts_by_fetch = {}
+    for i, (_, fetch, _) in enumerate(parts):
+        parts_by_fetch.setdefault(fetch, []).append(i)
+
+    upstream_error = None
+    is_first_content = True
+
+    for fetch in as_completed(parts_by_fetch):
+        for i in parts_by_fetch[fetch]:
+            try:
+                data = fetch.result()
+            except circuit_breaker.UpstreamUnavailableError as e:
+                upstream_error = upstream_error or e
+                placeholders[i].caption('Could not be loaded.')
+                continue
+
+            # Replaces the loading message with the elements of the part
+            with placeholders[i].container():
+                parts[i][2](faculty_detail, data)
+
+            if is_first_content:
+                metrics.observe('profile_rerun.first_content_ms', (time.perf_counter() - rerun_start_time) * 1000)
+                is_first_content = False
+
+    if upstream_error is not None:
+        raise upstream_error
+
+def write_last_updated(faculty_info, fetched_at):
+    st.write(f'Last updated: {str(convert_to_alphabet_date(faculty_info["updated_date"]))} '
+             f'(fetched {format_age(fetched_at)})')
+    st.write('---')  # Add a separator
+
+def render_biography(faculty_detail):
+    bio = get_bio(faculty_detail)
+    if bio:
+        st.write(bio)
+
+def render_last_updated(faculty_detail, faculty_info_with_age):
+    write_last_updated(*faculty_info_with_age)
+
+def render_interest_tags(faculty_detail, faculty_info_with_age):
+    faculty_info, fetched_at = faculty_info_with_age
+    write_last_updated(faculty_info, fetched_at)
+
+    col1, col2 = st.columns(2)
 
-            with col1:
-                # If there are tags from DR-NTU site
-                if not isinstance(faculty_detail["Interests"], float):
-                    st.subheader('Interests')
-                    interests_list = ast.literal_eval(st.session_state.selected_faculty['Interests'])
-                    for interest in interests_list:
-                        st.write(interest)
+    with col1:
+        # If there are tags from DR-NTU site
+        if len(faculty_detail.interests) > 0:
+            st.subheader('Interests')
+            for interest in faculty_detail.interests:
+                st.write(interest)
 
-            with col2:
-                # If there are tags from the api, 
-                if len(st.session_state.faculty_info['tags']) > 0:
-                    st.subheader(f'Top topics based on {faculty_detail["Name"]} works')
-                    for i in range(len(st.session_state.faculty_info['tags'])):
-                        st.write(f'{i+1}. {st.session_state.faculty_info["tags"][i]["display_name"]}')
+    with col2:
+        # If there are tags from the api,
+        if len(faculty_info['tags']) > 0:
+            st.subheader(f'Top topics based on {faculty_detail.name} works')
+            for i in range(len(faculty_info['tags'])):
+                st.write(f'{i+1}. {faculty_info["tags"][i]["display_name"]}')
 
-        with tab5:
-            st.write(f'Last updated: {str(convert_to_alphabet_date(st.session_state.faculty_info["updated_date"]))}')
-            st.write('---')  # Add a separator
+def render_publication_stats(faculty_detail, faculty_info_with_age):
+    faculty_info, fetched_at = faculty_info_with_age
+    write_last_updated(faculty_info, fetched_at)
 
-            col1, col2, col3, col4 = st.columns(4)
+    st.subheader('No. of works and citations in past 10 years')
+
+    col1, col2 = st.columns([2,1])
+
+    with col1:
+        pub_stats_df = citation_cube.counts_to_frame(faculty_info['counts_by_year'])
+        st.line_chart(pub_stats_df,
+                    x="Year", y=["No. of works", "No. of citations"], color=["#FF0000", "#0000FF"])
+    with col2:
+        st.markdown(f'h index: {str(faculty_info["h_index"])}',
+                    help='The h-index is calculated by counting the number of publications \
+                            for which an author has been cited by other authors at least that same \
+                            number of times. For instance, an h-index of 17 means that the scientist \
+                            has published at least 17 papers that have each been cited at least 17 times.\
+                            \n(Extracted from: https://mdanderson.libanswers.com/faq/26221#:~:text=The%20h%2Dindex%20is%20calculated,cited%20at%20least%2017%20times.)')
+        st.markdown(f'i-10 index: {str(faculty_info["i10_index"])}',
+                    help='The i-10 index indicates the number of academic publications an author has \
+                        written that have been cited by at least 10 sources.\
+                        \n(Extracted from: https://en.wikipedia.org/wiki/Author-level_metrics)')
+        # Some faculty have no citation count in the csv
+        total_citations = 'Not available' if faculty_detail.citations_all_num is None else int(faculty_detail.citations_all_num)
+        st.markdown(f'Total no. of citations: {total_citations}',
+                    help='The total number of times the works of this faculty\'s is cited by others.')
+
+def render_recent_works(faculty_detail, recent_pub_list):
+    st.write('---')  # Add a separator
+    st.subheader('Top 10 recent works')
+    print_pubs(recent_pub_list[:10])
+
+def render_cited_works(faculty_detail, cited_pub_list):
+    st.write('---')  # Add a separator
+    st.subheader('Top 10 cited works')
+    print_pubs(cited_pub_list)
+
+def render_collaborators(faculty_detail, collaborators):
+    collab_info, author_records = collaborators
+    st.subheader('Top 10 Collaborated Authors',
+                 help='These author\'s worked on the same publication with faculty. These are the top 10\
+                    authors who collaborated with the faculty the most in the recent works (the most 50 \
+                    recent works).')
+    max_index = min(api_utils.TOP_COLLABORATORS, len(collab_info))
+    for i in range(max_index):
+        # Details from the author record, else from the authorship of their first collaborated work
+        record = author_records.get(collab_info[i][1], {})
+        institution = record.get('institution') or collab_info[i][3]
+        orcid = record.get('orcid') or collab_info[i][2]
+
+        st.write(f'{i+1}. **{collab_info[i][0]}**')
+        st.write(f'- Number of times collaborated: {collab_info[i][5]}')
+        if institution:
+            st.write('- Institution: ', institution)
+        if record.get('h_index') is not None:
+            st.write(f'- h index: {record["h_index"]}, no. of works: {record["works_count"]}')
+        if orcid:
+            st.link_button('ORCID Link', orcid)
+        if st.button('Load collaborated works', key=f'{collab_info[i][1]}'):
+            with st.expander("Collaborated works"):
+                collab_works = []
+                skipped_count = 0
+                for work_id in collab_info[i][4]:
+                    # Keep the works already loaded if OpenAlex stops responding or the deadline is exhausted
+                    try:
+                        collab_works.append(get_collab_work_details(faculty_detail, work_id))
+                    except circuit_breaker.UpstreamUnavailableError:
+                        skipped_count += 1
+                print_pubs([work for work in collab_works if work is not None])
+                if skipped_count > 0:
+                    st.caption(f'{skipped_count} works could not be loaded.')
+    st.text('')
+
+def render_journal_list(faculty_detail, venue_stats):
+    # Counted by OpenAlex over all works, or from the recent works when OpenAlex was not responding
+    if venue_stats['source'] == 'openalex':
+        help_text = f'Calculated using all {venue_stats["works_count"]} works published in journals.'
+    else:
+        help_text = f'Calculated using the most recent {venue_stats["works_count"]} works.'
+    st.subheader(f"Journals that featured {faculty_detail.name}'s work", help=help_text)
+    st.write('---')  # Add a separator
+
+    journal_df = join_journal_ranking(venue_stats['journals'])
+
+    for i, journal in enumerate(journal_df.to_dict('records')):
+        st.write(f'{i+1}. **{journal["Title"]}**')
+        st.write(f'- Number of times featured: {journal["count"]}')
+        if journal['ranked'] == 'both':
+            rank = journal['SJR-index']
+            quartile = journal['Best Quartile']
+            publisher = journal['Publisher']
+            if isinstance(rank, float):
+                st.markdown(f'- SJR Index: {rank}',
+                        help='The SJR is an index of weighted citations per article over a period of three years.\
+                            \n(Extracted from: https://academia.stackexchange.com/a/116470)')
+            if isinstance(rank, float):
+                st.markdown(f'- Quartile: {quartile}',
+                        help='Q1 to Q4 refer to journal ranking quartiles within a subdiscipline using the SJR citation index.\
+                            \nThus, a first quartile journal (i.e., Q1) has an SJR in the top 25% of journals for at least one of its classified subdisciplines.\
+                            \n(Extracted from: https://academia.stackexchange.com/a/116470)')
+
+            if isinstance(publisher, str):
+                st.markdown(f'- Publisher: {publisher}')
+        st.write('---')  # Add a separator
+
+def render_external_links(faculty_detail):
+    col1, col2, col3, col4 = st.columns(4)
+
+    with col1:
+        link_button('DR-NTU Link', faculty_detail.dr_ntu_link, True)
 
+    with col2:
+        link_button('ORCID Link', faculty_detail.orcid_link, True)
+
+    with col3:
+        link_button('dblp Link', faculty_detail.dblp_link, True)
+
+    with col4:
+        link_button('Google Scholar Link', faculty_detail.google_scholar_link, True)
+
+    st.write('---')  # Add a separator
+
+    weblinks = faculty_detail.website_links
+
+    # If other websites available,
+    if len(weblinks) > 0:
+        st.write('Other websites:')
+        i = 0
+        while i < len(weblinks):
+            col1, col2, col3, col4 = st.columns(4)
             with col1:
-                link_button('DR-NTU Link', faculty_detail['dr_ntu_link'], True)
+                base_link = '.'.join(urlparse(weblinks[i]).netloc.split('.')[1:])
+                st.link_button(base_link, weblinks[i], use_container_width=True)
+                i+=1
 
             with col2:
-                link_button('ORCID Link', faculty_detail['orcid_link'], True)
+                if i < len(weblinks):
+                    base_link = '.'.join(urlparse(weblinks[i]).netloc.split('.')[1:])
+                    st.link_button(base_link, weblinks[i], use_container_width=True)
+                    i+=1
+                else:
+                    break
 
             with col3:
-                link_button('dblp Link', faculty_detail['dblp_link'], True)
+                if i < len(weblinks):
+                    base_link = '.'.join(urlparse(weblinks[i]).netloc.split('.')[1:])
+                    st.link_button(base_link, weblinks[i], use_container_width=True)
+                    i+=1
+                else:
+                    break
 
             with col4:
-                link_button('Google Scholar Link', faculty_detail['google_scholar_link'], True)
-
-            st.write('---')  # Add a separator
-            
-            if not isinstance(st.session_state.selected_faculty['website_link'], float):
-                weblinks = ast.literal_eval(st.session_state.selected_faculty['website_link'])
-
-                # If other websites available, 
-                if len(weblinks) > 0:
-                    st.write('Other websites:')
-                    i = 0
-                    while i < len(weblinks):
-                        col1, col2, col3, col4 = st.columns(4)
-                        with col1:
-                            base_link = '.'.join(urlparse(weblinks[i]).netloc.split('.')[1:])
-                            st.link_button(base_link, weblinks[i], use_container_width=True)
-                            i+=1
-
-                        with col2:
-                            if i < len(weblinks):
-                                base_link = '.'.join(urlparse(weblinks[i]).netloc.split('.')[1:])
-                                st.link_button(base_link, weblinks[i], use_container_width=True)
-                                i+=1
-                            else:
-                                break
-
-                        with col3:
-                            if i < len(weblinks):
-                                base_link = '.'.join(urlparse(weblinks[i]).netloc.split('.')[1:])
-                                st.link_button(base_link, weblinks[i], use_container_width=True)
-                                i+=1
-                            else:
-                                break
-
-                        with col4:
-                            if i < len(weblinks):
-                                base_link = '.'.join(urlparse(weblinks[i]).netloc.split('.')[1:])
-                                st.link_button(base_link, weblinks[i], use_container_width=True)
-                                i+=1
-                            else:
-                                break
-
-        with tab3:
-            st.write(f'Last updated: {str(convert_to_alphabet_date(st.session_state.faculty_info["updated_date"]))}')
-            st.write('---')  # Add a separator
-
-            st.subheader('Top 10 Collaborated Authors',
-                         help='These author\'s worked on the same publication with faculty. These are the top 10\
-                            authors who collaborated with the faculty the most in the recent works (the most 50 \
-                            recent works).')
-            if not st.session_state.collab_info:
-                st.session_state.collab_info = api_utils.get_collab_info(st.session_state.faculty_api_id,
-                                                        api_utils.get_author_pubs_from_OpenAlexAPI(st.session_state.faculty_api_id, 50,\
-                                                                                                    sort_by=['publication_date'],\
-                                                                                                    sort_direction='desc')
-                                                                        )
-            max_index = min(10, len(st.session_state.collab_info))
-            for i in range(max_index):
-                st.write(f'{i+1}. **{st.session_state.collab_info[i][0]}**')
-                st.write(f'- Number of times collaborated: {st.session_state.collab_info[i][5]}')
-                if st.session_state.collab_info[i][3]:
-                    st.write('- Institution: ', st.session_state.collab_info[i][3])
-                if st.session_state.collab_info[i][2]:
-                    st.link_button('ORCID Link', st.session_state.collab_info[i][2])
-                if st.button('Load collaborated works', key=f'{st.session_state.collab_info[i][1]}'):
-                    with st.expander("Collaborated works"):
-                        for j in range(len(st.session_state.collab_info[i][4])):
-                            # Get name of work
-                            query_url = 'https://api.openalex.org/works/' + st.session_state.collab_info[i][4][j]
-                            collab_work_details = api_utils.get_api_result(query_url)
-                            st.write(f'{j+1}. **{collab_work_details["title"]}**')
-                            st.write(f'- Published date: {convert_to_alphabet_date(collab_work_details["publication_date"])}')
-                            st.write(f'- No. of citations: {collab_work_details["cited_by_count"]}')
-                            
-                            if 'locations' in collab_work_details:
-                                if len(collab_work_details['locations']) > 0:
-                                    for k in range(len(collab_work_details['locations'])):
-                                        if 'source' in collab_work_details['locations'][k]:
-                                            if collab_work_details['locations'][k]["source"]:
-                                                if k == 0:
-                                                    st.write('- Published in:')
-                                                st.write(f'----- {collab_work_details["locations"][k]["source"]["display_name"]}')
-                            if isinstance(collab_work_details["doi"], str):
-                                st.link_button('View Publication', collab_work_details["doi"])
-                            st.text('')
-            st.text('')
-
-        with tab4:
-            st.write(f'Last updated: {str(convert_to_alphabet_date(st.session_state.faculty_info["updated_date"]))}')
-            st.write('---')  # Add a separator
-            st.subheader(f"Journals that featured {faculty_detail['Name']}'s work",
-                         help='Calculated using the most recent 50 works.')
-            st.write('---')  # Add a separator
-            journal_name_count = api_utils.get_journal_frequency(recent_pub_list)
-
-            journal_df = pd.read_csv('journal_ranking_data.csv')
-            all_journal_list = list(journal_df['Title'])
-
-            for i in range(len(journal_name_count)):
-                name = journal_name_count[i][0]
-                count = journal_name_count[i][1]
-                st.write(f'{i+1}. **{name}**')
-                st.write(f'- Number of times featured: {count}')
-                if name in all_journal_list:
-                    name_index = all_journal_list.index(name)
-                    rank = journal_df['SJR-index'][name_index]
-                    quartile = journal_df['Best Quartile'][name_index]
-                    publisher = journal_df['Publisher'][name_index]
-                    if isinstance(rank, float):
-                        st.markdown(f'- SJR Index: {rank}',
-                                help='The SJR is an index of weighted citations per article over a period of three years.\
-                                    \n(Extracted from: https://academia.stackexchange.com/a/116470)')
-                    if isinstance(rank, float):
-                        st.markdown(f'- Quartile: {quartile}',
-                                help='Q1 to Q4 refer to journal ranking quartiles within a subdiscipline using the SJR citation index.\
-                                    \nThus, a first quartile journal (i.e., Q1) has an SJR in the top 25% of journals for at least one of its classified subdisciplines.\
-                                    \n(Extracted from: https://academia.stackexchange.com/a/116470)')
-                    
-                    if isinstance(publisher, str):
-                        st.markdown(f'- Publisher: {publisher}')
-                st.write('---')  # Add a separator
-
-            
-
-
-
-
-            
-            
-# if did not click on view profile and got to profile page
-else:
-    st.error('Please select \'View Profile\' button in the Faculty List page to view faculty\'s details.')
+                if i < len(weblinks):
+                    base_link = '.'.join(urlparse(weblinks[i]).netloc.split('.')[1:])
+                    st.link_button(base_link, weblinks[i], use_container_width=True)
+                    i+=1
+                else:
+                    break
+
+# Sections that only need the csv and DR-NTU, and so do not wait for the OpenAlex id
+LOCAL_SECTIONS = {
+    "Biography": render_biography,
+    "External Links": render_external_links,
+}
+
+# Sections that need the faculty's OpenAlex id.
+# Each returns the parts of the section, see render_progressively.
+
+def get_interests_parts(faculty_detail, faculty_api_id):
+    faculty_info = fetch_async(get_faculty_info, faculty_detail, faculty_api_id)
+    return [('Loading topics...', faculty_info, render_interest_tags)]
+
+def get_publications_parts(faculty_detail, faculty_api_id):
+    faculty_info = fetch_async(get_faculty_info, faculty_detail, faculty_api_id)
+    recent_pub_list = fetch_async(get_recent_pub_list, faculty_detail, faculty_api_id)
+    cited_pub_list = fetch_async(get_cited_pub_list, faculty_detail, faculty_api_id)
+    return [('Loading stats...', faculty_info, render_publication_stats),
+            ('Loading recent works...', recent_pub_list, render_recent_works),
+            ('Loading cited works...', cited_pub_list, render_cited_works)]
+
+def get_collaborated_authors_parts(faculty_detail, faculty_api_id):
+    faculty_info = fetch_async(get_faculty_info, faculty_detail, faculty_api_id)
+    collaborators = fetch_async(get_collaborators, faculty_detail, faculty_api_id)
+    return [('Loading stats...', faculty_info, render_last_updated),
+            ('Loading collaborated authors...', collaborators, render_collaborators)]
+
+def get_journals_parts(faculty_detail, faculty_api_id):
+    faculty_info = fetch_async(get_faculty_info, faculty_detail, faculty_api_id)
+    venue_stats = fetch_async(get_venue_stats, faculty_detail, faculty_api_id)
+    return [('Loading stats...', faculty_info, render_last_updated),
+            ('Loading journals...', venue_stats, render_journal_list)]
+
+API_SECTIONS = {
+    "Interests": get_interests_parts,
+    "Publications": get_publications_parts,
+    "Collaborated Authors": get_collaborated_authors_parts,
+    "Journals Featured in": get_journals_parts,
+}
+
+# Profiled when opened with ?profile=1, or when slow reruns are captured (see functions.profiler)
+with profiler.profile_rerun('faculty_profile', diagnostics.is_profile_requested()):
+    st.title("Faculty Profile")
+    st.write('---')  # Add a separator
+
+    # If clicked on 'View profile'
+    if st.session_state.selected_faculty is not None:
+
+        # To measure the no. of network calls made by this rerun, and its time to first content
+        network_calls_at_start = metrics.get_thread_network_calls()
+        rerun_start_time = time.perf_counter()
+
+        faculty_detail = st.session_state.selected_faculty
+
+        col1, col2, col3 = st.columns([1,1,1])  # Divide the row into three columns
+
+        with col1:
+            st.image(get_image(faculty_detail), width=200)
+
+        with col2:
+            st.subheader(faculty_detail.name)
+            st.write(f'Email: {faculty_detail.email}')
+
+        with col3:
+            pass
+
+        # Used instead of st.tabs, as st.tabs runs the body of every tab on every rerun
+        section = st.radio('Section', SECTIONS, horizontal=True, label_visibility='collapsed', key='profile_section')
+        st.write('---')  # Add a separator
+
+        # Bound the time spent waiting for OpenAlex and DR-NTU in this rerun.
+        # Work skipped once the deadline is exhausted is left to the cache warmer.
+        if not snapshot.is_enabled():
+            circuit_breaker.start_deadline()
+
+        upstream_error = None
+
+        try:
+            if section in LOCAL_SECTIONS:
+                LOCAL_SECTIONS[section](faculty_detail)
+                metrics.observe('profile_rerun.first_content_ms', (time.perf_counter() - rerun_start_time) * 1000)
+
+            else:
+                with st.spinner(f'Finding {faculty_detail.name} in OpenAlex...'):
+                    is_found = resolve_faculty_api_id(faculty_detail)
+                if is_found:
+                    parts = API_SECTIONS[section](faculty_detail, st.session_state.faculty_api_id)
+                    render_progressively(faculty_detail, parts, rerun_start_time)
+
+        except circuit_breaker.UpstreamUnavailableError as e:
+            upstream_error = e
+            metrics.increment('profile_rerun.upstream_unavailable')
+            cache_warmer.get_cache_warmer().submit(faculty_detail, cache_warmer.PRIORITY_CLICK)
+
+        finally:
+            circuit_breaker.clear_deadline()
+
+        diagnostics.render_upstream_status(upstream_error)
+
+        metrics.observe('profile_rerun.network_calls',
+                        metrics.get_thread_network_calls() - network_calls_at_start + sum(fetch_network_calls))
+        metrics.observe('profile_rerun.complete_ms', (time.perf_counter() - rerun_start_time) * 1000)
+
+        diagnostics.render_profile_saved(profiler.finish_rerun())
+        diagnostics.render_diagnostics()
+
+    # if did not click on view profile and got to profile page
+    else:
+        st.error('Please select \'View Profile\' button in the Faculty List page to view faculty\'s details.')
@@ -0,0 +1,86 @@
+import os
+import time
+
+import streamlit as st
+import pandas as pd
+from streamlit_extras.switch_page_button import switch_page
+
+import functions.diagnostics as diagnostics
+import functions.markdown_list as markdown_list
+import functions.metrics as metrics
+import functions.search_index as search_index
+import functions.snapshot as snapshot
+from functions.faculty import Faculty
+
+@st.cache_resource
+def get_search_index():
+    # One connection shared by all sessions, the index is read-only here
+    return search_index.SearchIndex(search_index.INDEX_PATH)
+
+@st.cache_data
+def load_roster(dataset_version):
+    # Loaded again for each version of the faculty data, see snapshot.get_dataset_version()
+    if snapshot.is_enabled():
+        faculty_data = snapshot.load_roster()
+    else:
+        faculty_data = pd.read_csv('Takesawa_Saori_updated.csv')
+
+    # Faculty id -> Faculty, to open the profile of a faculty in the results
+    return {faculty.faculty_id: faculty for faculty in (Faculty.from_row(row) for _, row in faculty_data.iterrows())}
+
+if 'selected_faculty' not in st.session_state:
+    st.session_state.selected_faculty = None
+
+selected_faculty = None
+
+st.header('Search Works')
+
+if not os.path.exists(search_index.INDEX_PATH):
+    st.info('The search index has not been built yet. Run `python -m functions.search_index harvest` to build it.')
+    st.stop()
+
+query = st.text_input('Search titles and abstracts of faculty works', placeholder='eg. federated learning')
+
+if query:
+    start_time = time.perf_counter()
+    works, faculty = get_search_index().search(query, limit=20)
+    search_ms = (time.perf_counter() - start_time) * 1000
+    metrics.observe('search.latency_ms', search_ms)
+
+    roster = load_roster(snapshot.get_dataset_version())
+
+    st.caption(f'{len(works)} works found in {search_ms:.0f} ms')
+
+    col1, col2 = st.columns([2, 1])
+
+    with col1:
+        st.subheader('Works')
+        items = []
+        for i, work in enumerate(works):
+            details = []
+            if work['publication_date']:
+                details.append(f'Published date: {work["publication_date"]}')
+            names = [roster[faculty_id].name for faculty_id in work['faculty_ids'] if faculty_id in roster]
+            details.append(f'Faculty: {markdown_list.escape_markdown(", ".join(names))}')
+            items.append(markdown_list.format_list_item(i+1, work['title'], details, link=work['doi']))
+        # All works in one markdown element
+        if items:
+            st.markdown(markdown_list.format_list(items))
+
+    with col2:
+        st.subheader('Faculty')
+        for i, member in enumerate(faculty):
+            st.write(f'{i+1}. **{member["name"]}** ({member["work_count"]} matching works)')
+            if member['faculty_id'] in roster:
+                if st.button('View Profile', key=f'search_view_profile_{member["faculty_id"]}'):
+                    selected_faculty = roster[member['faculty_id']]
+
+st.session_state['selected_faculty'] = selected_faculty
+
+diagnostics.render_diagnostics()
+
+# Faculty profile page
+if selected_faculty is not None:
+    st.session_state.faculty_api_id = None
+    st.session_state.retrieve_method = None
+    switch_page('faculty profile')